@@ -0,0 +1,369 @@
+# app/admission.py
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Callable, Coroutine, Deque, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.database import PoolTimeoutError, database
+from app.metrics import registry
+from app.workers import WorkerPoolFullError
+
+
+class AdmissionLimit(NamedTuple):
+    path: str
+    concurrency: int
+    queue: int
+
+
+def parse_admission_limits(value: str) -> Dict[str, AdmissionLimit]:
+    """Parse ``path=concurrency/queue`` pairs separated by commas."""
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        path, _, spec = item.partition("=")
+        concurrency, _, queue = spec.partition("/")
+        limits[path.strip()] = AdmissionLimit(
+            path.strip(), int(concurrency), int(queue or 0)
+        )
+    return limits
+
+
+class Gate:
+    """At most ``concurrency`` requests inside, at most ``queue`` waiting.
+
+    A released slot is handed straight to the oldest waiter, so a request
+    arriving later cannot overtake one that is queued.
+    """
+
+    def __init__(self, concurrency: int, queue: int):
+        self.concurrency = max(1, concurrency)
+        self.queue = max(0, queue)
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def full(self) -> bool:
+        busy = self.active >= self.concurrency or self._waiters
+        return bool(busy) and self.waiting >= self.queue
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot; False if the queue is full or ``timeout`` passes."""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return True
+        if self.waiting >= self.queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the client went away
+                self.release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def release(self):
+        self.active -= 1
+        self.wake()
+
+    def wake(self):
+        """Hand free slots to waiters, e.g. after ``concurrency`` grows."""
+        while self._waiters and self.active < self.concurrency:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def _remove(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+def build_gates(limits: str) -> Dict[str, Gate]:
+    return {
+        path: Gate(limit.concurrency, limit.queue)
+        for path, limit in parse_admission_limits(limits).items()
+    }
+
+
+gates = build_gates(settings.admission_limits)
+
+admission_rejected = registry.counter(
+    "admission_rejected_total",
+    "Requests shed with 503 before reaching the handler.",
+    ("path", "reason"),
+)
+
+
+class AdmissionMiddleware:
+    """Sheds load on the expensive auth routes before it queues up.
+
+    Each path in ``ADMISSION_LIMITS`` gets its own gate. A request that finds
+    the gate full waits up to ``ADMISSION_QUEUE_TIMEOUT`` seconds in a
+    bounded queue; when the queue is full or the wait runs out it gets 503
+    with Retry-After at once. Other paths, e.g. token refresh and
+    authenticated reads, pass straight through.
+
+    With ``ADAPTIVE_CONCURRENCY_ENABLED`` a path served by an AdaptiveRoute
+    is left to its adaptive limit, so no request is gated twice.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        gates: Dict[str, Gate] = gates,
+        queue_timeout: float = settings.admission_queue_timeout,
+        retry_after: float = settings.admission_retry_after,
+    ):
+        self.app = app
+        self.gates = gates
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        gate = None
+        if scope["type"] == "http" and scope["method"] != "OPTIONS":
+            gate = self.gates.get(scope["path"])
+        if gate is None or (
+            settings.adaptive_concurrency_enabled and scope["path"] in route_limiters
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        full = gate.full
+        if full or not await gate.acquire(self.queue_timeout):
+            reason = "queue_full" if full else "timeout"
+            admission_rejected.labels(scope["path"], reason).inc()
+            await self.reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    async def reject(self, send: Send):
+        body = json.dumps({"detail": "Server busy, try again later"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(self.retry_after)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+@registry.collector
+def collect_admission():
+    yield "admission_in_flight", "gauge", "Requests admitted per path.", [
+        ({"path": path}, gate.active) for path, gate in gates.items()
+    ]
+    yield "admission_queued", "gauge", "Requests waiting per path.", [
+        ({"path": path}, gate.waiting) for path, gate in gates.items()
+    ]
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit in the style of Netflix's concurrency-limits.
+
+    Every completed request is a sample. While the route uses at least half
+    of its limit, the limit grows by ``1 / limit``, about one per round of
+    requests. It shrinks by ``backoff`` when a request took more than
+    ``tolerance`` times the baseline latency, the database pool made callers
+    wait more than ``max_pool_wait`` on average, or the pool timed out.
+
+    The baseline is the lowest latency seen, drifting slowly upwards so it
+    follows lasting changes such as new Argon2 parameters. The limit shrinks
+    at most once per baseline latency, so one burst of slow requests that
+    were all admitted together counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int = settings.adaptive_initial_limit,
+        min_limit: int = settings.adaptive_min_limit,
+        max_limit: int = settings.adaptive_max_limit,
+        tolerance: float = settings.adaptive_latency_tolerance,
+        backoff: float = settings.adaptive_backoff,
+        max_pool_wait: float = settings.adaptive_max_pool_wait_seconds,
+        drift: float = 0.001,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.value = float(min(max(initial, self.min_limit), self.max_limit))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.max_pool_wait = max_pool_wait
+        self.drift = drift
+        self.baseline: Optional[float] = None
+        self._last_decrease = float("-inf")
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def on_sample(
+        self,
+        latency: float,
+        in_flight: int,
+        pool_wait: float = 0.0,
+        dropped: bool = False,
+        now: Optional[float] = None,
+    ):
+        if now is None:
+            now = time.monotonic()
+
+        if not dropped:
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += (latency - self.baseline) * self.drift
+
+        overloaded = (
+            dropped
+            or pool_wait > self.max_pool_wait
+            or latency > self.baseline * self.tolerance
+        )
+        if overloaded:
+            if now - self._last_decrease >= (self.baseline or 0):
+                self.value = max(self.min_limit, self.value * self.backoff)
+                self._last_decrease = now
+        elif in_flight * 2 >= self.value:
+            self.value = min(self.max_limit, self.value + 1 / self.value)
+
+
+class RouteLimiter:
+    """An adaptive limit and the gate that enforces it for one route."""
+
+    def __init__(self):
+        self.limit = AdaptiveLimit()
+        self.gate = Gate(self.limit.limit, settings.adaptive_queue_size)
+        self.rejected = 0
+        self._pool_count = database.acquire_wait.count
+        self._pool_sum = database.acquire_wait.sum
+
+    def pool_wait(self) -> float:
+        """Mean pool acquire wait across the app since the last call."""
+        histogram = database.acquire_wait
+        count = histogram.count - self._pool_count
+        total = histogram.sum - self._pool_sum
+        self._pool_count, self._pool_sum = histogram.count, histogram.sum
+        return total / count if count > 0 else 0.0
+
+    def on_sample(self, latency: float, in_flight: int, dropped: bool):
+        self.limit.on_sample(latency, in_flight, self.pool_wait(), dropped)
+        self.gate.concurrency = self.limit.limit
+        self.gate.wake()
+
+    def stats(self) -> Dict[str, object]:
+        baseline = self.limit.baseline
+        return {
+            "limit": self.limit.limit,
+            "in_flight": self.gate.active,
+            "queued": self.gate.waiting,
+            "rejected": self.rejected,
+            "baseline_ms": None if baseline is None else round(baseline * 1000, 3),
+        }
+
+
+route_limiters: Dict[str, RouteLimiter] = {}
+
+adaptive_rejected = registry.counter(
+    "adaptive_rejected_total",
+    "Requests shed with 503 by the adaptive concurrency limit.",
+    ("path",),
+)
+
+
+class AdaptiveRoute(APIRoute):
+    """Route class that puts each route behind an adaptive concurrency limit.
+
+    Only successful responses are latency samples: a 401 for an unknown
+    email returns before Argon2 and would drag the baseline down. Database
+    pool timeouts and a full worker pool count as drops. ``ADAPTIVE_CONCURRENCY_ENABLED`` is read per
+    request, so the limiter can be switched at runtime.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+        # Copies made by include_router share the limiter of the original
+        limiter = route_limiters.setdefault(self.path, RouteLimiter())
+        path = self.path
+
+        async def adaptive_handler(request: Request) -> Response:
+            if not settings.adaptive_concurrency_enabled:
+                return await handler(request)
+
+            gate = limiter.gate
+            if gate.full or not await gate.acquire(settings.admission_queue_timeout):
+                limiter.rejected += 1
+                adaptive_rejected.labels(path).inc()
+                return JSONResponse(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    content={"detail": "Server busy, try again later"},
+                    headers={
+                        "Retry-After": str(math.ceil(settings.admission_retry_after))
+                    },
+                )
+
+            in_flight = gate.active
+            start = time.perf_counter()
+            sample = False
+            dropped = False
+            try:
+                response = await handler(request)
+                sample = response.status_code < 400
+                return response
+            except (PoolTimeoutError, WorkerPoolFullError):
+                dropped = True
+                raise
+            finally:
+                gate.release()
+                if sample or dropped:
+                    limiter.on_sample(time.perf_counter() - start, in_flight, dropped)
+
+        return adaptive_handler
+
+
+def adaptive_stats() -> Dict[str, Dict[str, object]]:
+    return {path: limiter.stats() for path, limiter in route_limiters.items()}
+
+
+@registry.collector
+def collect_adaptive():
+    yield "adaptive_limit", "gauge", "Current adaptive concurrency limit.", [
+        ({"path": path}, limiter.limit.limit)
+        for path, limiter in route_limiters.items()
+    ]
+    yield "adaptive_in_flight", "gauge", "Requests admitted by the adaptive limit.", [
+        ({"path": path}, limiter.gate.active)
+        for path, limiter in route_limiters.items()
+    ]
@@ -0,0 +1,213 @@
+# app/auth/hashing.py
+"""Argon2 parameters calibrated to this host.
+
+Calibration never goes below argon2-cffi's defaults (t=3, m=64 MiB,
+p=4), which are stronger than every row of OWASP's Argon2id table; a
+memory budget or parallelism below that floor is rejected. Above the floor
+it keeps the memory budget if it can, lowering it only when a hash already
+exceeds the target, then raises the time cost while a hash stays within
+the target latency. A host too slow for the floor keeps the
+floor and logs a warning. The result is written to ARGON2_PARAMS_PATH and
+used by every process that starts afterwards; keep that file on a volume
+so a redeploy does not recalibrate. With ARGON2_CALIBRATE_ON_STARTUP,
+workers starting together take a lock file so only one of them measures
+while the others wait and load its result.
+
+    python -m app.auth.hashing --target-ms 250 --max-memory-kib 65536 --write
+"""
+import argparse
+import fcntl
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from argon2 import PasswordHasher
+from pydantic import BaseModel
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = "calibration-passw0rd!"
+
+
+class Argon2Params(BaseModel):
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+    measured_ms: Optional[float] = None
+    target_ms: Optional[float] = None
+    host: Optional[str] = None
+    calibrated_at: Optional[datetime] = None
+
+
+_defaults = PasswordHasher()
+# No cost ever goes below argon2-cffi's defaults
+FLOOR = Argon2Params(
+    time_cost=_defaults.time_cost,
+    memory_cost=_defaults.memory_cost,
+    parallelism=_defaults.parallelism,
+)
+
+
+def build_hasher(
+    params: Optional[Argon2Params], floor: Argon2Params = FLOOR
+) -> PasswordHasher:
+    """A hasher for ``params`` raised to ``floor``, or the floor without them."""
+    if params is None:
+        params = floor
+    return PasswordHasher(
+        time_cost=max(params.time_cost, floor.time_cost),
+        memory_cost=max(params.memory_cost, floor.memory_cost),
+        parallelism=max(params.parallelism, floor.parallelism),
+    )
+
+
+def load_params(path: str = settings.argon2_params_path) -> Optional[Argon2Params]:
+    """Saved parameters; None if missing or unreadable, so they recalibrate."""
+    try:
+        with open(path) as f:
+            return Argon2Params.model_validate(json.load(f))
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        # Bad JSON or fields; pydantic's ValidationError is a ValueError
+        logger.warning("Ignoring unreadable Argon2 parameters in %s", path)
+        return None
+
+
+def save_params(params: Argon2Params, path: str = settings.argon2_params_path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Write then rename so a concurrently starting worker never reads half
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(params.model_dump_json(indent=2))
+    os.replace(tmp, path)
+
+
+def measure_ms(hasher: PasswordHasher, samples: int) -> float:
+    hasher.hash(PASSWORD)  # warm up the allocation
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash(PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_ms: float = settings.argon2_target_ms,
+    max_memory_kib: int = settings.argon2_max_memory_kib,
+    parallelism: int = settings.argon2_parallelism,
+    floor: Argon2Params = FLOOR,
+    max_time_cost: int = 10,
+    samples: int = 3,
+) -> Argon2Params:
+    """Strongest parameters, no weaker than ``floor``, whose hash time stays
+    within ``target_ms``."""
+    if max_memory_kib < floor.memory_cost or parallelism < floor.parallelism:
+        raise ValueError(
+            f"Argon2 needs at least {floor.memory_cost} KiB of memory and a "
+            f"parallelism of {floor.parallelism} (ARGON2_MAX_MEMORY_KIB, "
+            f"ARGON2_PARALLELISM); got {max_memory_kib} KiB and {parallelism}"
+        )
+
+    memory_cost = max_memory_kib
+    time_cost = floor.time_cost
+    while True:
+        hasher = PasswordHasher(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+        )
+        measured = measure_ms(hasher, samples)
+        if measured <= target_ms or memory_cost // 2 < floor.memory_cost:
+            break
+        memory_cost //= 2
+
+    while time_cost < max_time_cost:
+        hasher = PasswordHasher(
+            time_cost=time_cost + 1,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+        )
+        candidate = measure_ms(hasher, samples)
+        if candidate > target_ms:
+            break
+        time_cost += 1
+        measured = candidate
+
+    params = Argon2Params(
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+        measured_ms=round(measured, 2),
+        target_ms=target_ms,
+        host=platform.node(),
+        calibrated_at=datetime.now(timezone.utc),
+    )
+    if measured > target_ms:
+        logger.warning(
+            "Argon2 at the minimum parameters takes %.0fms, over the %.0fms target",
+            measured,
+            target_ms,
+        )
+    return params
+
+
+def load_or_calibrate(path: str = settings.argon2_params_path) -> Argon2Params:
+    """Saved parameters, calibrating and saving them first if there are none.
+
+    Concurrent benchmarks on shared cores would measure each other and
+    settle on lower costs, so callers serialise on ``<path>.lock``.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            params = load_params(path)
+            if params is None:
+                params = calibrate()
+                save_params(params, path)
+                logger.info("Calibrated Argon2: %s", params.model_dump_json())
+            return params
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def main(args):
+    params = calibrate(
+        target_ms=args.target_ms,
+        max_memory_kib=args.max_memory_kib,
+        parallelism=args.parallelism,
+    )
+    if args.write:
+        save_params(params, args.path)
+    print(params.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--target-ms", type=float, default=settings.argon2_target_ms
+    )
+    parser.add_argument(
+        "--max-memory-kib", type=int, default=settings.argon2_max_memory_kib
+    )
+    parser.add_argument(
+        "--parallelism", type=int, default=settings.argon2_parallelism
+    )
+    parser.add_argument("--path", default=settings.argon2_params_path)
+    parser.add_argument(
+        "--write", action="store_true", help="save the result to --path"
+    )
+    try:
+        main(parser.parse_args())
+    except ValueError as e:
+        parser.error(str(e))
@@ -0,0 +1,42 @@
+# app/auth/keyring.py
+from typing import List
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+
+from app.config import settings
+
+
+class MFAKeyRing:
+    """Fernet keys for MFA secrets, built once.
+
+    New secrets are always encrypted under the primary key; retired keys are
+    only tried on decrypt so ``MFA_ENCRYPTION_KEY`` can be rotated without
+    breaking enrolled users.
+    """
+
+    def __init__(self, primary: str, retired: List[str]):
+        self.primary = Fernet(primary)
+        self.fernet = MultiFernet(
+            [self.primary] + [Fernet(key) for key in retired]
+        )
+
+    def encrypt(self, secret: str) -> str:
+        return self.fernet.encrypt(secret.encode()).decode()
+
+    def decrypt(self, encrypted_secret: str) -> str:
+        return self.fernet.decrypt(encrypted_secret.encode()).decode()
+
+    def needs_rotation(self, encrypted_secret: str) -> bool:
+        try:
+            self.primary.decrypt(encrypted_secret.encode())
+            return False
+        except InvalidToken:
+            return True
+
+    def rotate(self, encrypted_secret: str) -> str:
+        """Re-encrypt under the primary key. Raises InvalidToken if no key
+        in the ring can decrypt the value."""
+        return self.fernet.rotate(encrypted_secret.encode()).decode()
+
+
+mfa_keyring = MFAKeyRing(settings.mfa_secret_key, settings.mfa_retired_keys)
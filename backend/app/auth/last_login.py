@@ -0,0 +1,172 @@
+# app/auth/last_login.py
+import asyncio
+import datetime as dt
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.auth.services import update_user_last_login, user_cache
+from app.config import settings
+from app.database import database
+
+logger = logging.getLogger(__name__)
+
+
+def build_update(batch: Dict[int, dt.datetime]) -> Tuple[str, List[object]]:
+    """One UPDATE setting each user's last_login from a CASE on the id."""
+    cases = " ".join("WHEN %s THEN %s" for _ in batch)
+    ids = ", ".join("%s" for _ in batch)
+    query = f"UPDATE users SET last_login = CASE id {cases} END WHERE id IN ({ids});"
+
+    args: List[object] = []
+    for user_id, when in batch.items():
+        args.extend((user_id, when))
+    args.extend(batch)
+    return query, args
+
+
+class LastLoginBuffer:
+    """Write-behind buffer for ``users.last_login``.
+
+    Logins record a timestamp in memory and return; a background task writes
+    the latest timestamp per user in one multi-row UPDATE every
+    ``interval`` seconds, or sooner once half of ``max_pending`` users are
+    waiting. Until then the column lags by at most one interval. When the
+    buffer is not running (disabled, or outside the app lifespan) ``record``
+    writes through immediately.
+
+    ``max_pending`` is a hard cap: while writes keep failing, e.g. during a
+    database outage, the oldest pending users are dropped and counted in
+    ``dropped``. last_login is lossy in that case; those users keep their
+    previous value until they log in again.
+    """
+
+    def __init__(self, max_pending: int = settings.last_login_max_pending):
+        self.max_pending = max(1, max_pending)
+        self._pending: Dict[int, dt.datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+
+        self.recorded = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def record(self, user_id: int):
+        if not self.running:
+            await update_user_last_login(user_id)
+            return
+
+        self.recorded += 1
+        if self._pending.pop(user_id, None) is not None:
+            self.coalesced += 1
+        # Re-inserted so the entry moves behind the older ones
+        self._pending[user_id] = dt.datetime.now(dt.timezone.utc)
+        self._trim()
+
+        if self._wakeup and len(self._pending) * 2 >= self.max_pending:
+            self._wakeup.set()
+
+    def _trim(self):
+        # Dicts keep insertion order, so the first entries are the oldest
+        while len(self._pending) > self.max_pending:
+            del self._pending[next(iter(self._pending))]
+            self.dropped += 1
+
+    async def flush(self, batch_size: int = settings.last_login_batch_size) -> int:
+        """Write everything pending; returns the number of users written."""
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            items = list(pending.items())
+            written = 0
+
+            for start in range(0, len(items), batch_size):
+                batch = dict(items[start : start + batch_size])
+                query, args = build_update(batch)
+                try:
+                    async with database.get_connection() as conn:
+                        async with conn.cursor() as cursor:
+                            await cursor.execute(query, args)
+                except Exception:
+                    self.failures += 1
+                    logger.exception("Failed to write %s last_login values", len(batch))
+                    # Retry next flush, ahead of newer logins, unless one
+                    # has replaced them
+                    retry = {
+                        user_id: when
+                        for user_id, when in items[start:]
+                        if user_id not in self._pending
+                    }
+                    self._pending = {**retry, **self._pending}
+                    self._trim()
+                    break
+
+                # last_login is not part of the token version, so patch the
+                # cached row rather than invalidating it
+                for user_id, when in batch.items():
+                    user_cache.update(
+                        user_id,
+                        lambda user, when=when: user.model_copy(
+                            update={"last_login": when}
+                        ),
+                    )
+                written += len(batch)
+
+            if items:
+                self.flushes += 1
+                self.written += written
+            return written
+
+    async def _loop(self, interval: float):
+        assert self._stop and self._wakeup
+
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("last_login flush failed")
+
+    def start(self, interval: float = settings.last_login_flush_seconds):
+        self._stop = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._loop(interval))
+
+    async def stop(self):
+        if self._stop and self._wakeup:
+            self._stop.set()
+            self._wakeup.set()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._stop = None
+        self._wakeup = None
+
+        # Whatever arrived after the last loop iteration
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "written": self.written,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+
+last_login_buffer = LastLoginBuffer()
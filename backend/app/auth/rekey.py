@@ -0,0 +1,147 @@
+# app/auth/rekey.py
+"""Re-encrypt stored MFA secrets under the primary key.
+
+Run after moving the old key into MFA_RETIRED_KEYS and setting a new
+MFA_ENCRYPTION_KEY. Running API workers cache user rows, old ciphertext
+included, for up to settings.user_cache_ttl_seconds (30 s) and this job
+cannot reach those caches; keep the retired key configured for at least that long after the
+job reports no failures, and through one more redeploy, before dropping it.
+
+    python -m app.auth.rekey --batch-size 500 --pause 0.1
+"""
+import argparse
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from cryptography.fernet import InvalidToken
+from pydantic import BaseModel
+
+from app.auth.keyring import MFAKeyRing, mfa_keyring
+from app.config import settings
+from app.database import database
+
+logger = logging.getLogger(__name__)
+
+
+class RekeyProgress(BaseModel):
+    scanned: int = 0
+    rekeyed: int = 0
+    current: int = 0
+    failed: int = 0
+    last_id: int = 0
+
+
+def rotate_batch(
+    keyring: MFAKeyRing, rows: List[Tuple[int, str]]
+) -> Tuple[List[Tuple[str, int, str]], List[int]]:
+    """Returns (new_secret, id, old_secret) updates and ids no key decrypts."""
+    updates = []
+    failed = []
+    for user_id, secret in rows:
+        if not keyring.needs_rotation(secret):
+            continue
+        try:
+            updates.append((keyring.rotate(secret), user_id, secret))
+        except InvalidToken:
+            failed.append(user_id)
+    return updates, failed
+
+
+async def rekey_mfa_secrets(
+    keyring: MFAKeyRing = mfa_keyring,
+    batch_size: int = settings.mfa_rekey_batch_size,
+    pause: float = settings.mfa_rekey_pause_seconds,
+    start_after: int = 0,
+    on_progress: Optional[Callable[[RekeyProgress], None]] = None,
+) -> RekeyProgress:
+    """Walk users by primary key, re-encrypting one batch per transaction.
+
+    Updates only apply if the stored value is unchanged, so a user
+    re-enrolling while the job runs keeps their new secret. ``pause`` sleeps
+    between batches to bound the load on a production database.
+    """
+    select_query = (
+        "SELECT id, mfa_secret FROM users "
+        "WHERE id > %s AND mfa_secret IS NOT NULL ORDER BY id LIMIT %s;"
+    )
+    update_query = "UPDATE users SET mfa_secret=%s WHERE id=%s AND mfa_secret=%s;"
+    progress = RekeyProgress(last_id=start_after)
+
+    while True:
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    select_query, (progress.last_id, batch_size)
+                )
+                rows = await cursor.fetchall()
+
+                if not rows:
+                    break
+
+                updates, failed = await asyncio.to_thread(
+                    rotate_batch, keyring, rows
+                )
+                if updates:
+                    await conn.begin()
+                    await cursor.executemany(update_query, updates)
+                    await conn.commit()
+
+        for user_id in failed:
+            logger.error("MFA secret for user %s matches no key", user_id)
+
+        progress.scanned += len(rows)
+        progress.rekeyed += len(updates)
+        progress.failed += len(failed)
+        progress.current += len(rows) - len(updates) - len(failed)
+        progress.last_id = rows[-1][0]
+
+        logger.info(
+            "MFA re-key: scanned=%s rekeyed=%s failed=%s last_id=%s",
+            progress.scanned,
+            progress.rekeyed,
+            progress.failed,
+            progress.last_id,
+        )
+        if on_progress:
+            on_progress(progress)
+
+        if len(rows) < batch_size:
+            break
+        await asyncio.sleep(pause)
+
+    return progress
+
+
+async def main(args):
+    await database.connect()
+    try:
+        progress = await rekey_mfa_secrets(
+            batch_size=args.batch_size,
+            pause=args.pause,
+            start_after=args.start_after,
+        )
+    finally:
+        await database.disconnect()
+
+    print(progress.model_dump_json())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.mfa_rekey_batch_size
+    )
+    parser.add_argument(
+        "--pause", type=float, default=settings.mfa_rekey_pause_seconds
+    )
+    parser.add_argument(
+        "--start-after",
+        type=int,
+        default=0,
+        help="resume after this user id",
+    )
+    asyncio.run(main(parser.parse_args()))
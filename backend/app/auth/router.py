@@ -1,5 +1,6 @@
 # app/auth/router.py
-import datetime as dt
+import hashlib
+from typing import Literal, Optional
 from fastapi import (
     APIRouter,
     Depends,
@@ -17,6 +18,7 @@ from app.auth.services import (
     send_email_mfa_code_msg,
     send_reset_password_msg,
     send_verify_email_msg,
+    generate_access_token,
     update_response_refresh_token,
 )
 from app.auth.schemas import (
@@ -29,19 +31,31 @@ from app.auth.schemas import (
     RegisterRequest,
     ResetPassword,
 )
-from app.auth.utils import SecurityService
+from app.admission import AdaptiveRoute
+from app.auth.last_login import last_login_buffer
+from app.auth.utils import QR_MEDIA_TYPES, SecurityService
 from app.auth.services import update_user_password
 from app.config import settings
-from app.dependencies import get_current_user, get_user_pending_mfa
+from app.database import database
+from app.dependencies import (
+    get_current_principal,
+    get_current_user,
+    get_user_pending_mfa,
+    limit_by_ip,
+)
+from app.ratelimit import check_rate_limit
 from app.auth.schemas import (
     LoginRequest,
     TokenResponse,
     MFASetupResponse,
+    Principal,
     User,
     UserUpdate,
 )
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(
+    prefix="/auth", tags=["Authentication"], route_class=AdaptiveRoute
+)
 
 
 @router.post("/register")
@@ -51,10 +65,11 @@ async def register(data: RegisterRequest):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
-    # Create user
-    user = await UserService.create_user(data.email, data.password)
+    # Create user together with its verification token and email
+    async with database.unit_of_work():
+        user = await UserService.create_user(data.email, data.password)
 
-    await send_verify_email_msg(user.id, user.email)
+        await send_verify_email_msg(user.id, user.email)
 
     return {"message": "Registration successful. Check your email to verify."}
 
@@ -69,7 +84,8 @@ async def send_verification_email(email: Email):
             detail="Invalid email.",
         )
 
-    await send_verify_email_msg(user.id, user.email)
+    async with database.unit_of_work():
+        await send_verify_email_msg(user.id, user.email)
 
     return {"message": "Registration successful. Check your email to verify."}
 
@@ -88,19 +104,27 @@ async def verify_email(token: str):
         await TokenService.delete_verification_token(token_obj.user_id)
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    # Mark user as verified
-    update_user = UserUpdate()
-    update_user.is_verified = True
-    await UserService.update_user(token_obj.user_id, update_user)
+    async with database.unit_of_work():
+        # Mark user as verified
+        update_user = UserUpdate()
+        update_user.is_verified = True
+        await UserService.update_user(token_obj.user_id, update_user)
 
-    # Mark token as used
-    await TokenService.delete_verification_token(token_obj.user_id)
+        # Mark token as used
+        await TokenService.delete_verification_token(token_obj.user_id)
 
     return {"message": "Email verified successfully"}
 
 
-@router.post("/login", response_model=LoginResponse)
+@router.post(
+    "/login",
+    response_model=LoginResponse,
+    dependencies=[Depends(limit_by_ip("login"))],
+)
 async def login(data: LoginRequest):
+    # Before the lookup and Argon2, for known and unknown emails alike
+    check_rate_limit("login:account", data.email.lower())
+
     user = await UserService.validate_user(data.email, data.password)
 
     if not user:
@@ -114,10 +138,8 @@ async def login(data: LoginRequest):
             status_code=400, detail="Please verify your email first"
         )
 
-    # Update last login
-    user_update = UserUpdate()
-    user_update.last_login = dt.datetime.now(dt.timezone.utc)
-    await UserService.update_user(user.id, user_update)
+    # Written in the background unless LAST_LOGIN_WRITE_BEHIND is off
+    await last_login_buffer.record(user.id)
 
     # Issue temp token good until MFA verified
     (temp_token, expiry) = SecurityService.generate_jwt(
@@ -134,13 +156,18 @@ async def login(data: LoginRequest):
     )
 
 
-@router.post("/forgot-password")
+@router.post(
+    "/forgot-password", dependencies=[Depends(limit_by_ip("forgot_password"))]
+)
 async def forgot_password(data: ForgotPassword):
+    check_rate_limit("forgot_password:account", data.email.lower())
+
     user = await UserService.get_user_by_email(data.email)
     if not user:
         return {"message": "If email exists, reset link sent"}
 
-    await send_reset_password_msg(user.id, user.email)
+    async with database.unit_of_work():
+        await send_reset_password_msg(user.id, user.email)
 
     return {"message": "If email exists, reset link sent"}
 
@@ -159,18 +186,25 @@ async def reset_password(data: ResetPassword):
         await TokenService.delete_verification_token(token_obj.user_id)
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    # Update password
-    await update_user_password(token_obj.user_id, data.new_password)
+    async with database.unit_of_work():
+        # Update password
+        await update_user_password(token_obj.user_id, data.new_password)
 
-    # Mark token as used
-    await TokenService.delete_verification_token(token_obj.user_id)
+        # Mark token as used
+        await TokenService.delete_verification_token(token_obj.user_id)
 
     return {"message": "Password updated successfully"}
 
 
-@router.post("/send-email-mfa-code")
+@router.post(
+    "/send-email-mfa-code",
+    dependencies=[Depends(limit_by_ip("send_email_mfa_code"))],
+)
 async def send_email_mfa_code(user: User = Depends(get_user_pending_mfa)):
-    await send_email_mfa_code_msg(user.id, user.email)
+    check_rate_limit("send_email_mfa_code:account", str(user.id))
+
+    async with database.unit_of_work():
+        await send_email_mfa_code_msg(user.id, user.email)
 
     return {"message": "MFA code sent successful. Check your email to verify."}
 
@@ -185,7 +219,11 @@ async def setup_authenticator_mfa(user: User = Depends(get_user_pending_mfa)):
 
     # Generate secret and QR code
     secret = SecurityService.generate_mfa_secret()
-    qr_code = SecurityService.generate_qr_code(user.email, secret)
+    qr_code = None
+    if settings.mfa_qr_inline:
+        qr_code = await SecurityService.generate_qr_code_async(
+            user.email, secret
+        )
 
     user_update = UserUpdate()
     user_update.mfa_secret = SecurityService.encrypt_mfa_secret(secret)
@@ -194,6 +232,48 @@ async def setup_authenticator_mfa(user: User = Depends(get_user_pending_mfa)):
     return MFASetupResponse(
         secret=secret,
         qr_code=qr_code,
+        qr_code_url=router.url_path_for("authenticator_mfa_qr_code"),
+    )
+
+
+@router.get("/authenticator-mfa-qr-code", name="authenticator_mfa_qr_code")
+async def authenticator_mfa_qr_code(
+    request: Request,
+    format: Optional[Literal["png", "svg"]] = None,
+    user: User = Depends(get_user_pending_mfa),
+):
+    format = format or settings.mfa_qr_format  # type: ignore[assignment]
+    if user.authenticator_mfa_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Authenticator MFA is already enabled",
+        )
+    if not user.mfa_secret:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Authenticator MFA not set up",
+        )
+
+    # The stored ciphertext changes whenever setup issues a new secret
+    etag = '"{}"'.format(
+        hashlib.sha256(f"{format}:{user.mfa_secret}".encode()).hexdigest()[:32]
+    )
+    headers = {
+        "Cache-Control": f"private, max-age={settings.mfa_qr_max_age_seconds}",
+        "ETag": etag,
+        "Vary": "Authorization",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    image = await SecurityService.generate_qr_code_image_async(
+        user.email,
+        SecurityService.decrypt_mfa_secret(user.mfa_secret),
+        format,
+    )
+
+    return Response(
+        content=image, media_type=QR_MEDIA_TYPES[format], headers=headers
     )
 
 
@@ -216,55 +296,54 @@ async def verify_authenticator_mfa(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid MFA code"
         )
 
-    await update_response_refresh_token(user.id, response)
-
-    (access_token, expiry) = SecurityService.generate_jwt(
-        user.id,
-        timedelta(minutes=settings.access_token_expire_minutes),
-        True,
-    )
+    async with database.unit_of_work():
+        await update_response_refresh_token(user.id, response)
 
-    # If MFA wasn't enabled yet, enable it now
-    if not user.authenticator_mfa_enabled:
-        recovery_codes = await RecoveryCodeService.create_recovery_codes(
-            user.id
-        )
+        # If MFA wasn't enabled yet, enable it now
+        recovery_codes = None
+        if not user.authenticator_mfa_enabled:
+            recovery_codes = await RecoveryCodeService.create_recovery_codes(
+                user.id
+            )
 
-        user_update = UserUpdate()
-        user_update.authenticator_mfa_enabled = True
-        await UserService.update_user(user.id, user_update)
+            user_update = UserUpdate()
+            user_update.authenticator_mfa_enabled = True
+            await UserService.update_user(user.id, user_update)
+            user.authenticator_mfa_enabled = True
 
-        return MFAVerfiedResponse(
-            recovery_codes=recovery_codes,
-            access_token=access_token,
-            expires_at=expiry,
-        )
+    (access_token, expiry) = generate_access_token(user)
 
     return MFAVerfiedResponse(
-        recovery_codes=None,
+        recovery_codes=recovery_codes,
         access_token=access_token,
         expires_at=expiry,
     )
 
 
-@router.post("/verify-email-mfa", response_model=MFAVerfiedResponse)
+@router.post(
+    "/verify-email-mfa",
+    response_model=MFAVerfiedResponse,
+    dependencies=[Depends(limit_by_ip("verify_email_mfa"))],
+)
 async def verify_email_mfa(
     data: MFAVerifiactionCode,
     response: Response,
     user: User = Depends(get_user_pending_mfa),
 ):
-    if not await EmailMfaCodeService.verify_email_mfa_code(user.id, data.code):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid MFA code"
-        )
+    check_rate_limit("verify_email_mfa:account", str(user.id))
 
-    await update_response_refresh_token(user.id, response)
+    async with database.unit_of_work():
+        if not await EmailMfaCodeService.verify_email_mfa_code(
+            user.id, data.code
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid MFA code",
+            )
 
-    (access_token, expiry) = SecurityService.generate_jwt(
-        user.id,
-        timedelta(minutes=settings.access_token_expire_minutes),
-        True,
-    )
+        await update_response_refresh_token(user.id, response)
+
+    (access_token, expiry) = generate_access_token(user)
 
     return MFAVerfiedResponse(
         recovery_codes=None,
@@ -273,44 +352,50 @@ async def verify_email_mfa(
     )
 
 
-@router.post("/verify-recovery-code", response_model=TokenResponse)
+@router.post(
+    "/verify-recovery-code",
+    response_model=TokenResponse,
+    dependencies=[Depends(limit_by_ip("verify_recovery_code"))],
+)
 async def verify_recovery_code(
     data: MFAVerifiactionCode,
     response: Response,
     user: User = Depends(get_user_pending_mfa),
 ):
+    check_rate_limit("verify_recovery_code:account", str(user.id))
+
     if not user.authenticator_mfa_enabled:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Authenticator MFA not set up",
         )
-    if not await RecoveryCodeService.verify_recovery_code(user.id, data.code):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid recovery code.",
-        )
+    async with database.unit_of_work():
+        if not await RecoveryCodeService.verify_recovery_code(
+            user.id, data.code
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid recovery code.",
+            )
 
-    await update_response_refresh_token(user.id, response)
+        await update_response_refresh_token(user.id, response)
 
-    (access_token, expiry) = SecurityService.generate_jwt(
-        user.id,
-        timedelta(minutes=settings.access_token_expire_minutes),
-        True,
-    )
+    (access_token, expiry) = generate_access_token(user)
 
     return TokenResponse(access_token=access_token, expires_at=expiry)
 
 
 @router.post("/regenerate-recovery-codes", response_model=RecoveryCodes)
 async def regenerate_recovery_codes(
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     if not user.authenticator_mfa_enabled:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="MFA not set up"
         )
 
-    codes = await RecoveryCodeService.regenerate_recovery_codes(user.id)
+    async with database.unit_of_work():
+        codes = await RecoveryCodeService.regenerate_recovery_codes(user.id)
 
     if not codes:
         raise HTTPException(
@@ -340,10 +425,12 @@ async def disable_authenticator_mfa(
         )
 
     # Disable MFA
-    user_update = UserUpdate()
-    user_update.authenticator_mfa_enabled = False
-    user_update.mfa_secret = None
-    await UserService.update_user(user.id, user_update)
+    async with database.unit_of_work():
+        user_update = UserUpdate()
+        user_update.authenticator_mfa_enabled = False
+        user_update.mfa_secret = None
+        await UserService.update_user(user.id, user_update)
+        await UserService.revoke_access_tokens(user.id)
 
     return {"message": "MFA disabled successfully"}
 
@@ -367,7 +454,7 @@ async def refresh_token(request: Request):
 async def logout(
     response: Response,
     request: Request,
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     token = request.cookies.get("refresh_token")
 
@@ -39,7 +39,8 @@ class ResetPassword(BaseModel):
 
 class MFASetupResponse(BaseModel):
     secret: str
-    qr_code: str
+    qr_code: Optional[str] = None  # Omitted when MFA_QR_INLINE is off
+    qr_code_url: str
 
 
 class MFAVerfiedResponse(BaseModel):
@@ -82,11 +83,25 @@ class User(BaseModel):
     created_at: datetime
     updated_at: datetime
     last_login: Optional[datetime] = None
+    token_version: int = 0
 
     class Config:
         from_attributes = True  # For **dict conversion
 
 
+class Principal(BaseModel):
+    """Authenticated user as described by an access token."""
+
+    id: int
+    email: str
+    is_verified: bool
+    authenticator_mfa_enabled: bool
+    token_version: int = 0
+
+    class Config:
+        from_attributes = True
+
+
 class UserResponse(BaseModel):
     id: int
     email: str
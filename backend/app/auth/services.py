@@ -1,6 +1,10 @@
+import asyncio
+import contextvars
+import logging
 import aiomysql
-from typing import List, Union
+from typing import List, Optional, Set, Tuple, Union
 from fastapi import HTTPException, status
+from app.cache import TTLCache
 from app.database import database
 from app.auth.schemas import (
     RefreshToken,
@@ -22,6 +26,8 @@ from app.email.messages import (
 )
 from app.email.service import EmailService
 
+logger = logging.getLogger(__name__)
+
 
 async def update_response_refresh_token(user_id: int, response: Response):
     # Create Refresh token
@@ -49,6 +55,28 @@ async def update_response_refresh_token(user_id: int, response: Response):
     await TokenService.create_refresh_token(token)
 
 
+def generate_access_token(user: User) -> Tuple[str, datetime]:
+    # The token version is always embedded so password resets and MFA
+    # changes revoke outstanding tokens; the remaining claims are only
+    # needed by get_current_principal in stateless mode.
+    claims = {"tv": user.token_version}
+    if settings.stateless_access_tokens:
+        claims.update(
+            {
+                "email": user.email,
+                "verified": user.is_verified,
+                "mfa": user.authenticator_mfa_enabled,
+            }
+        )
+
+    return SecurityService.generate_jwt(
+        user.id,
+        timedelta(minutes=settings.access_token_expire_minutes),
+        True,
+        claims,
+    )
+
+
 async def send_verify_email_msg(user_id: int, email: str):
     # delete if any token exists
     await TokenService.delete_verification_token(user_id)
@@ -68,12 +96,12 @@ async def send_verify_email_msg(user_id: int, email: str):
 
     # Send verification email
     verification_url = f"{settings.app_url}/verify-email?token={token}"
-    (
+    await (
         EmailService()
         .recipient(email)
         .subject("Verify Email")
         .body(VerifyEmailMessage(verification_url))
-        .send()
+        .enqueue()
     )
 
 
@@ -82,12 +110,12 @@ async def send_email_mfa_code_msg(user_id: int, email: str):
         user_id, timedelta(minutes=settings.email_mfa_expire_minutes)
     )
 
-    (
+    await (
         EmailService()
         .recipient(email)
         .subject("Verification Code")
         .body(MfaEmailMessage(code))
-        .send()
+        .enqueue()
     )
 
 
@@ -109,12 +137,12 @@ async def send_reset_password_msg(user_id: int, email: str):
 
     # Send verification email
     reset_url = f"{settings.app_url}/reset-password?token={token}"
-    (
+    await (
         EmailService()
         .recipient(email)
         .subject("Reset Password")
         .body(ResetPasswordMessage(reset_url))
-        .send()
+        .enqueue()
     )
 
 
@@ -126,8 +154,11 @@ async def update_user_last_login(user_id: int):
 
 async def update_user_password(user_id: int, password: str):
     user_update = UserUpdate()
-    user_update.password_hash = SecurityService.hash_password(password)
+    user_update.password_hash = await SecurityService.hash_password_async(
+        password
+    )
     await UserService.update_user(user_id, user_update)
+    await UserService.revoke_access_tokens(user_id)
 
 
 async def update_user_is_verified(user_id: int, is_verified: bool):
@@ -136,22 +167,104 @@ async def update_user_is_verified(user_id: int, is_verified: bool):
     await UserService.update_user(user_id, user_update)
 
 
+# Read-your-writes keys for Database.mark_write / get_connection(readonly=True)
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def email_key(email: str) -> str:
+    return f"email:{email.lower()}"
+
+
+def refresh_token_key(token_hash: str) -> str:
+    return f"refresh_token:{token_hash}"
+
+
+# Users by id, kept coherent by every write in UserService. Other app
+# processes only see a write once their entry expires.
+user_cache: TTLCache[int, User] = TTLCache(
+    settings.user_cache_size,
+    settings.user_cache_ttl_seconds,
+    settings.user_cache_enabled,
+)
+
+# Token versions checked on every stateless request. Kept short-lived so a
+# revocation made by another app process is seen within a few seconds.
+token_version_cache: TTLCache[int, int] = TTLCache(
+    settings.user_cache_size,
+    settings.token_version_cache_ttl_seconds,
+)
+
+
+def invalidate_user(user_id: int):
+    def invalidate():
+        user_cache.invalidate(user_id)
+        token_version_cache.invalidate(user_id)
+
+    # Again after commit, or a read racing the open transaction could cache
+    # the old row
+    invalidate()
+    database.after_commit(invalidate)
+
+
+# Background password rehashes, kept referenced until they finish
+_rehash_tasks: Set[asyncio.Task] = set()
+
+
+def schedule_rehash(user_id: int, password: str, old_hash: str):
+    # A fresh context so the task never joins the caller's unit of work
+    task = asyncio.create_task(
+        UserService.rehash_password(user_id, password, old_hash),
+        context=contextvars.Context(),
+    )
+    _rehash_tasks.add(task)
+    task.add_done_callback(_rehash_tasks.discard)
+
+
+async def wait_for_rehashes():
+    if _rehash_tasks:
+        await asyncio.gather(*_rehash_tasks, return_exceptions=True)
+
+
 # Users
 class UserService:
     # Helper methods
     @staticmethod
     async def validate_user(email: str, password: str) -> Union[User, None]:
-        user = await UserService.get_user_by_email(email)
+        # Password hashes are read from the primary so a reset applies at once
+        user = await UserService.get_user_by_email(email, readonly=False)
         if user is None:
             return None
-        elif not SecurityService.verify_password(password, user.password_hash):
+        elif not await SecurityService.verify_password_async(
+            password, user.password_hash
+        ):
             return None
         else:
+            if settings.argon2_rehash_on_login and SecurityService.needs_rehash(
+                user.password_hash
+            ):
+                # Upgrade to the current parameters without delaying login
+                schedule_rehash(user.id, password, user.password_hash)
             return user
 
+    @staticmethod
+    async def rehash_password(user_id: int, password: str, old_hash: str):
+        """Replace ``old_hash`` unless the password changed meanwhile."""
+        query = "UPDATE users SET password_hash=%s WHERE id=%s AND password_hash=%s;"
+        try:
+            new_hash = await SecurityService.hash_password_async(password)
+            async with database.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, (new_hash, user_id, old_hash))
+                    if cursor.rowcount:
+                        invalidate_user(user_id)
+                        database.mark_write(user_key(user_id))
+        except Exception:
+            logger.exception("Rehashing password for user %s failed", user_id)
+
     @staticmethod
     async def check_user_exists(email: str):
-        user = await UserService.get_user_by_email(email)
+        user = await UserService.get_user_by_email(email, readonly=False)
 
         if user:
             return True
@@ -161,17 +274,17 @@ class UserService:
     # Services
     @staticmethod
     async def create_user(email: str, password: str) -> UserResponse:
-        password_hash = SecurityService.hash_password(password)
+        password_hash = await SecurityService.hash_password_async(password)
 
         query = "INSERT INTO users (email, password_hash, is_verified) VALUES (%s, %s, %s);"
 
         async with database.get_connection() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 await cursor.execute(query, (email, password_hash, False))
-                await conn.commit()
 
                 # Get the ID of the inserted user
                 user_id = cursor.lastrowid
+                database.mark_write(user_key(user_id), email_key(email))
 
                 # Fetch the complete user record
                 select_query = "SELECT id, email, authenticator_mfa_enabled, created_at, last_login FROM users WHERE id = %s;"
@@ -182,19 +295,39 @@ class UserService:
 
     @staticmethod
     async def get_user_by_id(id: int) -> Union[User, None]:
+        id = int(id)
+        cached = user_cache.get(id)
+        if cached is not None:
+            return cached.model_copy()
+
         query = "SELECT * FROM users WHERE id=%s LIMIT 1;"
+        invalidations = user_cache.invalidations
 
-        async with database.get_connection() as conn:
+        # A lagging replica row would be served for the whole TTL, so fills
+        # come from the primary; replicas only serve uncached reads
+        async with database.get_connection(
+            readonly=not user_cache.enabled, key=user_key(id)
+        ) as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 await cursor.execute(query, id)
                 row = await cursor.fetchone()
-                return User(**row) if row else None
+
+        if not row:
+            return None
+
+        user = User(**row)
+        user_cache.set(id, user, if_unchanged_since=invalidations)
+        return user.model_copy()
 
     @staticmethod
-    async def get_user_by_email(email: str) -> Union[User, None]:
+    async def get_user_by_email(
+        email: str, readonly: bool = True
+    ) -> Union[User, None]:
         query = "SELECT * FROM users WHERE email=%s LIMIT 1;"
 
-        async with database.get_connection() as conn:
+        async with database.get_connection(
+            readonly=readonly, key=email_key(email)
+        ) as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 await cursor.execute(query, email)
                 row = await cursor.fetchone()
@@ -214,9 +347,46 @@ class UserService:
         async with database.get_connection() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(query, values)
-                await conn.commit()
+                invalidate_user(user_id)
+                database.mark_write(user_key(user_id))
+                if "email" in updates:
+                    database.mark_write(email_key(updates["email"]))
                 return cursor.rowcount > 0
 
+    @staticmethod
+    async def get_token_version(user_id: int) -> Optional[int]:
+        cached = token_version_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        query = "SELECT token_version FROM users WHERE id=%s LIMIT 1;"
+        invalidations = token_version_cache.invalidations
+
+        # From the primary; a lagging replica would cache a revoked version
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, (user_id,))
+                row = await cursor.fetchone()
+
+        if not row:
+            return None
+
+        token_version_cache.set(
+            user_id, row[0], if_unchanged_since=invalidations
+        )
+        return row[0]
+
+    @staticmethod
+    async def revoke_access_tokens(user_id: int):
+        """Invalidate every access token issued to the user so far."""
+        query = "UPDATE users SET token_version = token_version + 1 WHERE id=%s;"
+
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, (user_id,))
+                invalidate_user(user_id)
+                database.mark_write(user_key(user_id))
+
     @staticmethod
     async def delete_user(email: str, password: str):
         query = "DELETE FROM users WHERE id=%s;"
@@ -227,7 +397,8 @@ class UserService:
             async with database.get_connection() as conn:
                 async with conn.cursor() as cursor:
                     await cursor.execute(query, (user.id,))
-                    await conn.commit()
+                    invalidate_user(user.id)
+                    database.mark_write(user_key(user.id), email_key(email))
 
                     await cursor.execute(
                         "SELECT COUNT(*) FROM users WHERE id=%s;", (user.id,)
@@ -256,29 +427,19 @@ class EmailMfaCodeService:
                     ),
                 )
 
-                await conn.commit()
-
                 return code
 
     @staticmethod
     async def verify_email_mfa_code(user_id: int, code: str) -> bool:
-        query = "SELECT code_hash FROM email_mfa_codes WHERE user_id = %s AND code_hash = %s AND expires_at > UTC_TIMESTAMP();"
+        # Consuming the code is the check: of concurrent requests with the
+        # same code only one deletes the row
+        query = "DELETE FROM email_mfa_codes WHERE user_id = %s AND code_hash = %s AND expires_at > UTC_TIMESTAMP();"
         async with database.get_connection() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     query, (user_id, SecurityService.hash_token(code))
                 )
-                row = await cursor.fetchone()
-
-                if row:
-                    # Delete the used code instead of marking as used
-                    await cursor.execute(
-                        "DELETE FROM email_mfa_codes WHERE user_id = %s AND code_hash = %s",
-                        (user_id, SecurityService.hash_token(code)),
-                    )
-                    return True
-
-                return False
+                return cursor.rowcount > 0
 
     @staticmethod
     async def delete_mfa_codes(user_id: int):
@@ -287,8 +448,6 @@ class EmailMfaCodeService:
             async with conn.cursor() as cursor:
                 await cursor.execute(query, (user_id,))
 
-                await conn.commit()
-
     # @staticmethod
     # async def regenerate_mfa_code(user_id: int) -> List[str]:
     #     await EmailMfaCodeService.delete_mfa_codes(user_id)
@@ -311,29 +470,18 @@ class RecoveryCodeService:
                         (user_id, SecurityService.hash_token(code)),
                     )
 
-                await conn.commit()
-
                 return codes
 
     @staticmethod
     async def verify_recovery_code(user_id: int, code: str) -> bool:
-        query = "SELECT code_hash FROM recovery_codes WHERE user_id = %s AND code_hash = %s;"
+        # Single use: the request whose DELETE removes the row wins
+        query = "DELETE FROM recovery_codes WHERE user_id = %s AND code_hash = %s;"
         async with database.get_connection() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     query, (user_id, SecurityService.hash_token(code))
                 )
-                row = await cursor.fetchone()
-
-                if row:
-                    # Delete the used code instead of marking as used
-                    await cursor.execute(
-                        "DELETE FROM recovery_codes WHERE user_id = %s AND code_hash = %s",
-                        (user_id, SecurityService.hash_token(code)),
-                    )
-                    return True
-
-                return False
+                return cursor.rowcount > 0
 
     @staticmethod
     async def delete_recovery_codes(user_id: int):
@@ -342,8 +490,6 @@ class RecoveryCodeService:
             async with conn.cursor() as cursor:
                 await cursor.execute(query, (user_id,))
 
-                await conn.commit()
-
     @staticmethod
     async def regenerate_recovery_codes(user_id: int) -> List[str]:
         await RecoveryCodeService.delete_recovery_codes(user_id)
@@ -361,30 +507,30 @@ class TokenService:
                 await cursor.execute(
                     query, (token.user_id, token.token_hash, token.expires_at)
                 )
-                await conn.commit()
+                database.mark_write(refresh_token_key(token.token_hash))
 
     @staticmethod
     async def get_refresh_token(token: str) -> RefreshToken | None:
         query = "SELECT * FROM refresh_tokens WHERE token_hash=%s;"
+        token_hash = SecurityService.hash_token(token)
 
-        async with database.get_connection() as conn:
+        async with database.get_connection(
+            readonly=True, key=refresh_token_key(token_hash)
+        ) as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(
-                    query, (SecurityService.hash_token(token),)
-                )
+                await cursor.execute(query, (token_hash,))
                 row = await cursor.fetchone()
                 return RefreshToken(**row) if row else None
 
     @staticmethod
     async def delete_refresh_token(token: str, user_id: int):
         query = """DELETE FROM refresh_tokens WHERE token_hash=%s AND user_id=%s;"""
+        token_hash = SecurityService.hash_token(token)
 
         async with database.get_connection() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute(
-                    query, (SecurityService.hash_token(token), user_id)
-                )
-                await conn.commit()
+                await cursor.execute(query, (token_hash, user_id))
+                database.mark_write(refresh_token_key(token_hash))
 
     @staticmethod
     async def delete_expired_refresh_tokens(user_id: int):
@@ -393,7 +539,6 @@ class TokenService:
         async with database.get_connection() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(query, (user_id,))
-                await conn.commit()
 
     @staticmethod
     async def refresh_token(token: str) -> TokenResponse:
@@ -412,12 +557,15 @@ class TokenService:
                 detail="Refresh token is expired",
             )
 
+        user = await UserService.get_user_by_id(refresh_token.user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+
         # You can also rotate the refresh token here if needed
-        (access_token, expiry) = SecurityService.generate_jwt(
-            refresh_token.user_id,
-            timedelta(minutes=settings.access_token_expire_minutes),
-            True,
-        )
+        (access_token, expiry) = generate_access_token(user)
 
         return TokenResponse(access_token=access_token, expires_at=expiry)
 
@@ -436,7 +584,6 @@ class TokenService:
                         token.expires_at,
                     ),
                 )
-                await conn.commit()
 
     @staticmethod
     async def delete_verification_token(user_id: int):
@@ -445,7 +592,6 @@ class TokenService:
         async with database.get_connection() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(query, (user_id))
-                await conn.commit()
 
     @staticmethod
     async def delete_expired_verification_tokens():
@@ -454,7 +600,6 @@ class TokenService:
         async with database.get_connection() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(query)
-                await conn.commit()
 
     @staticmethod
     async def get_verification_token(
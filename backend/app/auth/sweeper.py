@@ -0,0 +1,156 @@
+# app/auth/sweeper.py
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+from app.database import database
+from app.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "auth_expiry_sweeper"
+RUN_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def sweep_conditions(outbox_retention_days: int) -> Dict[str, str]:
+    """WHERE clause selecting the rows to delete, per table."""
+    return {
+        "refresh_tokens": "expires_at <= UTC_TIMESTAMP()",
+        "verification_tokens": "expires_at <= UTC_TIMESTAMP()",
+        "email_mfa_codes": "expires_at <= UTC_TIMESTAMP()",
+        # Finished emails; next_attempt_at holds the last attempt's lease
+        "email_outbox": (
+            "status IN ('sent', 'dead') AND next_attempt_at <= "
+            f"UTC_TIMESTAMP() - INTERVAL {int(outbox_retention_days)} DAY"
+        ),
+    }
+
+
+SWEEPS = sweep_conditions(settings.sweeper_outbox_retention_days)
+
+
+class ExpirySweeper:
+    """Periodically deletes expired tokens and codes, and sent or dead
+    outbox emails past their retention, in small chunks.
+
+    Each ``DELETE ... LIMIT`` commits on its own and the sweeper pauses
+    between chunks, so no statement holds locks for long or produces one
+    large replication event. Every app process runs a sweeper; a MySQL named
+    lock makes only one of them sweep at a time and the others skip the run.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+        self.runs = 0
+        self.skipped = 0
+        self.deleted: Dict[str, int] = {table: 0 for table in SWEEPS}
+        self.seconds = 0.0
+        self.last_run_seconds = 0.0
+        self.run_seconds = Histogram(RUN_BUCKETS)
+
+    async def sweep_table(
+        self, cursor, table: str, batch_size: int, pause: float
+    ) -> int:
+        query = f"DELETE FROM {table} WHERE {SWEEPS[table]} LIMIT %s;"
+        deleted = 0
+
+        while True:
+            await cursor.execute(query, (batch_size,))
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+            await asyncio.sleep(pause)
+
+    async def run_once(
+        self,
+        batch_size: int = settings.sweeper_batch_size,
+        pause: float = settings.sweeper_pause_seconds,
+    ) -> Optional[Dict[str, int]]:
+        """Sweep every table; returns None if another process holds the lock."""
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT GET_LOCK(%s, 0);", (LOCK_NAME,))
+                (acquired,) = await cursor.fetchone()
+                if acquired != 1:
+                    self.skipped += 1
+                    return None
+
+                start = time.perf_counter()
+                deleted = {}
+                try:
+                    for table in SWEEPS:
+                        deleted[table] = await self.sweep_table(
+                            cursor, table, batch_size, pause
+                        )
+                        self.deleted[table] += deleted[table]
+                finally:
+                    released = False
+                    try:
+                        await cursor.execute(
+                            "SELECT RELEASE_LOCK(%s);", (LOCK_NAME,)
+                        )
+                        await cursor.fetchone()
+                        released = True
+                    finally:
+                        if not released:
+                            # The lock lives as long as the session; a pooled
+                            # connection holding it would stop every sweep
+                            conn.close()
+
+                    elapsed = time.perf_counter() - start
+                    self.runs += 1
+                    self.seconds += elapsed
+                    self.last_run_seconds = elapsed
+                    self.run_seconds.observe(elapsed)
+
+        logger.info("Expiry sweep removed %s in %.3fs", deleted, elapsed)
+        return deleted
+
+    async def _loop(self, interval: float):
+        assert self._stop
+        # Spread the first run so restarted workers do not all contend at once
+        delay = random.uniform(0, interval)
+
+        while True:
+            try:
+                await asyncio.wait_for(self._stop.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Expiry sweep failed")
+            delay = interval
+
+    def start(self, interval: float = settings.sweeper_interval_seconds):
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._loop(interval))
+
+    async def stop(self):
+        if self._stop:
+            self._stop.set()
+        if self._task:
+            # A sweep in progress is cancelled; its committed chunks remain
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._stop = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "deleted": dict(self.deleted),
+            "seconds": round(self.seconds, 3),
+            "last_run_seconds": round(self.last_run_seconds, 3),
+        }
+
+
+sweeper = ExpirySweeper()
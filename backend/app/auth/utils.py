@@ -1,25 +1,65 @@
 # app/auth.py
-from jose import JWTError, jwt
-from argon2 import PasswordHasher
+from jose import jwt
+from argon2 import PasswordHasher, extract_parameters
 from datetime import datetime, timedelta
 import datetime as dt
 import string
 import pyotp
 import qrcode
+from qrcode.constants import ERROR_CORRECT_M
 import random
 from io import BytesIO
 import base64
 import secrets
 import hashlib
 from typing import Any, Dict, List, Optional, Tuple, Union
-from cryptography.fernet import Fernet
-from argon2.exceptions import VerifyMismatchError
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
 
+from app.auth.hashing import Argon2Params, build_hasher, load_params
+from app.auth.keyring import mfa_keyring
 from app.auth.schemas import RefreshToken, VerificationToken
+from app.auth.verifier import access_token_verifier
 from app.config import settings
+from app.metrics import registry
+from app.tracing import span
+from app.workers import cpu_pool
 
 
-ph = PasswordHasher()
+# Process-pool workers import this module too, so they load the same file
+ph: PasswordHasher = build_hasher(load_params())
+
+# Timed from the event loop, so this includes waiting for a worker
+password_hashing_seconds = registry.histogram(
+    "password_hashing_seconds",
+    "Argon2 hash and verify time, including worker pool wait.",
+    ("operation",),
+)
+_hash_seconds = password_hashing_seconds.labels("hash")
+_verify_seconds = password_hashing_seconds.labels("verify")
+
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def qr_svg(matrix: List[List[bool]]) -> bytes:
+    """One path of horizontal runs in module units; scales without blur."""
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if row[x]:
+                start = x
+                while x < len(row) and row[x]:
+                    x += 1
+                runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            x += 1
+
+    size = len(matrix)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        'shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(runs)}"/></svg>'
+    ).encode()
 
 
 class SecurityService:
@@ -35,6 +75,47 @@ class SecurityService:
         except VerifyMismatchError:
             return False
 
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """Whether the hash is weaker than what ``ph`` produces.
+
+        A hash with any cost above the current one is kept, so lowering the
+        parameters never downgrades stored hashes.
+        """
+        try:
+            stored = extract_parameters(hashed_password)
+        except InvalidHashError:
+            return False
+        current = (ph.time_cost, ph.memory_cost, ph.parallelism, ph.hash_len)
+        costs = (
+            stored.time_cost,
+            stored.memory_cost,
+            stored.parallelism,
+            stored.hash_len,
+        )
+        if any(s > c for s, c in zip(costs, current)):
+            return False
+        return costs != current or stored.type != ph.type
+
+    @staticmethod
+    def use_hasher_params(params: Optional[Argon2Params]):
+        global ph
+        ph = build_hasher(params)
+
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        with _hash_seconds.time(), span("argon2.hash"):
+            return await cpu_pool.run(SecurityService.hash_password, password)
+
+    @staticmethod
+    async def verify_password_async(
+        plain_password: str, hashed_password: str
+    ) -> bool:
+        with _verify_seconds.time(), span("argon2.verify"):
+            return await cpu_pool.run(
+                SecurityService.verify_password, plain_password, hashed_password
+            )
+
     # MFA handling
     @staticmethod
     def generate_email_mfa_code() -> str:
@@ -47,28 +128,71 @@ class SecurityService:
 
     @staticmethod
     def encrypt_mfa_secret(secret: str) -> str:
-        f = Fernet(settings.mfa_secret_key)
-        return f.encrypt(secret.encode()).decode()
+        with span("mfa.encrypt"):
+            return mfa_keyring.encrypt(secret)
 
     @staticmethod
     def decrypt_mfa_secret(encrypted_secret: str) -> str:
-        f = Fernet(settings.mfa_secret_key)
-        return f.decrypt(encrypted_secret.encode()).decode()
+        with span("mfa.decrypt"):
+            return mfa_keyring.decrypt(encrypted_secret)
 
     @staticmethod
-    def generate_qr_code(email: str, secret: str) -> str:
-        totp_uri = pyotp.totp.TOTP(secret).provisioning_uri(
-            name=email, issuer_name=settings.app_name
-        )
+    def render_qr_code(
+        data: str,
+        format: str = "png",
+        box_size: int = settings.mfa_qr_box_size,
+        border: int = settings.mfa_qr_border,
+    ) -> bytes:
+        if format not in QR_MEDIA_TYPES:
+            raise ValueError(f"Unsupported QR format: {format}")
 
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(totp_uri)
+        qr = qrcode.QRCode(
+            error_correction=ERROR_CORRECT_M, box_size=box_size, border=border
+        )
+        qr.add_data(data)
         qr.make(fit=True)
 
+        if format == "svg":
+            return qr_svg(qr.get_matrix())
+
         img = qr.make_image(fill_color="black", back_color="white")
         buffer = BytesIO()
-        img.save(buffer)
-        return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+        img.save(buffer, optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def generate_qr_code_image(
+        email: str, secret: str, format: str = settings.mfa_qr_format
+    ) -> bytes:
+        totp_uri = pyotp.totp.TOTP(secret).provisioning_uri(
+            name=email, issuer_name=settings.app_name
+        )
+        return SecurityService.render_qr_code(totp_uri, format)
+
+    @staticmethod
+    def generate_qr_code(
+        email: str, secret: str, format: str = settings.mfa_qr_format
+    ) -> str:
+        image = SecurityService.generate_qr_code_image(email, secret, format)
+        return f"data:{QR_MEDIA_TYPES[format]};base64,{base64.b64encode(image).decode()}"
+
+    @staticmethod
+    async def generate_qr_code_async(
+        email: str, secret: str, format: str = settings.mfa_qr_format
+    ) -> str:
+        with span("qr.render"):
+            return await cpu_pool.run(
+                SecurityService.generate_qr_code, email, secret, format
+            )
+
+    @staticmethod
+    async def generate_qr_code_image_async(
+        email: str, secret: str, format: str = settings.mfa_qr_format
+    ) -> bytes:
+        with span("qr.render"):
+            return await cpu_pool.run(
+                SecurityService.generate_qr_code_image, email, secret, format
+            )
 
     @staticmethod
     def verify_totp(secret: str, token: str) -> bool:
@@ -97,33 +221,28 @@ class SecurityService:
         user_id: int,
         expires_delta: timedelta,
         auth: bool,
+        claims: Optional[Dict[str, Any]] = None,
     ) -> Tuple[str, datetime]:
         expiry = datetime.now(dt.timezone.utc) + expires_delta
 
         payload: Dict[str, Any] = {"sub": str(user_id), "auth": auth}
+        if claims:
+            payload.update(claims)
         payload.update({"exp": int(expiry.timestamp())})
         payload.update({"iat": int(datetime.now(dt.timezone.utc).timestamp())})
 
-        return (
-            jwt.encode(
+        with span("jwt.sign"):
+            token = jwt.encode(
                 payload,
                 settings.jwt_access_secret,
                 algorithm=settings.jwt_algorithm,
-            ),
-            expiry,
-        )
+            )
+        return (token, expiry)
 
     @staticmethod
     def decode_jwt(token: str) -> Optional[dict]:
-        try:
-            payload = jwt.decode(
-                token,
-                settings.jwt_access_secret,
-                algorithms=settings.jwt_algorithm,
-            )
-            return payload
-        except JWTError:
-            return None
+        with span("jwt.verify"):
+            return access_token_verifier.decode(token)
 
     @staticmethod
     def generate_secure_token() -> str:
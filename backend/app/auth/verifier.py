@@ -0,0 +1,152 @@
+# app/auth/verifier.py
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from jose import JWTError, jwt
+
+from app.cache import TTLCache
+from app.config import settings
+
+HMAC_ALGORITHMS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+
+class JoseBackend:
+    """Full JOSE validation through python-jose."""
+
+    def __init__(self, secret: str, algorithms: List[str], leeway: int):
+        self.secret = secret
+        self.algorithms = algorithms
+        self.options = {"leeway": leeway}
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            return jwt.decode(
+                token,
+                self.secret,
+                algorithms=self.algorithms,
+                options=self.options,
+            )
+        except JWTError:
+            return None
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class HMACBackend:
+    """Stdlib-only validation for the HS* algorithms this app signs with.
+
+    Checks the signature, ``alg``, ``exp`` and ``nbf``, which is everything
+    python-jose enforces for the tokens issued by SecurityService.
+    """
+
+    def __init__(self, secret: str, algorithms: List[str], leeway: int):
+        unsupported = set(algorithms) - set(HMAC_ALGORITHMS)
+        if unsupported:
+            raise ValueError(
+                f"HMAC JWT backend does not support {sorted(unsupported)}"
+            )
+        self.key = secret.encode()
+        self.algorithms = set(algorithms)
+        self.leeway = leeway
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            signing_input, _, signature = token.rpartition(".")
+            header_segment, _, payload_segment = signing_input.partition(".")
+            header = json.loads(_b64decode(header_segment))
+            algorithm = header.get("alg")
+            if algorithm not in self.algorithms:
+                return None
+
+            expected = hmac.new(
+                self.key, signing_input.encode(), HMAC_ALGORITHMS[algorithm]
+            ).digest()
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                return None
+
+            payload = json.loads(_b64decode(payload_segment))
+            if not isinstance(payload, dict):
+                return None
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+        now = time.time()
+        exp = payload.get("exp")
+        nbf = payload.get("nbf")
+        try:
+            if exp is not None and int(exp) < now - self.leeway:
+                return None
+            if nbf is not None and int(nbf) > now + self.leeway:
+                return None
+        except (ValueError, TypeError):
+            return None
+
+        return payload
+
+
+JWT_BACKENDS = {"jose": JoseBackend, "hmac": HMACBackend}
+
+
+class JWTVerifier:
+    """Decodes access tokens with keys and options resolved once.
+
+    Valid payloads are cached by token digest until the token expires, so a
+    client repeating the same bearer token is only verified once. Rejected
+    tokens are never cached.
+    """
+
+    def __init__(
+        self,
+        secret: str,
+        algorithms: Union[str, List[str]],
+        leeway: int = 0,
+        backend: str = "jose",
+        cache_size: int = 10000,
+    ):
+        if isinstance(algorithms, str):
+            algorithms = [algorithms]
+        if backend not in JWT_BACKENDS:
+            raise ValueError(f"Unknown JWT backend: {backend}")
+
+        self.leeway = leeway
+        self.backend = JWT_BACKENDS[backend](secret, algorithms, leeway)
+        self.cache: TTLCache[bytes, Dict[str, Any]] = TTLCache(
+            cache_size, 0, enabled=cache_size > 0
+        )
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        key = hashlib.sha256(token.encode()).digest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        payload = self.backend.decode(token)
+        if payload is None:
+            return None
+
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = exp + self.leeway - time.time()
+            if ttl > 0:
+                self.cache.set(key, payload, ttl=ttl)
+
+        return dict(payload)
+
+
+access_token_verifier = JWTVerifier(
+    settings.jwt_access_secret,
+    settings.jwt_algorithm,
+    leeway=settings.jwt_leeway_seconds,
+    backend=settings.jwt_backend,
+    cache_size=settings.jwt_cache_size,
+)
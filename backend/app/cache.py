@@ -0,0 +1,102 @@
+# app/cache.py
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds.
+
+    ``invalidations`` counts every invalidation; a reader that captured it
+    before going to the database can pass it to ``set`` so a value read
+    concurrently with a write is not cached after the write invalidated it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, enabled: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> Optional[V]:
+        if not self.enabled:
+            return None
+
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        key: K,
+        value: V,
+        ttl: Optional[float] = None,
+        if_unchanged_since: Optional[int] = None,
+    ):
+        if not self.enabled:
+            return
+        if (
+            if_unchanged_since is not None
+            and if_unchanged_since != self.invalidations
+        ):
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, key: K, func: Callable[[V], V]):
+        """Replace a cached value with ``func(value)``, keeping its expiry.
+
+        Unlike ``invalidate`` this leaves ``invalidations`` alone, so fills
+        in flight for other keys still land.
+        """
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data[key] = (entry[0], func(entry[1]))
+
+    def invalidate(self, key: K):
+        self.invalidations += 1
+        self._data.pop(key, None)
+
+    def clear(self):
+        self.invalidations += 1
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -19,22 +19,161 @@ class Settings:
     jwt_access_secret: str = get_env("JWT_ACCESS_SECRET")
     jwt_refresh_secret: str = get_env("JWT_REFRESH_SECRET")
     jwt_algorithm: str = get_env("JWT_ALGORITHM")
+    jwt_backend: str = os.getenv("JWT_BACKEND", "jose")
+    jwt_leeway_seconds: int = int(os.getenv("JWT_LEEWAY_SECONDS", "0"))
+    jwt_cache_size: int = int(os.getenv("JWT_CACHE_SIZE", "10000"))
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
     temp_login_expire_minutes: int = 5
     reset_pw_expire_hours: int = 1
     verify_email_expire_day: int = 1
+    # Access tokens carry the claims get_current_principal needs
+    stateless_access_tokens: bool = (
+        os.getenv("STATELESS_ACCESS_TOKENS") == "True"
+    )
+    token_version_cache_ttl_seconds: float = 5
 
     # MFA
     mfa_secret_key: str = get_env("MFA_ENCRYPTION_KEY")
+    mfa_retired_keys: List[str] = [
+        key.strip()
+        for key in os.getenv("MFA_RETIRED_KEYS", "").split(",")
+        if key.strip()
+    ]
+    mfa_rekey_batch_size: int = 500
+    mfa_rekey_pause_seconds: float = 0.1
+    mfa_qr_format: str = os.getenv("MFA_QR_FORMAT", "png")
+    mfa_qr_box_size: int = 4
+    mfa_qr_border: int = 4  # Quiet zone required by the QR spec
+    mfa_qr_inline: bool = os.getenv("MFA_QR_INLINE", "True") == "True"
+    mfa_qr_max_age_seconds: int = 300
     email_mfa_expire_minutes: int = 5
 
     # Database
     database_url: str = get_env("DATABASE_URL")
     host: str = get_env("MYSQL_HOST")
+    port: int = int(os.getenv("MYSQL_PORT", "3306"))
     user: str = get_env("MYSQL_USER")
     password: str = get_env("MYSQL_PASSWORD")
     db: str = get_env("MYSQL_DATABASE")
+    db_pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+    db_pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+    db_pool_acquire_timeout_seconds: float = float(
+        os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10")
+    )
+    # Close connections older than this, e.g. ahead of a proxy's own limit
+    db_pool_recycle_seconds: float = float(os.getenv("DB_POOL_RECYCLE", "3600"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+    db_pool_pre_ping_idle_seconds: float = 30
+    # Off runs each statement of a handler on its own pooled connection
+    db_unit_of_work: bool = os.getenv("DB_UNIT_OF_WORK", "True") == "True"
+    # Comma-separated host[:port] list; same credentials as the primary
+    replica_hosts: List[str] = [
+        host.strip()
+        for host in os.getenv("MYSQL_REPLICA_HOSTS", "").split(",")
+        if host.strip()
+    ]
+    replica_health_check_seconds: float = 10
+    # Longer than the worst replication lag we accept
+    db_read_your_writes_seconds: float = float(
+        os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5")
+    )
+
+    # Caching
+    user_cache_enabled: bool = os.getenv("USER_CACHE_ENABLED", "True") == "True"
+    user_cache_size: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    user_cache_ttl_seconds: float = 30
+
+    # Expiry sweeper
+    sweeper_enabled: bool = os.getenv("SWEEPER_ENABLED", "True") == "True"
+    sweeper_interval_seconds: float = float(
+        os.getenv("SWEEPER_INTERVAL_SECONDS", "300")
+    )
+    sweeper_batch_size: int = 1000
+    sweeper_pause_seconds: float = 0.05
+    sweeper_outbox_retention_days: int = int(
+        os.getenv("SWEEPER_OUTBOX_RETENTION_DAYS", "7")
+    )
+
+    # last_login write-behind; False writes on every login
+    last_login_write_behind: bool = (
+        os.getenv("LAST_LOGIN_WRITE_BEHIND", "True") == "True"
+    )
+    last_login_flush_seconds: float = float(
+        os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5")
+    )
+    last_login_batch_size: int = 500
+    # Flush early at half of this; beyond it the oldest entries are dropped
+    last_login_max_pending: int = 5000
+
+    # Tracing. Server-Timing shows clients per-step timings (e.g. whether a
+    # password was checked), so keep it off where that matters
+    server_timing: bool = os.getenv("SERVER_TIMING", "False") == "True"
+    trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    trace_export_path: str = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+    trace_export_max_bytes: int = 10 * 1024 * 1024
+    trace_export_backups: int = 5
+
+    # Rate limiting: "<endpoint>:<ip|account>=<limit>/<seconds>" pairs
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "True") == "True"
+    rate_limits: str = os.getenv(
+        "RATE_LIMITS",
+        "login:ip=20/60,login:account=10/300,"
+        "forgot_password:ip=5/60,forgot_password:account=3/900,"
+        "send_email_mfa_code:ip=10/60,send_email_mfa_code:account=3/300,"
+        "verify_email_mfa:ip=20/60,verify_email_mfa:account=5/300,"
+        "verify_recovery_code:ip=10/60,verify_recovery_code:account=5/900",
+    )
+    rate_limit_max_keys: int = 100000
+    # Proxy addresses or CIDR networks whose X-Forwarded-For is trusted.
+    # "*" trusts any peer: only for a backend reachable solely via nginx
+    trusted_proxies: List[str] = [
+        ip.strip()
+        for ip in os.getenv("TRUSTED_PROXIES", "").split(",")
+        if ip.strip()
+    ]
+
+    # Admission control: "<path>=<concurrency>/<queue>" pairs. Excess
+    # requests wait up to the timeout, then get 503 with Retry-After
+    admission_control_enabled: bool = (
+        os.getenv("ADMISSION_CONTROL_ENABLED", "True") == "True"
+    )
+    admission_limits: str = os.getenv(
+        "ADMISSION_LIMITS",
+        "/auth/login=16/64,/auth/register=8/32,/auth/reset-password=4/16,"
+        "/auth/forgot-password=4/16,/auth/send-verification=4/16,"
+        "/auth/send-email-mfa-code=4/16",
+    )
+    admission_queue_timeout: float = float(
+        os.getenv("ADMISSION_QUEUE_TIMEOUT", "2")
+    )
+    admission_retry_after: float = 1
+    # Adaptive per-route limits on the auth router, adjusted from latency
+    # and database pool wait (AIMD). When enabled they replace the tuned
+    # ADMISSION_LIMITS gates on the routes they cover, so keep this off
+    # until the adaptive limits are validated under load
+    adaptive_concurrency_enabled: bool = (
+        os.getenv("ADAPTIVE_CONCURRENCY_ENABLED", "False") == "True"
+    )
+    adaptive_initial_limit: int = int(os.getenv("ADAPTIVE_INITIAL_LIMIT", "20"))
+    adaptive_min_limit: int = int(os.getenv("ADAPTIVE_MIN_LIMIT", "2"))
+    adaptive_max_limit: int = int(os.getenv("ADAPTIVE_MAX_LIMIT", "200"))
+    adaptive_latency_tolerance: float = 2.0
+    adaptive_backoff: float = 0.9
+    adaptive_max_pool_wait_seconds: float = 0.05
+    adaptive_queue_size: int = int(os.getenv("ADAPTIVE_QUEUE_SIZE", "16"))
+
+    # Event loop lag monitor; stalls over the threshold are captured with
+    # the blocking stack and the request being served
+    loop_monitor_enabled: bool = os.getenv("LOOP_MONITOR_ENABLED", "True") == "True"
+    loop_monitor_interval_seconds: float = 0.05
+    loop_stall_threshold_ms: float = float(
+        os.getenv("LOOP_STALL_THRESHOLD_MS", "100")
+    )
+    loop_stall_history: int = 50
+
+    # Prometheus metrics at /metrics
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "True") == "True"
 
     # CORS
     allowed_origins: List[str] = get_env("ALLOWED_ORIGINS")
@@ -47,6 +186,53 @@ class Settings:
     # Email
     email: str = get_env("SUPPORT_EMAIL")
     email_pw: str = get_env("SUPPORT_EMAIL_PASSWORD")
+    smtp_host: str = os.getenv("SMTP_HOST", "mail.privateemail.com")
+    smtp_port: int = int(os.getenv("SMTP_PORT", "465"))
+    smtp_use_ssl: bool = os.getenv("SMTP_SSL", "True") == "True"
+    smtp_timeout_seconds: float = 10
+    smtp_pool_size: int = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    smtp_idle_timeout_seconds: float = 120
+    smtp_noop_after_seconds: float = 15
+
+    # Email outbox
+    email_outbox_workers: int = int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))
+    email_outbox_batch_size: int = 10
+    email_outbox_poll_seconds: float = 5
+    # Covers a whole batch at its slowest: every message connecting and
+    # sending twice (one reconnect) at the SMTP timeout, plus a minute for
+    # a pool slot
+    email_outbox_lease_seconds: int = int(
+        email_outbox_batch_size * smtp_timeout_seconds * 4 + 60
+    )
+    email_max_attempts: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+    email_retry_base_seconds: float = 30
+    email_retry_max_seconds: float = 3600
+
+    # Argon2, calibrated with app/auth/hashing.py; without a params file
+    # argon2-cffi's defaults apply. A relative path is taken from backend/
+    argon2_params_path: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        os.getenv("ARGON2_PARAMS_PATH", "data/argon2_params.json"),
+    )
+    argon2_calibrate_on_startup: bool = (
+        os.getenv("ARGON2_CALIBRATE_ON_STARTUP", "False") == "True"
+    )
+    argon2_target_ms: float = float(os.getenv("ARGON2_TARGET_MS", "250"))
+    # Memory budget and parallelism may not go below argon2-cffi's defaults
+    argon2_max_memory_kib: int = int(
+        os.getenv("ARGON2_MAX_MEMORY_KIB", "65536")
+    )
+    argon2_parallelism: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+    argon2_rehash_on_login: bool = (
+        os.getenv("ARGON2_REHASH_ON_LOGIN", "True") == "True"
+    )
+
+    # Workers (argon2-cffi releases the GIL, so threads scale across cores)
+    worker_pool_kind: str = os.getenv("WORKER_POOL_KIND", "thread")
+    worker_pool_size: int = int(
+        os.getenv("WORKER_POOL_SIZE", str(os.cpu_count() or 1))
+    )
+    worker_queue_size: int = int(os.getenv("WORKER_QUEUE_SIZE", "64"))
 
 
 settings = Settings()
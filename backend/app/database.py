@@ -1,38 +1,341 @@
 # app/database.py
+import asyncio
+import logging
+import time
+import weakref
+from contextvars import ContextVar
 import aiomysql
-from aiomysql import Pool
+from aiomysql import Connection, Pool
 from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from app.cache import TTLCache
 from app.config import settings
+from app.metrics import Histogram
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Set once the current request (task context) has written through the primary
+_wrote_in_context: ContextVar[bool] = ContextVar("wrote_in_context", default=False)
+
+
+class UnitOfWork:
+    """One primary connection and transaction shared by a block of service
+    calls. The connection is only acquired by the first query."""
+
+    def __init__(self):
+        self.conn: Optional[Connection] = None
+        self.on_commit: List[Callable[[], None]] = []
+
+
+_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar(
+    "unit_of_work", default=None
+)
+
+
+class PoolTimeoutError(Exception):
+    """No connection became free within the acquire timeout."""
+
+
+def parse_host(value: str) -> Tuple[str, int]:
+    host, _, port = value.strip().partition(":")
+    return host, int(port or 3306)
+
+
+async def create_pool(host: str, port: int = 3306) -> Pool:
+    return await aiomysql.create_pool(
+        host=host,
+        port=port,
+        user=settings.user,
+        password=settings.password,
+        db=settings.db,
+        minsize=settings.db_pool_min_size,
+        maxsize=settings.db_pool_max_size,
+        autocommit=True,  # Updates across pool
+    )
+
+
+class Replica:
+    def __init__(self, host: str, port: int, pool: Optional[Pool] = None):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.healthy = pool is not None
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
 
 
 class Database:
+    """Primary pool plus optional read replicas.
+
+    ``get_connection(readonly=True, key=...)`` reads from a healthy replica
+    in round-robin order, except when the current request has already
+    written or ``key`` was written by this process within the read-your-writes
+    window; those reads, and any read a replica fails to serve, go to the
+    primary.
+    """
+
     def __init__(self):
         self.pool: Pool
+        self.replicas: List[Replica] = []
+        self._next_replica = 0
+        self._recent_writes: TTLCache[str, bool] = TTLCache(
+            10000, settings.db_read_your_writes_seconds
+        )
+        self._health_task: Optional[asyncio.Task] = None
+        self.replica_reads = 0
+        self.replica_fallbacks = 0
+        self.acquire_wait = Histogram()
+        self.waiters = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        # Open time per connection; aiomysql's pool_recycle only bounds idle time
+        self._opened: "weakref.WeakKeyDictionary[Connection, float]" = (
+            weakref.WeakKeyDictionary()
+        )
 
     async def connect(self):
-        self.pool = await aiomysql.create_pool(
-            host=settings.host,
-            user=settings.user,
-            password=settings.password,
-            db=settings.db,
-            minsize=5,
-            maxsize=20,
-            autocommit=True,  # Updates across pool
-        )
+        self.pool = await create_pool(settings.host, settings.port)
+
+        self.replicas = []
+        for value in settings.replica_hosts:
+            replica = Replica(*parse_host(value))
+            try:
+                replica.pool = await create_pool(replica.host, replica.port)
+                replica.healthy = True
+            except Exception:
+                # Serve from the primary until the health check reconnects
+                logger.exception("Replica %s unavailable", replica.name)
+            self.replicas.append(replica)
+
+        if self.replicas:
+            self._health_task = asyncio.create_task(self._health_loop())
 
     async def disconnect(self):
-        if self.pool:
-            self.pool.close()
-            await self.pool.wait_closed()
+        if self._health_task:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+        pools = [self.pool] + [r.pool for r in self.replicas if r.pool]
+        for pool in pools:
+            pool.close()
+            await pool.wait_closed()
+
+    # Replicas
+    def mark_write(self, *keys: str):
+        """Send this request's later reads, and reads of ``keys`` by any
+        request in this process for the next few seconds, to the primary."""
+        _wrote_in_context.set(True)
+        for key in keys:
+            self._recent_writes.set(key, True)
+
+    def _pick_replica(self, key: Optional[str]) -> Optional[Replica]:
+        if _wrote_in_context.get():
+            return None
+        if key is not None and self._recent_writes.get(key):
+            return None
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next_replica % len(self.replicas)]
+            self._next_replica += 1
+            if replica.healthy:
+                return replica
+        return None
+
+    async def check_replica(self, replica: Replica):
+        try:
+            if replica.pool is None:
+                replica.pool = await create_pool(replica.host, replica.port)
+            async with replica.pool.acquire() as conn:
+                await asyncio.wait_for(
+                    conn.ping(reconnect=False),
+                    settings.db_pool_acquire_timeout_seconds,
+                )
+            if not replica.healthy:
+                logger.info("Replica %s is healthy again", replica.name)
+            replica.healthy = True
+        except Exception:
+            if replica.healthy:
+                logger.warning("Replica %s failed its health check", replica.name)
+            replica.healthy = False
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(settings.replica_health_check_seconds)
+            await asyncio.gather(
+                *(self.check_replica(replica) for replica in self.replicas)
+            )
+
+    async def _checkout(self, pool: Pool) -> Connection:
+        while True:
+            conn = await asyncio.wait_for(
+                pool.acquire(), settings.db_pool_acquire_timeout_seconds
+            )
+            now = time.monotonic()
+            opened = self._opened.setdefault(conn, now)
+
+            if now - opened > settings.db_pool_recycle_seconds:
+                self.recycled += 1
+            elif (
+                settings.db_pool_pre_ping
+                and conn.loop.time() - conn.last_usage
+                > settings.db_pool_pre_ping_idle_seconds
+            ):
+                try:
+                    await conn.ping(reconnect=False)
+                    return conn
+                except Exception:
+                    self.ping_failures += 1
+                    logger.warning("Dropping dead MySQL connection")
+            else:
+                return conn
+
+            conn.close()
+            await pool.release(conn)
+
+    async def _acquire(self, pool: Pool) -> Connection:
+        start = time.perf_counter()
+        self.waiters += 1
+        try:
+            conn = await self._checkout(pool)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeoutError(
+                f"No database connection free after {settings.db_pool_acquire_timeout_seconds}s"
+            )
+        finally:
+            self.waiters -= 1
+            self.acquire_wait.observe(time.perf_counter() - start)
+        self.acquired += 1
+        return conn
 
     @asynccontextmanager
-    async def get_connection(self):
-        async with self.pool.acquire() as conn:
+    async def unit_of_work(self):
+        """Run every get_connection() in the block on one connection, in one
+        transaction committed when the block exits cleanly.
+
+        Used as ``async with`` inside handlers rather than as a yield
+        dependency, because FastAPI 0.104 runs dependency teardown after the
+        response has been sent. Nested blocks join the outer one. Service
+        calls inside the block must not run concurrently.
+        """
+        if _unit_of_work.get() is not None or not settings.db_unit_of_work:
+            yield
+            return
+
+        uow = UnitOfWork()
+        token = _unit_of_work.set(uow)
+        try:
+            yield
+            if uow.conn:
+                await uow.conn.commit()
+        except BaseException:
+            if uow.conn:
+                await uow.conn.rollback()
+            raise
+        finally:
+            _unit_of_work.reset(token)
+            if uow.conn:
+                await self.pool.release(uow.conn)
+
+        for callback in uow.on_commit:
+            callback()
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run ``callback`` again once the current unit of work commits; a
+        no-op outside one, where every statement commits on its own."""
+        uow = _unit_of_work.get()
+        if uow is not None:
+            uow.on_commit.append(callback)
+
+    @asynccontextmanager
+    async def get_connection(
+        self, readonly: bool = False, key: Optional[str] = None
+    ):
+        uow = _unit_of_work.get()
+        if uow is not None:
+            if uow.conn is None:
+                with span("db.acquire"):
+                    uow.conn = await self._acquire(self.pool)
+                await uow.conn.begin()
+            # The unit of work commits or rolls back as a whole
+            with span("db"):
+                yield uow.conn
+            return
+
+        pool = self.pool
+        conn = None
+
+        replica = self._pick_replica(key) if readonly else None
+        if replica and replica.pool:
             try:
-                yield conn
+                with span("db.acquire"):
+                    conn = await self._acquire(replica.pool)
+                pool = replica.pool
+                self.replica_reads += 1
             except Exception:
+                logger.warning(
+                    "Replica %s failed, reading from primary", replica.name
+                )
+                replica.healthy = False
+                self.replica_fallbacks += 1
+
+        if conn is None:
+            with span("db.acquire"):
+                conn = await self._acquire(pool)
+
+        try:
+            with span("db"):
+                yield conn
+        except Exception:
+            # A caller may have closed a connection it could not clean up
+            if not conn.closed:
                 await conn.rollback()
-                raise
+            raise
+        finally:
+            await pool.release(conn)
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        ages = [now - opened for opened in self._opened.values()]
+
+        return {
+            "min_size": self.pool.minsize,
+            "max_size": self.pool.maxsize,
+            "size": self.pool.size,
+            "in_use": self.pool.size - self.pool.freesize,
+            "idle": self.pool.freesize,
+            "waiters": self.waiters,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled,
+            "ping_failures": self.ping_failures,
+            "replica_reads": self.replica_reads,
+            "replica_fallbacks": self.replica_fallbacks,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "size": replica.pool.size if replica.pool else 0,
+                    "in_use": (
+                        replica.pool.size - replica.pool.freesize
+                        if replica.pool
+                        else 0
+                    ),
+                }
+                for replica in self.replicas
+            ],
+            "acquire_wait_seconds": self.acquire_wait.snapshot(),
+            "connection_age_seconds": {
+                "max": round(max(ages, default=0.0), 3),
+                "avg": round(sum(ages) / len(ages), 3) if ages else 0.0,
+            },
+        }
 
 
 database = Database()
@@ -1,9 +1,15 @@
-from fastapi import Depends, HTTPException, status
+import ipaddress
+from functools import lru_cache
+from typing import List, Tuple, Union
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from app.auth.schemas import User
+from app.auth.schemas import Principal, User
 from app.auth.services import UserService
 from app.auth.utils import SecurityService
+from app.config import settings
+from app.ratelimit import check_rate_limit
 
 security = HTTPBearer()
 
@@ -30,9 +36,55 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
         )
 
+    # The version cache is short-lived, unlike the cached user row. Tokens
+    # issued before the claim existed count as version 0, so sessions survive
+    # the upgrade until they expire unless the user's tokens were revoked
+    if await UserService.get_token_version(user.id) != payload.get("tv", 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+        )
+
     return user
 
 
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> Principal:
+    """Like get_current_user, but for handlers that only need the claims.
+
+    In stateless mode the principal is built from the token itself and only
+    the cached token version is checked; otherwise the user row is loaded.
+    """
+    payload = SecurityService.decode_jwt(credentials.credentials)
+
+    if (
+        settings.stateless_access_tokens
+        and payload is not None
+        and payload.get("sub")
+        and payload.get("auth")
+        and "email" in payload
+        and "tv" in payload
+    ):
+        user_id = int(payload["sub"])
+        if await UserService.get_token_version(user_id) != payload.get("tv"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+            )
+
+        return Principal(
+            id=user_id,
+            email=payload["email"],
+            is_verified=payload["verified"],
+            authenticator_mfa_enabled=payload["mfa"],
+            token_version=payload["tv"],
+        )
+
+    user = await get_current_user(credentials)
+    return Principal.model_validate(user)
+
+
 async def get_user_pending_mfa(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> User:
@@ -61,3 +113,51 @@ async def get_user_pending_mfa(
         )
 
     return user
+
+
+@lru_cache(maxsize=8)
+def proxy_networks(
+    trusted: Tuple[str, ...],
+) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    return [
+        ipaddress.ip_network(entry, strict=False)
+        for entry in trusted
+        if entry != "*"
+    ]
+
+
+def is_trusted_proxy(ip: str, trusted: List[str]) -> bool:
+    """Whether ``ip`` is one of, or inside one of, the trusted entries."""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in proxy_networks(tuple(trusted)))
+
+
+def client_ip(request: Request) -> str:
+    """The caller's address, taken from X-Forwarded-For only when the
+    connection comes from a trusted proxy (TRUSTED_PROXIES)."""
+    peer = request.client.host if request.client else ""
+    trusted = settings.trusted_proxies
+    any_proxy = "*" in trusted
+    if not trusted or not (any_proxy or is_trusted_proxy(peer, trusted)):
+        return peer
+
+    # The rightmost address a trusted proxy did not add is the client
+    forwarded = request.headers.get("x-forwarded-for", "")
+    for ip in reversed([ip.strip() for ip in forwarded.split(",") if ip.strip()]):
+        if any_proxy or not is_trusted_proxy(ip, trusted):
+            return ip
+    return peer
+
+
+def limit_by_ip(endpoint: str):
+    """Dependency applying the ``<endpoint>:ip`` rate limit. Add it to the
+    route's ``dependencies`` so it runs before the other dependencies."""
+    rule_name = f"{endpoint}:ip"
+
+    async def dependency(request: Request):
+        check_rate_limit(rule_name, client_ip(request))
+
+    return dependency
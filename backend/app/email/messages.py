@@ -1,38 +1,20 @@
-from app.email.service import HtmlMessage
+from app.email.service import TemplateMessage
 
 
-def load_email_template(template_path):
-    with open(template_path, "r") as f:
-        return f.read()
-
-
-class ResetPasswordMessage(HtmlMessage):
+class ResetPasswordMessage(TemplateMessage):
     def __init__(self, reset_url: str) -> None:
-        super().__init__()
-        html_template = load_email_template(
-            "app/email/templates/reset_password.html"
-        )
-        body = html_template.replace("{{RESET_URL}}", reset_url)
-        self.msg = body
+        super().__init__("reset_password", {"RESET_URL": reset_url})
 
 
-class VerifyEmailMessage(HtmlMessage):
+class VerifyEmailMessage(TemplateMessage):
     def __init__(self, verification_url: str) -> None:
-        super().__init__()
-        html_template = load_email_template(
-            "app/email/templates/verify_email.html"
+        super().__init__(
+            "verify_email", {"VERIFICATION_URL": verification_url}
         )
-        body = html_template.replace("{{VERIFICATION_URL}}", verification_url)
-        self.msg = body
 
 
-class MfaEmailMessage(HtmlMessage):
+class MfaEmailMessage(TemplateMessage):
     def __init__(self, verification_code: str) -> None:
-        super().__init__()
-        html_template = load_email_template(
-            "app/email/templates/mfa_code.html"
-        )
-        body = html_template.replace(
-            "{{VERIFICATION_CODE}}", verification_code
+        super().__init__(
+            "mfa_code", {"VERIFICATION_CODE": verification_code}
         )
-        self.msg = body
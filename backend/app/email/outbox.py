@@ -0,0 +1,206 @@
+# app/email/outbox.py
+import asyncio
+import logging
+import random
+from typing import List, Optional
+
+import aiomysql
+from pydantic import BaseModel
+
+from app.config import settings
+from app.database import database
+from app.email.smtp import smtp_pool
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+email_batch_seconds = registry.histogram(
+    "email_send_batch_seconds",
+    "Time to send one outbox batch over a pooled SMTP session.",
+).labels()
+emails_sent = registry.counter(
+    "emails_sent_total", "Outbox emails accepted by the SMTP server."
+).labels()
+email_failures = registry.counter(
+    "email_send_failures_total", "Outbox email send attempts that failed."
+).labels()
+
+
+class OutboxEmail(BaseModel):
+    id: int
+    recipient: str
+    message: str
+    attempts: int
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given number of failures."""
+    delay = settings.email_retry_base_seconds * 2 ** (attempts - 1)
+    delay = min(delay, settings.email_retry_max_seconds)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class EmailOutbox:
+    """Durable queue of outgoing email drained by in-process workers.
+
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED`` and leased by pushing
+    ``next_attempt_at`` forward, so several app processes can share the table
+    and a message claimed by a crashed worker is picked up again. Claiming
+    counts as an attempt, so a message that keeps taking its worker down
+    still ends up dead-lettered after ``EMAIL_MAX_ATTEMPTS``.
+    """
+
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def enqueue(self, recipient: str, message: str) -> int:
+        query = "INSERT INTO email_outbox (recipient, message, next_attempt_at) VALUES (%s, %s, UTC_TIMESTAMP());"
+
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, (recipient, message))
+                email_id = cursor.lastrowid
+
+        if self._wakeup:
+            # Inside a unit of work the row is only visible after commit
+            self._wakeup.set()
+            database.after_commit(self._wakeup.set)
+
+        return email_id
+
+    async def claim(self, limit: int) -> List[OutboxEmail]:
+        select_query = """
+            SELECT id, recipient, message, attempts FROM email_outbox
+            WHERE status IN ('pending', 'sending') AND next_attempt_at <= UTC_TIMESTAMP()
+            ORDER BY next_attempt_at LIMIT %s FOR UPDATE SKIP LOCKED;
+        """
+
+        async with database.get_connection() as conn:
+            await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(select_query, (limit,))
+                rows = await cursor.fetchall()
+
+                # Out of attempts while leased: the worker never reported back
+                exhausted = [
+                    row["id"]
+                    for row in rows
+                    if row["attempts"] >= settings.email_max_attempts
+                ]
+                if exhausted:
+                    placeholders = ", ".join(["%s"] * len(exhausted))
+                    await cursor.execute(
+                        f"UPDATE email_outbox SET status='dead', last_error='Lease expired on the last attempt', message=NULL WHERE id IN ({placeholders});",
+                        exhausted,
+                    )
+                    logger.error("Emails %s moved to dead letter", exhausted)
+
+                rows = [row for row in rows if row["id"] not in exhausted]
+                if rows:
+                    ids = [row["id"] for row in rows]
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    await cursor.execute(
+                        f"UPDATE email_outbox SET status='sending', attempts=attempts + 1, next_attempt_at=UTC_TIMESTAMP() + INTERVAL %s SECOND WHERE id IN ({placeholders});",
+                        [settings.email_outbox_lease_seconds] + ids,
+                    )
+            await conn.commit()
+
+        return [
+            OutboxEmail(**{**row, "attempts": row["attempts"] + 1}) for row in rows
+        ]
+
+    async def mark_sent(self, email_ids: List[int]):
+        placeholders = ", ".join(["%s"] * len(email_ids))
+        # The body holds reset links and codes; drop it once it is delivered
+        query = f"UPDATE email_outbox SET status='sent', sent_at=UTC_TIMESTAMP(), last_error=NULL, message=NULL WHERE id IN ({placeholders});"
+
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, email_ids)
+
+    async def mark_failed(self, email: OutboxEmail, error: str):
+        # The claim already counted this attempt
+        attempts = email.attempts
+
+        if attempts >= settings.email_max_attempts:
+            query = "UPDATE email_outbox SET status='dead', last_error=%s, message=NULL WHERE id=%s;"
+            values = (error, email.id)
+            logger.error("Email %s moved to dead letter: %s", email.id, error)
+        else:
+            query = "UPDATE email_outbox SET status='pending', last_error=%s, next_attempt_at=UTC_TIMESTAMP() + INTERVAL %s SECOND WHERE id=%s;"
+            values = (error, int(retry_delay(attempts)), email.id)
+
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, values)
+
+    async def deliver(self, emails: List[OutboxEmail]):
+        # One pooled SMTP session carries the whole batch
+        with email_batch_seconds.time():
+            errors = await asyncio.to_thread(
+                smtp_pool.send_batch,
+                [(email.recipient, email.message) for email in emails],
+            )
+
+        sent = []
+        for email, error in zip(emails, errors):
+            if error is None:
+                sent.append(email.id)
+            else:
+                email_failures.inc()
+                logger.warning("Sending email %s failed: %r", email.id, error)
+                await self.mark_failed(email, repr(error))
+
+        if sent:
+            emails_sent.inc(len(sent))
+            await self.mark_sent(sent)
+
+    async def process_batch(self) -> int:
+        emails = await self.claim(settings.email_outbox_batch_size)
+        if emails:
+            await self.deliver(emails)
+        return len(emails)
+
+    async def _worker(self):
+        assert self._wakeup
+        while not self._stopping:
+            try:
+                if await self.process_batch():
+                    continue
+            except Exception:
+                logger.exception("Email outbox worker failed")
+
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), settings.email_outbox_poll_seconds
+                )
+            except asyncio.TimeoutError:
+                await asyncio.to_thread(smtp_pool.prune)
+            self._wakeup.clear()
+
+    def start(self, workers: int = settings.email_outbox_workers):
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(workers)
+        ]
+
+    async def stop(self, timeout: float = 10):
+        # Let in-flight sends finish so leased rows are not re-sent on restart
+        self._stopping = True
+        if self._wakeup:
+            self._wakeup.set()
+
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        self._tasks = []
+        self._wakeup = None
+
+
+outbox = EmailOutbox()
@@ -0,0 +1,148 @@
+# app/email/renderer.py
+import html
+import os
+import re
+from email import policy
+from email.header import Header
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+# Header fields filled in per message inside the cached MIME skeleton
+TO_FIELD = "__TO__"
+SUBJECT_FIELD = "__SUBJECT__"
+HTML_SUFFIX = "__HTML"
+
+
+class SplitTemplate:
+    """A string pre-split on ``{{NAME}}`` placeholders.
+
+    ``parts`` alternates literal text and field names, so rendering is one
+    ``join`` over the parts regardless of how many placeholders there are.
+    """
+
+    def __init__(self, source: str):
+        self.parts: List[str] = PLACEHOLDER.split(source)
+        self.fields = set(self.parts[1::2])
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+
+def html_to_text(source: str) -> str:
+    """Plain-text alternative for an HTML email, keeping link targets."""
+    text = re.sub(r"(?is)<(head|style|script)\b.*?</\1>", "", source)
+    text = re.sub(
+        r'(?is)<a\b[^>]*href="([^"]*)"[^>]*>(.*?)</a>', r"\2: \1", text
+    )
+    text = re.sub(r"(?i)<br\s*/?>|</(p|div|h[1-6]|li|tr)>", "\n", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = html.unescape(text)
+
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    text = "\n".join(line for line in lines if line)
+    return text + "\n"
+
+
+def header_value(value: str) -> str:
+    if "\r" in value or "\n" in value:
+        raise ValueError("Header values must not contain line breaks")
+    if value.isascii():
+        return value
+    return Header(value, "utf-8").encode()
+
+
+class EmailTemplate:
+    def __init__(self, name: str, source: str, mtime: float):
+        self.name = name
+        self.mtime = mtime
+        text_source = html_to_text(source)
+        self.html = SplitTemplate(source)
+        self.text = SplitTemplate(text_source)
+        self.mime = SplitTemplate(self._build_skeleton(source, text_source))
+
+    def _build_skeleton(self, source: str, text_source: str) -> str:
+        # Built once with the email package; 8bit keeps the placeholders
+        # verbatim so the serialized message can be filled in directly.
+        # HTML placeholders get a suffix so they can be given escaped values.
+        html_source = PLACEHOLDER.sub(rf"{{{{\1{HTML_SUFFIX}}}}}", source)
+
+        msg = EmailMessage()
+        msg.set_content(text_source, cte="8bit")
+        msg.add_alternative(html_source, subtype="html", cte="8bit")
+
+        headers = (
+            f"From: {header_value(settings.email)}\r\n"
+            f"To: {{{{{TO_FIELD}}}}}\r\n"
+            f"Subject: {{{{{SUBJECT_FIELD}}}}}\r\n"
+        )
+        return headers + msg.as_bytes(policy=policy.SMTP).decode("utf-8")
+
+    def render_html(self, values: Dict[str, str]) -> str:
+        return self.html.render(_escaped(values))
+
+    def render_text(self, values: Dict[str, str]) -> str:
+        return self.text.render(values)
+
+    def render_mime(
+        self, recipient: str, subject: str, values: Dict[str, str]
+    ) -> str:
+        """Serialized multipart/alternative message with CRLF line endings."""
+        fields = dict(values)
+        for key, value in values.items():
+            fields[key + HTML_SUFFIX] = html.escape(value)
+        fields[TO_FIELD] = header_value(recipient)
+        fields[SUBJECT_FIELD] = header_value(subject)
+        return self.mime.render(fields)
+
+
+def _escaped(values: Dict[str, str]) -> Dict[str, str]:
+    return {key: html.escape(value) for key, value in values.items()}
+
+
+class TemplateRegistry:
+    """Loads email templates once and hands out pre-split renderers.
+
+    With ``reload`` enabled (debug) a template is re-read when its file's
+    mtime changes, so edits show up without restarting the app.
+    """
+
+    def __init__(self, directory: Path, reload: bool = False):
+        self.directory = directory
+        self.reload = reload
+        self._templates: Dict[str, EmailTemplate] = {}
+
+    def _load(self, name: str) -> EmailTemplate:
+        path = self.directory / f"{name}.html"
+        mtime = os.stat(path).st_mtime
+        template = EmailTemplate(name, path.read_text("utf-8"), mtime)
+        self._templates[name] = template
+        return template
+
+    def load_all(self):
+        for path in sorted(self.directory.glob("*.html")):
+            self._load(path.stem)
+
+    def get(self, name: str) -> EmailTemplate:
+        template: Optional[EmailTemplate] = self._templates.get(name)
+
+        if template is None:
+            return self._load(name)
+        if self.reload:
+            mtime = os.stat(self.directory / f"{name}.html").st_mtime
+            if mtime != template.mtime:
+                return self._load(name)
+
+        return template
+
+
+email_templates = TemplateRegistry(
+    Path(__file__).parent / "templates", reload=settings.debug
+)
@@ -1,8 +1,12 @@
-import smtplib
+from email import policy
 from email.message import EmailMessage
-from typing import Self, overload
+from typing import Dict, Optional, Self, overload
 
 from app.config import settings
+from app.email.outbox import outbox
+from app.email.renderer import EmailTemplate, email_templates
+from app.email.smtp import send_raw
+from app.tracing import span
 
 
 class Message:
@@ -32,10 +36,31 @@ class HtmlMessage(Message):
         super().__init__()
 
 
+class TemplateMessage(HtmlMessage):
+    """HTML body rendered from a file in ``app/email/templates``.
+
+    Sent as multipart/alternative with a plain-text part, rendered straight
+    into the template's cached MIME skeleton.
+    """
+
+    def __init__(self, template: str, values: Dict[str, str]) -> None:
+        self.template: EmailTemplate = email_templates.get(template)
+        self.values = values
+
+    @property
+    def msg(self) -> str:  # pyright: ignore[reportIncompatibleVariableOverride]
+        return self.template.render_html(self.values)
+
+    @property
+    def text(self) -> str:
+        return self.template.render_text(self.values)
+
+
 class EmailService:
     def __init__(self):
         self.msg = EmailMessage()
         self.msg["From"] = settings.email
+        self.template_body: Optional[TemplateMessage] = None
 
     def recipient(self, email: str) -> Self:
         self.msg["To"] = email
@@ -52,13 +77,27 @@ class EmailService:
     def body(self, body: PlainMessage) -> Self: ...
 
     def body(self, body: Message) -> Self:
-        if isinstance(body, HtmlMessage):
+        if isinstance(body, TemplateMessage):
+            self.template_body = body
+        elif isinstance(body, HtmlMessage):
             self.msg.set_content(body.msg, "html")
         else:
             self.msg.set_content(body.msg)
         return self
 
+    def as_raw(self) -> str:
+        """The message serialized for SMTP (CRLF line endings)."""
+        if self.template_body:
+            return self.template_body.template.render_mime(
+                self.msg["To"], self.msg["Subject"], self.template_body.values
+            )
+        return self.msg.as_bytes(policy=policy.SMTP).decode("utf-8")
+
     def send(self):
-        with smtplib.SMTP_SSL("mail.privateemail.com", 465) as smtp:
-            smtp.login(settings.email, settings.email_pw)
-            smtp.send_message(self.msg)
+        with span("email.send"):
+            send_raw(self.msg["To"], self.as_raw())
+
+    async def enqueue(self) -> int:
+        """Store the message in the outbox; a background worker sends it."""
+        with span("email.enqueue"):
+            return await outbox.enqueue(self.msg["To"], self.as_raw())
@@ -0,0 +1,173 @@
+# app/email/smtp.py
+import queue
+import smtplib
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from app.config import settings
+
+
+def smtp_connect() -> smtplib.SMTP:
+    if settings.smtp_use_ssl:
+        smtp = smtplib.SMTP_SSL(
+            settings.smtp_host,
+            settings.smtp_port,
+            timeout=settings.smtp_timeout_seconds,
+        )
+    else:
+        smtp = smtplib.SMTP(
+            settings.smtp_host,
+            settings.smtp_port,
+            timeout=settings.smtp_timeout_seconds,
+        )
+
+    smtp.login(settings.email, settings.email_pw)
+    return smtp
+
+
+def send_message(smtp: smtplib.SMTP, recipient: str, raw: str):
+    """Send an already serialized message without re-parsing it."""
+    options = ["BODY=8BITMIME"] if smtp.has_extn("8bitmime") else []
+    smtp.sendmail(settings.email, [recipient], raw.encode("utf-8"), options)
+
+
+class _Session:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SMTPPool:
+    """Keeps a few authenticated SMTP sessions open between sends.
+
+    Sessions idle longer than ``noop_after`` are probed with NOOP before
+    reuse, sessions idle longer than ``idle_timeout`` are closed, and a
+    session that fails mid-send is dropped and replaced. Safe to use from
+    several threads; at most ``size`` sessions exist at once.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        idle_timeout: float,
+        noop_after: float,
+        connect: Callable[[], smtplib.SMTP] = smtp_connect,
+    ):
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self._connect = connect
+        self._idle: "queue.LifoQueue[_Session]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _checkout(self) -> _Session:
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return _Session(self._connect())
+
+            idle_for = time.monotonic() - session.last_used
+            if idle_for > self.idle_timeout:
+                session.close()
+                continue
+            if idle_for > self.noop_after and not self._is_alive(session):
+                session.smtp.close()
+                continue
+            return session
+
+    @staticmethod
+    def _is_alive(session: _Session) -> bool:
+        try:
+            return session.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkin(self, session: _Session):
+        session.last_used = time.monotonic()
+        self._idle.put(session)
+
+    def send_batch(
+        self, messages: List[Tuple[str, str]]
+    ) -> List[Optional[Exception]]:
+        """Send ``(recipient, raw)`` pairs over one session.
+
+        Returns an error (or None) per message. A dropped connection is
+        re-established once per message; errors the server reports for a
+        single message do not affect the others.
+        """
+        results: List[Optional[Exception]] = []
+        with self._slots:
+            session: Optional[_Session] = None
+            try:
+                for recipient, raw in messages:
+                    error: Optional[Exception] = None
+                    for _ in range(2):
+                        try:
+                            if session is None:
+                                session = self._checkout()
+                            send_message(session.smtp, recipient, raw)
+                            error = None
+                            break
+                        except smtplib.SMTPServerDisconnected as e:
+                            error = e
+                        except smtplib.SMTPException as e:
+                            error = e
+                            break
+                        except OSError as e:
+                            error = e
+
+                        # connection lost, reconnect and retry this message
+                        if session is not None:
+                            session.smtp.close()
+                            session = None
+                    results.append(error)
+            finally:
+                if session is not None:
+                    self._checkin(session)
+        return results
+
+    def prune(self):
+        """Close sessions that have been idle past ``idle_timeout``."""
+        keep = []
+        now = time.monotonic()
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if now - session.last_used > self.idle_timeout:
+                session.close()
+            else:
+                keep.append(session)
+
+        # oldest first so LIFO checkout keeps preferring the freshest
+        for session in sorted(keep, key=lambda s: s.last_used):
+            self._idle.put(session)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+smtp_pool = SMTPPool(
+    settings.smtp_pool_size,
+    settings.smtp_idle_timeout_seconds,
+    settings.smtp_noop_after_seconds,
+)
+
+
+def send_raw(recipient: str, raw: str):
+    (error,) = smtp_pool.send_batch([(recipient, raw)])
+    if error:
+        raise error
@@ -0,0 +1,198 @@
+# app/loopmonitor.py
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Scope of the request each task is serving, kept by LoopMonitorMiddleware
+_requests: Dict[asyncio.Task, Scope] = {}
+
+
+class LoopMonitor:
+    """Measures event-loop lag and captures what is blocking the loop.
+
+    A task on the loop sleeps ``interval`` seconds at a time and records
+    how late it wakes up. A watchdog thread checks the task's next expected
+    wake-up; once the loop is ``threshold`` seconds overdue it takes the
+    loop thread's stack, which still holds the blocking call, together with
+    the request the running task is serving. The lag is filled in when the
+    loop gets going again.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.loop_monitor_interval_seconds,
+        threshold: float = settings.loop_stall_threshold_ms / 1000,
+        history: int = settings.loop_stall_history,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = Histogram(LAG_BUCKETS)
+        self.max_lag = 0.0
+        self.stall_count = 0
+        self.stalls: Deque[Dict[str, object]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._expected: Optional[float] = None
+        self._captured_for: Optional[float] = None
+        self._open_stall: Optional[Dict[str, object]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self._task is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._watchdog.join()
+        self._task = None
+        self._watchdog = None
+        self._expected = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            self._expected = expected
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self.lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            with self._lock:
+                stall = self._open_stall
+                self._open_stall = None
+                if stall is None and lag > self.threshold:
+                    # Too short for the watchdog to catch in the act
+                    stall = self._record(None, None, None)
+                if stall is not None:
+                    stall["lag_ms"] = round(lag * 1000, 3)
+                    logger.warning(
+                        "Event loop blocked for %.0fms during %s",
+                        lag * 1000,
+                        stall["route"] or "no request",
+                    )
+
+    def _watch(self):
+        while not self._stopping.wait(self.threshold / 4):
+            expected = self._expected
+            if expected is None or expected == self._captured_for:
+                continue
+            if time.monotonic() - expected <= self.threshold:
+                continue
+
+            self._captured_for = expected
+            frame = sys._current_frames().get(self._thread_id)
+            task = asyncio.current_task(self._loop)
+            scope = _requests.get(task) if task else None
+            with self._lock:
+                self._open_stall = self._record(
+                    traceback.format_stack(frame) if frame else None,
+                    task.get_name() if task else None,
+                    scope,
+                )
+
+    def _record(
+        self, stack: Optional[List[str]], task: Optional[str], scope: Optional[Scope]
+    ) -> Dict[str, object]:
+        route = None
+        if scope is not None:
+            path = getattr(scope.get("route"), "path", scope["path"])
+            route = f"{scope['method']} {path}"
+        stall: Dict[str, object] = {
+            "time": time.time(),
+            "lag_ms": None,
+            "route": route,
+            "task": task,
+            "stack": stack,
+        }
+        self.stalls.append(stall)
+        self.stall_count += 1
+        return stall
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stalls = list(self.stalls)
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "lag_seconds": self.lag.snapshot(),
+            "stalls": self.stall_count,
+            "recent_stalls": stalls,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.lag = Histogram(LAG_BUCKETS)
+            self.max_lag = 0.0
+            self.stall_count = 0
+            self.stalls.clear()
+
+
+loop_monitor = LoopMonitor()
+
+
+class LoopMonitorMiddleware:
+    """Remembers which request each task is serving, for stall reports."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        task = asyncio.current_task()
+        if scope["type"] != "http" or task is None:
+            await self.app(scope, receive, send)
+            return
+
+        _requests[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _requests.pop(task, None)
+
+
+@registry.collector
+def collect_loop():
+    yield "event_loop_lag_seconds", "histogram", "Event loop wake-up delay.", [
+        ({}, loop_monitor.lag)
+    ]
+    yield "event_loop_stalls_total", "counter", "Loop stalls over the threshold.", [
+        ({}, loop_monitor.stall_count)
+    ]
@@ -1,19 +1,62 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+import logging
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 
+from app.admission import AdmissionMiddleware, adaptive_stats
+from app.auth.last_login import last_login_buffer
+from app.auth.hashing import load_or_calibrate, load_params
+from app.auth.services import token_version_cache, user_cache, wait_for_rehashes
+from app.auth.utils import SecurityService
+from app.auth.sweeper import sweeper
+from app.auth.verifier import access_token_verifier
 from app.config import settings
-from app.database import database
+from app.database import PoolTimeoutError, database
+from app.email.outbox import outbox
+from app.email.renderer import email_templates
+from app.email.smtp import smtp_pool
+from app.loopmonitor import LoopMonitorMiddleware, loop_monitor
+from app.metrics import MetricsMiddleware, registry
+from app.tracing import TracingMiddleware, trace_exporter
+from app.workers import WorkerPoolFullError, cpu_pool
 from app.auth.router import router as auth_router
 from app.dashboard.router import router as dashboard_router
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.argon2_calibrate_on_startup and load_params() is None:
+        # One worker measures; the others wait on its lock and load the file
+        params = await asyncio.to_thread(load_or_calibrate)
+        SecurityService.use_hasher_params(params)
+    cpu_pool.start()
+    email_templates.load_all()
     await database.connect()
+    outbox.start()
+    if settings.sweeper_enabled:
+        sweeper.start()
+    if settings.last_login_write_behind:
+        last_login_buffer.start()
+    if settings.trace_sample_rate > 0:
+        trace_exporter.start()
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
     yield
+    await loop_monitor.stop()
+    await sweeper.stop()
+    await last_login_buffer.stop()
+    await wait_for_rehashes()
+    trace_exporter.stop()
+    await outbox.stop()
+    smtp_pool.close()
     await database.disconnect()
+    cpu_pool.shutdown()
 
 
 app = FastAPI(
@@ -22,6 +65,10 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Inside CORS so shed requests still carry the CORS headers
+if settings.admission_control_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +78,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.server_timing or settings.trace_sample_rate > 0:
+    app.add_middleware(TracingMiddleware)
+
+if settings.loop_monitor_enabled:
+    app.add_middleware(LoopMonitorMiddleware)
+
+
+@app.exception_handler(PoolTimeoutError)
+@app.exception_handler(WorkerPoolFullError)
+async def pool_timeout_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service temporarily unavailable"},
+        headers={"Retry-After": "1"},
+    )
+
 
 # Include routers
 @app.get("/health")
@@ -38,6 +104,93 @@ def health_check():
     return {"status": "ok"}
 
 
+# Async: stats() walks per-connection state the loop changes on checkout.
+# Includes replica addresses, so nginx does not proxy /health/*
+@app.get("/health/database")
+async def database_health():
+    return database.stats()
+
+
+# Async so limiter state is read between loop steps; internal like the above
+@app.get("/health/admission")
+async def admission_health():
+    return adaptive_stats()
+
+
+@registry.collector
+def collect_runtime():
+    # Before the lifespan connects there is no pool to report on
+    stats = database.stats() if getattr(database, "pool", None) else None
+    pool = [] if stats is None else [
+        ("db_pool_size", "gauge", "Open primary pool connections.", stats["size"]),
+        ("db_pool_in_use", "gauge", "Primary connections checked out.", stats["in_use"]),
+        ("db_pool_idle", "gauge", "Idle primary connections.", stats["idle"]),
+        ("db_pool_waiters", "gauge", "Tasks waiting for a connection.", stats["waiters"]),
+        ("db_pool_acquired_total", "counter", "Connections checked out.", stats["acquired"]),
+        ("db_pool_timeouts_total", "counter", "Acquires that timed out.", stats["timeouts"]),
+        ("db_pool_recycled_total", "counter", "Connections closed for age.", stats["recycled"]),
+    ]
+    for name, kind, documentation, value in pool:
+        yield name, kind, documentation, [({}, value)]
+    yield (
+        "db_pool_acquire_wait_seconds",
+        "histogram",
+        "Time spent waiting for a primary connection.",
+        [({}, database.acquire_wait)],
+    )
+
+    caches = {
+        "user": user_cache,
+        "token_version": token_version_cache,
+        "access_token": access_token_verifier.cache,
+    }
+    for name, documentation, attr in (
+        ("cache_hits_total", "Cache lookups that found a live entry.", "hits"),
+        ("cache_misses_total", "Cache lookups that missed or expired.", "misses"),
+        ("cache_evictions_total", "Entries evicted to stay within size.", "evictions"),
+    ):
+        yield name, "counter", documentation, [
+            ({"cache": cache}, getattr(ttl_cache, attr))
+            for cache, ttl_cache in caches.items()
+        ]
+    yield "cache_entries", "gauge", "Entries currently cached.", [
+        ({"cache": cache}, len(ttl_cache)) for cache, ttl_cache in caches.items()
+    ]
+
+    yield "sweeper_deleted_total", "counter", "Expired rows removed.", [
+        ({"table": table}, count) for table, count in sweeper.deleted.items()
+    ]
+    yield "worker_pool_in_flight", "gauge", "CPU-bound calls admitted.", [
+        ({}, cpu_pool.in_flight)
+    ]
+    yield "worker_pool_rejected_total", "counter", "Calls turned away full.", [
+        ({}, cpu_pool.rejected)
+    ]
+    yield "sweeper_run_seconds", "histogram", "Duration of expiry sweeps.", [
+        ({}, sweeper.run_seconds)
+    ]
+    yield "sweeper_last_run_seconds", "gauge", "Duration of the last sweep.", [
+        ({}, sweeper.last_run_seconds)
+    ]
+    yield "last_login_pending", "gauge", "Logins waiting to be written.", [
+        ({}, last_login_buffer.stats()["pending"])
+    ]
+    yield "last_login_dropped_total", "counter", "Logins dropped at the cap.", [
+        ({}, last_login_buffer.dropped)
+    ]
+
+
+# Async so rendering runs on the loop, not while handlers add label sets.
+# Not proxied by nginx; scrape backend:5000 from inside the network
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.metrics_enabled:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 app.include_router(auth_router)
 app.include_router(dashboard_router)
 
@@ -45,4 +198,9 @@ app.include_router(dashboard_router)
 if settings.debug:
     from app.testing.router import router as testing_router
 
+    # Stall reports carry stack traces, so only in debug
+    @app.get("/debug/event-loop", include_in_schema=False)
+    async def event_loop_debug():
+        return loop_monitor.stats()
+
     app.include_router(testing_router)
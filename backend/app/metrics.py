@@ -0,0 +1,287 @@
+# app/metrics.py
+import time
+from bisect import bisect_left
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+# A collector returns (name, type, help, [(labels, value), ...]) per metric
+Sample = Tuple[Dict[str, str], Union[float, "Histogram"]]
+Collected = Tuple[str, str, str, List[Sample]]
+
+
+class Counter:
+    """Monotonic count.
+
+    Like the histogram it is only updated from the event loop, so there is
+    no lock; observe blocking work from the awaiting side, not the thread.
+    """
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram of observations in seconds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Cumulative counts keyed by upper bound, as Prometheus reports."""
+        cumulative = {}
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        cumulative["+Inf"] = self.count
+        return {"buckets": cumulative, "sum": round(self.sum, 6), "count": self.count}
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+M = TypeVar("M", Counter, Histogram)
+
+
+class Family(Generic[M]):
+    """A named metric with one child per label set.
+
+    ``labels`` creates children on first use; hot paths should bind the
+    child once and keep it rather than looking it up per call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        factory: Callable[[], M],
+    ):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], M] = {}
+
+    def labels(self, *values: str) -> M:
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            child = self.children[values] = self.factory()
+        return child
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    text = ",".join(f'{name}="{escape(str(value))}"' for name, value in pairs)
+    return "{" + text + "}" if text else ""
+
+
+def format_value(value: Union[int, float]) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self.families: Dict[str, Family] = {}
+        self.collectors: List[Callable[[], Iterable[Collected]]] = []
+
+    def _register(self, family: Family) -> Family:
+        if family.name in self.families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self.families[family.name] = family
+        return family
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> "Family[Counter]":
+        return self._register(
+            Family(name, "counter", documentation, labelnames, Counter)
+        )
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> "Family[Histogram]":
+        return self._register(
+            Family(
+                name,
+                "histogram",
+                documentation,
+                labelnames,
+                lambda: Histogram(buckets),
+            )
+        )
+
+    def collector(
+        self, fn: Callable[[], Iterable[Collected]]
+    ) -> Callable[[], Iterable[Collected]]:
+        """Register a callback that reads current values at scrape time."""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        lines: List[str] = []
+
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in family.children.items():
+                pairs = list(zip(family.labelnames, values))
+                if isinstance(child, Histogram):
+                    lines.extend(render_histogram(family.name, pairs, child))
+                else:
+                    lines.append(
+                        f"{family.name}{format_labels(pairs)} {format_value(child.value)}"
+                    )
+
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if isinstance(value, Histogram):
+                        lines.extend(
+                            render_histogram(name, list(labels.items()), value)
+                        )
+                    else:
+                        lines.append(
+                            f"{name}{format_labels(labels.items())} {format_value(value)}"
+                        )
+
+        return "\n".join(lines) + "\n"
+
+
+def render_histogram(
+    name: str, pairs: List[Tuple[str, str]], histogram: Histogram
+) -> List[str]:
+    lines = []
+    total = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        total += count
+        labels = format_labels(pairs + [("le", format_value(bound))])
+        lines.append(f"{name}_bucket{labels} {total}")
+    labels = format_labels(pairs + [("le", "+Inf")])
+    lines.append(f"{name}_bucket{labels} {histogram.count}")
+    lines.append(f"{name}_sum{format_labels(pairs)} {format_value(histogram.sum)}")
+    lines.append(f"{name}_count{format_labels(pairs)} {histogram.count}")
+    return lines
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route template and status.",
+    ("method", "route", "status"),
+)
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route"),
+)
+
+
+class MetricsMiddleware:
+    """Counts requests and times them per route template.
+
+    The route comes from the ``route`` FastAPI leaves in the scope once it
+    has matched, so ``/users/{id}`` is one series rather than one per id;
+    anything unmatched is reported as ``unmatched``. Label children are
+    cached per (method, route, status) so a request costs two dict lookups.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._bound: Dict[Tuple[str, str, int], Tuple[Counter, Histogram]] = {}
+
+    def _children(
+        self, method: str, route: str, status: int
+    ) -> Tuple[Counter, Histogram]:
+        key = (method, route, status)
+        children = self._bound.get(key)
+        if children is None:
+            children = self._bound[key] = (
+                http_requests.labels(method, route, str(status)),
+                http_request_seconds.labels(method, route),
+            )
+        return children
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            counter, histogram = self._children(scope["method"], path, status)
+            counter.inc()
+            histogram.observe(time.perf_counter() - start)
@@ -0,0 +1,140 @@
+# app/ratelimit.py
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.metrics import registry
+
+
+class RateLimit(NamedTuple):
+    name: str
+    limit: int
+    window: float
+
+
+def parse_rate_limits(value: str) -> Dict[str, RateLimit]:
+    """Parse ``name=limit/seconds`` pairs separated by commas."""
+    rules = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, spec = item.partition("=")
+        limit, _, window = spec.partition("/")
+        rules[name.strip()] = RateLimit(name.strip(), int(limit), float(window))
+    return rules
+
+
+class _Window:
+    __slots__ = ("start", "current", "previous", "expires")
+
+    def __init__(self, start: float, window: float):
+        self.start = start
+        self.current = 0
+        self.previous = 0
+        self.expires = start + 2 * window
+
+
+class RateLimiter:
+    """Sliding-window counters keyed by (rule, key).
+
+    Each key keeps the count for the current fixed window and the one
+    before, and the previous count is weighted by how much of it still
+    overlaps the sliding window. That is the usual two-counter approximation:
+    constant memory per key and no timestamps per request. Denied attempts
+    are not counted, so a client that backs off for ``Retry-After`` gets in.
+
+    Keys are kept in least-recently-used order. Every check drops expired
+    keys from the old end, and the least recently used go once ``max_keys``
+    is exceeded, so memory stays bounded whatever the key cardinality.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[Tuple[str, str], _Window]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def hit(self, rule: RateLimit, key: str, now: Optional[float] = None) -> float:
+        """Count one attempt; returns 0 if allowed, else seconds to wait."""
+        if now is None:
+            now = time.monotonic()
+        start = now - now % rule.window
+
+        windows = self._windows
+        slot = (rule.name, key)
+        entry = windows.get(slot)
+        if entry is None:
+            entry = windows[slot] = _Window(start, rule.window)
+        else:
+            windows.move_to_end(slot)
+            if entry.start != start:
+                rolled = entry.start == start - rule.window
+                entry.previous = entry.current if rolled else 0
+                entry.current = 0
+                entry.start = start
+                entry.expires = start + 2 * rule.window
+
+        self._evict(now)
+
+        elapsed = now - start
+        weight = 1 - elapsed / rule.window
+        if entry.previous * weight + entry.current + 1 <= rule.limit:
+            entry.current += 1
+            return 0.0
+        return self._retry_after(rule, entry, elapsed)
+
+    @staticmethod
+    def _retry_after(rule: RateLimit, entry: _Window, elapsed: float) -> float:
+        window = rule.window
+        if entry.current + 1 <= rule.limit and entry.previous:
+            # Wait for enough of the previous window to slide out
+            weight = (rule.limit - 1 - entry.current) / entry.previous
+            return max(window * (1 - weight) - elapsed, 0.001)
+        # The current window becomes the previous one; wait for it to fade
+        weight = (rule.limit - 1) / entry.current if entry.current else 1
+        return window - elapsed + window * (1 - weight)
+
+    def _evict(self, now: float):
+        windows = self._windows
+        while windows:
+            oldest = next(iter(windows))
+            if windows[oldest].expires > now and len(windows) <= self.max_keys:
+                return
+            del windows[oldest]
+            self.evictions += 1
+
+    def reset(self):
+        self._windows.clear()
+
+
+rate_limiter = RateLimiter(settings.rate_limit_max_keys)
+rules = parse_rate_limits(settings.rate_limits)
+
+rate_limited = registry.counter(
+    "rate_limited_total", "Requests rejected with 429, by rule.", ("rule",)
+)
+
+
+def check_rate_limit(rule_name: str, key: str):
+    """Raise 429 with Retry-After if ``key`` is over the named limit.
+
+    Unknown rule names, e.g. ones removed from RATE_LIMITS, are not limited.
+    """
+    rule = rules.get(rule_name)
+    if rule is None or not settings.rate_limit_enabled:
+        return
+
+    retry_after = rate_limiter.hit(rule, key)
+    if retry_after:
+        rate_limited.labels(rule_name).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
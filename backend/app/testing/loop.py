@@ -0,0 +1,45 @@
+# app/testing/loop.py
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.loopmonitor import LoopMonitor
+
+
+class LoopBlockedError(AssertionError):
+    pass
+
+
+@asynccontextmanager
+async def no_blocking(
+    max_ms: float, interval: float = 0.005
+) -> AsyncIterator[LoopMonitor]:
+    """Fail if the event loop is blocked for more than ``max_ms`` inside.
+
+        async with no_blocking(50):
+            await client.post("/auth/login", json_body=...)
+
+    Requests made through the app are named in the report when the app has
+    LoopMonitorMiddleware, i.e. LOOP_MONITOR_ENABLED is on.
+    """
+    monitor = LoopMonitor(interval=interval, threshold=max_ms / 1000, history=20)
+    monitor.start()
+    # Let the monitor take its first reading before the block runs
+    await asyncio.sleep(0)
+    try:
+        yield monitor
+        # Let the monitor wake once more to measure a stall that just ended
+        await asyncio.sleep(interval * 2)
+    finally:
+        await monitor.stop()
+
+    if monitor.stalls:
+        reports = []
+        for stall in monitor.stalls:
+            report = f"{stall['lag_ms']}ms during {stall['route'] or 'no request'}"
+            if stall["stack"]:
+                report += ":\n" + "".join(stall["stack"][-8:])
+            reports.append(report)
+        raise LoopBlockedError(
+            f"Event loop blocked over {max_ms}ms:\n" + "\n".join(reports)
+        )
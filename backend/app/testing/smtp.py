@@ -0,0 +1,114 @@
+# app/testing/smtp.py
+import asyncio
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import List, Optional, Set
+
+
+class SMTPStandIn:
+    """Plain-text SMTP server on localhost that records what it receives.
+
+    Speaks just enough ESMTP (EHLO, AUTH, MAIL, RCPT, DATA, NOOP, RSET, QUIT)
+    for ``smtplib``. Set ``reject_with`` to a reply such as
+    ``"554 Rejected"`` to make every ``MAIL FROM`` fail, ``connect_delay`` to
+    mimic the cost of a TLS handshake and ``delay`` to slow down each DATA.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.messages: List[EmailMessage] = []
+        self.connections = 0
+        self.reject_with: Optional[str] = None
+        self.delay: float = 0
+        self.connect_delay: float = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+
+    async def start(self) -> "SMTPStandIn":
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in self._writers:
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "SMTPStandIn":
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self.connections += 1
+        self._writers.add(writer)
+        task = asyncio.current_task()
+        if task:
+            self._handlers.add(task)
+
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        await reply("220 standin ESMTP")
+        try:
+            while line := await reader.readline():
+                command = line.decode().strip()
+                verb = command.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    await reply("250-standin")
+                    await reply("250-AUTH PLAIN LOGIN")
+                    await reply("250 8BITMIME")
+                elif verb == "HELO":
+                    await reply("250 standin")
+                elif verb == "AUTH":
+                    if command.upper().startswith("AUTH LOGIN"):
+                        await reply("334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await reply("334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    await reply("235 Authentication successful")
+                elif verb == "MAIL":
+                    await reply(self.reject_with or "250 OK")
+                elif verb == "RCPT":
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while (data := await reader.readline()) != b".\r\n":
+                        if not data:
+                            return
+                        lines.append(data[1:] if data.startswith(b"..") else data)
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                    self.messages.append(
+                        message_from_bytes(b"".join(lines), policy=policy.default)  # type: ignore[arg-type]
+                    )
+                    await reply("250 OK")
+                elif verb in ("NOOP", "RSET"):
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(task)  # pyright: ignore[reportArgumentType]
+            writer.close()
@@ -0,0 +1,229 @@
+# app/tracing.py
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import secrets
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+class Trace:
+    """Spans recorded while handling one request.
+
+    Each span is (name, offset from the request start, duration), in
+    seconds.
+    """
+
+    __slots__ = ("trace_id", "start", "spans", "sampled")
+
+    def __init__(self, sampled: bool):
+        self.trace_id = secrets.token_hex(8)
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.sampled = sampled
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """Total duration and count per span name, in first-seen order."""
+        totals: Dict[str, Tuple[float, int]] = {}
+        for name, _, duration in self.spans:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + duration, count + 1)
+        return totals
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.trace.spans.append(
+            (self.name, self.start - self.trace.start, end - self.start)
+        )
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str):
+    """Time the enclosed block as part of the current request's trace.
+
+    Outside a traced request this is one context variable lookup.
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name)
+
+
+def server_timing(trace: Trace, total: float) -> str:
+    """Server-Timing header value with durations in milliseconds."""
+    parts = []
+    for name, (duration, count) in trace.totals().items():
+        part = f"{name};dur={duration * 1000:.2f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class TraceExporter:
+    """Appends sampled traces as JSON lines to a size-rotated file.
+
+    Lines go through a queue to a listener thread, so the event loop never
+    waits on disk.
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger("app.tracing.export")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+    @property
+    def running(self) -> bool:
+        return self._listener is not None
+
+    def start(
+        self,
+        path: str = settings.trace_export_path,
+        max_bytes: int = settings.trace_export_max_bytes,
+        backups: int = settings.trace_export_backups,
+    ):
+        if self._listener is not None:
+            return
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self._queue_handler = logging.handlers.QueueHandler(records)
+        self._logger.addHandler(self._queue_handler)
+        self._listener = logging.handlers.QueueListener(records, file_handler)
+        self._listener.start()
+
+    def stop(self):
+        if self._listener is None:
+            return
+
+        self._logger.removeHandler(self._queue_handler)
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        self._listener = None
+        self._queue_handler = None
+
+    def export(self, trace: Trace, scope: Scope, status: int, total: float):
+        if self._listener is None:
+            return
+
+        route = getattr(scope.get("route"), "path", "unmatched")
+        self._logger.info(
+            json.dumps(
+                {
+                    "trace_id": trace.trace_id,
+                    "time": time.time(),
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(total * 1000, 3),
+                    "spans": [
+                        {
+                            "name": name,
+                            "offset_ms": round(offset * 1000, 3),
+                            "duration_ms": round(duration * 1000, 3),
+                        }
+                        for name, offset, duration in trace.spans
+                    ],
+                }
+            )
+        )
+
+
+trace_exporter = TraceExporter()
+
+
+class TracingMiddleware:
+    """Collects spans for a request when it will report or export them.
+
+    ``SERVER_TIMING`` adds a Server-Timing header to every response and
+    ``TRACE_SAMPLE_RATE`` writes that fraction of requests to the exporter.
+    With both off no trace is created, so ``span`` stays a no-op.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        header: bool = settings.server_timing,
+        sample_rate: float = settings.trace_sample_rate,
+        exporter: TraceExporter = trace_exporter,
+    ):
+        self.app = app
+        self.header = header
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not (self.header or sampled):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(sampled)
+        token = _current.set(trace)
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.header:
+                    total = time.perf_counter() - trace.start
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", server_timing(trace, total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if sampled:
+                total = time.perf_counter() - trace.start
+                self.exporter.export(trace, scope, status, total)
@@ -0,0 +1,82 @@
+# app/workers.py
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class WorkerPoolFullError(Exception):
+    """Every worker is busy and the queue is full; answered with 503."""
+
+
+class WorkerPool:
+    """Runs blocking CPU-bound calls (Argon2, ...) off the event loop.
+
+    At most ``max_workers + queue_size`` calls are admitted at once: up to
+    ``max_workers`` run while the rest queue in the executor. A call beyond
+    that raises WorkerPoolFullError at once instead of waiting, so a burst
+    cannot build an unbounded backlog.
+    """
+
+    def __init__(self, kind: str, max_workers: int, queue_size: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self._executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_size
+
+    def start(self):
+        if self._executor is not None:
+            return
+
+        if self.kind == "process":
+            # spawn avoids forking a process that already has running threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="worker",
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._executor is None:
+            self.start()
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise WorkerPoolFullError(
+                f"{self.in_flight} calls in flight, capacity {self.capacity}"
+            )
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+
+cpu_pool = WorkerPool(
+    settings.worker_pool_kind,
+    settings.worker_pool_size,
+    settings.worker_queue_size,
+)
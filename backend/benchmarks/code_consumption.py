@@ -0,0 +1,128 @@
+# benchmarks/code_consumption.py
+"""Latency of consuming an MFA or recovery code: SELECT then DELETE
+(the previous implementation, reproduced here) against the single
+conditional DELETE the services now use.
+
+Needs the MySQL configured in the environment. Each round creates a code
+and consumes it once; ``--contenders`` additionally verifies the same code
+from that many concurrent tasks and counts how many were accepted, which
+should be exactly one.
+
+    python -m benchmarks.code_consumption --rounds 500 --contenders 10
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from app.auth.services import EmailMfaCodeService, RecoveryCodeService, UserService
+from app.auth.utils import SecurityService
+from app.database import database
+from benchmarks.common import print_json, summarize
+
+EMAIL = "code-bench@example.com"
+PASSWORD = "Benchmark-passw0rd!"
+
+
+async def select_then_delete_email_code(user_id: int, code: str) -> bool:
+    query = "SELECT code_hash FROM email_mfa_codes WHERE user_id = %s AND code_hash = %s AND expires_at > UTC_TIMESTAMP();"
+    async with database.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, (user_id, SecurityService.hash_token(code)))
+            if not await cursor.fetchone():
+                return False
+            await cursor.execute(
+                "DELETE FROM email_mfa_codes WHERE user_id = %s AND code_hash = %s",
+                (user_id, SecurityService.hash_token(code)),
+            )
+            return True
+
+
+async def select_then_delete_recovery_code(user_id: int, code: str) -> bool:
+    query = "SELECT code_hash FROM recovery_codes WHERE user_id = %s AND code_hash = %s;"
+    async with database.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, (user_id, SecurityService.hash_token(code)))
+            if not await cursor.fetchone():
+                return False
+            await cursor.execute(
+                "DELETE FROM recovery_codes WHERE user_id = %s AND code_hash = %s",
+                (user_id, SecurityService.hash_token(code)),
+            )
+            return True
+
+
+async def email_code(user_id: int) -> str:
+    return await EmailMfaCodeService.create_email_mfa_code(
+        user_id, timedelta(minutes=5)
+    )
+
+
+async def recovery_code(user_id: int) -> str:
+    return (await RecoveryCodeService.regenerate_recovery_codes(user_id))[0]
+
+
+CASES: Dict[str, tuple] = {
+    "email_mfa.select_delete": (email_code, select_then_delete_email_code),
+    "email_mfa.delete": (email_code, EmailMfaCodeService.verify_email_mfa_code),
+    "recovery.select_delete": (recovery_code, select_then_delete_recovery_code),
+    "recovery.delete": (recovery_code, RecoveryCodeService.verify_recovery_code),
+}
+
+
+async def run_case(
+    user_id: int,
+    create: Callable[[int], Awaitable[str]],
+    verify: Callable[[int, str], Awaitable[bool]],
+    rounds: int,
+    contenders: int,
+) -> dict:
+    latency: List[float] = []
+    for _ in range(rounds):
+        code = await create(user_id)
+        start = time.perf_counter()
+        assert await verify(user_id, code)
+        latency.append(time.perf_counter() - start)
+
+    accepted: List[int] = []
+    if contenders:
+        for _ in range(min(rounds, 20)):
+            code = await create(user_id)
+            results = await asyncio.gather(
+                *(verify(user_id, code) for _ in range(contenders))
+            )
+            accepted.append(results.count(True))
+
+    return {
+        "latency": summarize(latency),
+        "max_accepted_per_code": max(accepted, default=None),
+    }
+
+
+async def main(args):
+    await database.connect()
+    try:
+        user = await UserService.create_user(EMAIL, PASSWORD)
+        try:
+            results = {
+                name: await run_case(
+                    user.id, create, verify, args.rounds, args.contenders
+                )
+                for name, (create, verify) in CASES.items()
+            }
+        finally:
+            await UserService.delete_user(EMAIL, PASSWORD)
+    finally:
+        await database.disconnect()
+
+    print_json({"rounds": args.rounds, "contenders": args.contenders, "results": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--contenders", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,224 @@
+# benchmarks/common.py
+import abc
+import asyncio
+import http.client
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from starlette.types import ASGIApp
+
+
+class ASGIResponse:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class Client(abc.ABC):
+    """Cookie handling and helpers shared by the benchmark clients."""
+
+    def __init__(self):
+        self.cookies: Dict[str, str] = {}
+
+    @abc.abstractmethod
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        """Send one request, keeping cookies between requests."""
+
+    def _store_cookie(self, header: str):
+        name, _, rest = header.partition("=")
+        value = rest.split(";", 1)[0]
+        if value and value != '""':
+            self.cookies[name] = value
+        else:
+            self.cookies.pop(name, None)
+
+    def _cookie_header(self) -> Optional[str]:
+        if not self.cookies:
+            return None
+        return "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+
+    async def get(self, path: str, **kwargs) -> ASGIResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> ASGIResponse:
+        return await self.request("POST", path, **kwargs)
+
+
+class ASGIClient(Client):
+    """Minimal in-process HTTP client that calls an ASGI app directly.
+
+    Keeps the benchmarks free of a network stack and of extra dependencies.
+    """
+
+    def __init__(self, app: ASGIApp, client_ip: str = "127.0.0.1"):
+        super().__init__()
+        self.app = app
+        self.client_ip = client_ip
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        path, _, query = path.partition("?")
+        body = b"" if json_body is None else json.dumps(json_body).encode()
+
+        raw_headers: List[Tuple[bytes, bytes]] = [(b"host", b"testserver")]
+        if json_body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+        cookie = self._cookie_header()
+        if cookie:
+            raw_headers.append((b"cookie", cookie.encode()))
+        for key, value in (headers or {}).items():
+            raw_headers.append((key.lower().encode(), value.encode()))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method.upper(),
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": (self.client_ip, 50000),
+            "server": ("testserver", 80),
+        }
+
+        request_sent = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        status = 500
+        response_headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for key, value in message.get("headers", []):
+                    name = key.decode().lower()
+                    if name == "set-cookie":
+                        self._store_cookie(value.decode())
+                    response_headers[name] = value.decode()
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            disconnected.set()
+
+        return ASGIResponse(status, response_headers, b"".join(chunks))
+
+
+class HTTPClient(Client):
+    """The same interface over real HTTP to a running server.
+
+    Each request is a blocking ``http.client`` call in the default executor,
+    so size that executor to the concurrency being driven.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+
+    def _request(
+        self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str]
+    ) -> ASGIResponse:
+        connection_class = (
+            http.client.HTTPSConnection
+            if self.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        conn = connection_class(self.netloc, timeout=30)
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            for value in response.headers.get_all("set-cookie") or []:
+                self._store_cookie(value)
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            return ASGIResponse(response.status, response_headers, data)
+        finally:
+            conn.close()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        body = None if json_body is None else json.dumps(json_body).encode()
+        request_headers = dict(headers or {})
+        if body is not None:
+            request_headers["content-type"] = "application/json"
+        cookie = self._cookie_header()
+        if cookie:
+            request_headers["cookie"] = cookie
+
+        return await asyncio.to_thread(
+            self._request, method.upper(), path, body, request_headers
+        )
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds for samples given in seconds."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples, default=0.0) * 1000, 3),
+    }
+
+
+class Timer:
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def print_json(result: Any):
+    print(json.dumps(result, indent=2, default=str))
@@ -0,0 +1,76 @@
+# benchmarks/db_pool.py
+"""Pool acquire wait as concurrency grows past DB_POOL_MAX_SIZE.
+
+Needs the MySQL configured in the environment. Each task repeatedly checks
+out a connection and runs ``SELECT SLEEP(query_ms)``, so once concurrency
+exceeds the pool size the extra time shows up as acquire wait rather than
+query time.
+
+    python -m benchmarks.db_pool --max-size 10 --levels 5 10 20 40 80
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from app.config import settings
+from app.database import Database
+from benchmarks.common import print_json, summarize
+
+
+async def run_level(database: Database, concurrency: int, queries: int, query_ms: float):
+    waits: List[float] = []
+    query = "SELECT SLEEP(%s);"
+
+    async def worker():
+        for _ in range(queries):
+            start = time.perf_counter()
+            async with database.get_connection() as conn:
+                waits.append(time.perf_counter() - start)
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, (query_ms / 1000,))
+                    await cursor.fetchall()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "queries_per_second": round(len(waits) / elapsed, 1),
+        "acquire_wait": summarize(waits),
+    }
+
+
+async def main(args):
+    settings.db_pool_min_size = args.max_size
+    settings.db_pool_max_size = args.max_size
+    database = Database()
+    await database.connect()
+
+    try:
+        results = [
+            await run_level(database, level, args.queries, args.query_ms)
+            for level in args.levels
+        ]
+        stats = database.stats()
+    finally:
+        await database.disconnect()
+
+    print_json(
+        {
+            "max_size": args.max_size,
+            "query_ms": args.query_ms,
+            "results": results,
+            "pool": stats,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-size", type=int, default=settings.db_pool_max_size)
+    parser.add_argument("--levels", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--query-ms", type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
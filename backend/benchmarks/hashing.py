@@ -0,0 +1,104 @@
+# benchmarks/hashing.py
+"""Login throughput and /health latency with Argon2 on and off the loop.
+
+The login route here reproduces the CPU profile of ``/auth/login`` (one
+Argon2 verify per request) without needing MySQL, so the only variable is
+where the hash runs.
+
+    python -m benchmarks.hashing --logins 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from fastapi import FastAPI
+
+from app.auth.utils import SecurityService
+from app.workers import WorkerPool
+from benchmarks.common import ASGIClient, print_json, summarize
+
+PASSWORD = "benchmark_password"
+
+
+def build_app(pool: WorkerPool, offload: bool) -> FastAPI:
+    app = FastAPI()
+    password_hash = SecurityService.hash_password(PASSWORD)
+
+    @app.post("/login")
+    async def login():
+        if offload:
+            ok = await pool.run(
+                SecurityService.verify_password, PASSWORD, password_hash
+            )
+        else:
+            ok = SecurityService.verify_password(PASSWORD, password_hash)
+        return {"ok": ok}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+async def run_case(offload: bool, logins: int, concurrency: int, pool):
+    client = ASGIClient(build_app(pool, offload))
+    health_latency: List[float] = []
+    remaining = logins
+    done = asyncio.Event()
+
+    async def login_worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await client.post("/login")
+
+    async def health_probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            health_latency.append(time.perf_counter() - start)
+            await asyncio.sleep(0.005)
+
+    probe = asyncio.create_task(health_probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe
+
+    return {
+        "mode": "worker_pool" if offload else "inline",
+        "logins_per_second": round(logins / elapsed, 2),
+        "health": summarize(health_latency),
+    }
+
+
+async def main(args):
+    pool = WorkerPool(args.kind, args.workers, args.queue)
+    pool.start()
+    try:
+        results = [
+            await run_case(False, args.logins, args.concurrency, pool),
+            await run_case(True, args.logins, args.concurrency, pool),
+        ]
+    finally:
+        pool.shutdown()
+
+    print_json(
+        {
+            "pool": {"kind": args.kind, "workers": pool.max_workers},
+            "results": results,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--kind", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+# benchmarks/jwt_decode.py
+"""Access-token decode cost per backend, with and without the verified cache.
+
+``cached`` replays the same token, which is what a browser does between
+refreshes; ``uncached`` uses a fresh token for every decode.
+
+    python -m benchmarks.jwt_decode --iterations 20000
+"""
+import argparse
+from datetime import timedelta
+
+from app.auth.utils import SecurityService
+from app.auth.verifier import JWTVerifier
+from app.config import settings
+from benchmarks.common import Timer, print_json
+
+
+def run_case(backend: str, cached: bool, tokens):
+    verifier = JWTVerifier(
+        settings.jwt_access_secret,
+        settings.jwt_algorithm,
+        backend=backend,
+        cache_size=len(tokens) if cached else 0,
+    )
+    if cached:
+        tokens = [tokens[0]] * len(tokens)
+        verifier.decode(tokens[0])
+
+    with Timer() as timer:
+        for token in tokens:
+            assert verifier.decode(token) is not None
+
+    return {
+        "backend": backend,
+        "cached": cached,
+        "decodes": len(tokens),
+        "us_per_decode": round(timer.elapsed / len(tokens) * 1e6, 2),
+    }
+
+
+def main(args):
+    tokens = [
+        SecurityService.generate_jwt(
+            i, timedelta(minutes=30), True, {"tv": 0}
+        )[0]
+        for i in range(args.iterations)
+    ]
+
+    results = []
+    for backend in args.backends:
+        for cached in (False, True):
+            results.append(run_case(backend, cached, tokens))
+
+    print_json({"algorithm": settings.jwt_algorithm, "results": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument(
+        "--backends", nargs="+", default=["jose", "hmac"], choices=["jose", "hmac"]
+    )
+    main(parser.parse_args())
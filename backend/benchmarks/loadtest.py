@@ -0,0 +1,296 @@
+# benchmarks/loadtest.py
+"""Load test of the full auth flow, in-process or against a running server.
+
+Each virtual user runs register -> verify-email -> login -> setup and verify
+TOTP -> refresh -> logout. The verification link is read from the email the
+outbox delivers to a local SMTP stand-in, so the worker and SMTP pool are
+part of the measurement.
+
+In-process (default) the harness starts the SMTP stand-in, points the app
+at it and runs the app lifespan against the MySQL in the environment:
+
+    python -m benchmarks.loadtest --users 200 --concurrency 20
+
+Over HTTP, start the server with SMTP_HOST=127.0.0.1, SMTP_PORT=<port>,
+SMTP_SSL=False and pass the same port here:
+
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --smtp-port 2525
+
+Users created over HTTP are not removed; their emails start with
+``loadtest-``. Every virtual user comes from one address, so the server's
+per-IP rate limits and admission limits turn most of the run into 429 and
+503 failures. Start it with RATE_LIMIT_ENABLED=False and
+ADMISSION_CONTROL_ENABLED=False, and ADAPTIVE_CONCURRENCY_ENABLED=False
+unless that is what you are measuring.
+
+``--adaptive`` turns on the adaptive concurrency limit in-process; with it
+on (in-process or on the server) the report includes each route's final
+limit, baseline latency and rejections from ``/health/admission``.
+
+``--save-baseline`` writes the report; ``--baseline`` compares against one
+and exits non-zero if p95 latency or throughput regressed by more than
+``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from typing import Dict, List
+
+import pyotp
+
+from app.admission import adaptive_stats
+from app.config import settings
+from app.database import database
+from app.main import app
+from app.testing.smtp import SMTPStandIn
+from benchmarks.common import (
+    ASGIClient,
+    Client,
+    HTTPClient,
+    print_json,
+    summarize,
+)
+
+PASSWORD = "Load-test-passw0rd!"
+EMAIL = "loadtest-{run}-{i}@example.com"
+TOKEN_RE = re.compile(r"token=([A-Za-z0-9_\-]+)")
+
+
+class Mailbox:
+    """Finds the verification token sent to each recipient."""
+
+    def __init__(self, smtp: SMTPStandIn):
+        self.smtp = smtp
+        self.seen = 0
+        self.tokens: Dict[str, str] = {}
+
+    def _scan(self):
+        for message in self.smtp.messages[self.seen :]:
+            body = message.get_body(("html", "plain"))
+            match = TOKEN_RE.search(body.get_content() if body else "")
+            if match:
+                self.tokens[str(message["To"])] = match.group(1)
+        self.seen = len(self.smtp.messages)
+
+    async def token_for(self, recipient: str, timeout: float) -> str:
+        deadline = time.monotonic() + timeout
+        while True:
+            self._scan()
+            if recipient in self.tokens:
+                return self.tokens.pop(recipient)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No verification email for {recipient}")
+            await asyncio.sleep(0.01)
+
+
+class Recorder:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.email_wait: List[float] = []
+
+    async def call(self, name: str, request, expect: int = 200):
+        start = time.perf_counter()
+        response = await request
+        self.latency[name].append(time.perf_counter() - start)
+        if response.status != expect:
+            self.errors[name] += 1
+            raise RuntimeError(f"{name}: {response.status} {response.body[:200]!r}")
+        return response
+
+
+async def scenario(
+    client: Client, recorder: Recorder, mailbox: Mailbox, email: str, timeout: float
+):
+    await recorder.call(
+        "register",
+        client.post("/auth/register", json_body={"email": email, "password": PASSWORD}),
+    )
+
+    start = time.perf_counter()
+    token = await mailbox.token_for(email, timeout)
+    recorder.email_wait.append(time.perf_counter() - start)
+
+    await recorder.call("verify-email", client.post(f"/auth/verify-email?token={token}"))
+
+    login = await recorder.call(
+        "login",
+        client.post("/auth/login", json_body={"email": email, "password": PASSWORD}),
+    )
+    auth = {"authorization": f"Bearer {login.json()['access_token']}"}
+
+    setup = await recorder.call(
+        "setup-authenticator-mfa",
+        client.post("/auth/setup-authenticator-mfa", headers=auth),
+    )
+    code = pyotp.TOTP(setup.json()["secret"]).now()
+    await recorder.call(
+        "verify-authenticator-mfa",
+        client.post(
+            "/auth/verify-authenticator-mfa", json_body={"code": code}, headers=auth
+        ),
+    )
+
+    refreshed = await recorder.call("refresh", client.post("/auth/refresh"))
+    access_token = refreshed.json()["access_token"]
+
+    await recorder.call(
+        "logout",
+        client.post(
+            "/auth/logout", headers={"authorization": f"Bearer {access_token}"}
+        ),
+    )
+
+
+async def run(args, make_client, mailbox: Mailbox, run_id: str) -> dict:
+    recorder = Recorder()
+    failures: List[str] = []
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(args.users):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            email = EMAIL.format(run=run_id, i=i)
+            try:
+                await scenario(
+                    make_client(), recorder, mailbox, email, args.email_timeout
+                )
+            except Exception as e:
+                failures.append(repr(e))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    requests = sum(len(samples) for samples in recorder.latency.values())
+    return {
+        "mode": "http" if args.url else "in-process",
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "scenarios_per_second": round((args.users - len(failures)) / elapsed, 2),
+        "requests_per_second": round(requests / elapsed, 2),
+        "endpoints": {
+            name: {**summarize(samples), "errors": recorder.errors[name]}
+            for name, samples in recorder.latency.items()
+        },
+        "email_wait": summarize(recorder.email_wait),
+        "failures": len(failures),
+        "first_failures": failures[:5],
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond ``tolerance`` (a fraction) against ``baseline``."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous or not previous["p95_ms"]:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name} p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+            )
+
+    before = baseline.get("scenarios_per_second")
+    after = report["scenarios_per_second"]
+    if before and after < before * (1 - tolerance):
+        regressions.append(f"throughput {before}/s -> {after}/s")
+    if report["failures"] > baseline.get("failures", 0):
+        regressions.append(f"{report['failures']} failed scenarios")
+    return regressions
+
+
+async def cleanup(run_id: str):
+    # Token, code and recovery rows cascade
+    async with database.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            pattern = EMAIL.format(run=run_id, i="%")
+            await cursor.execute("DELETE FROM users WHERE email LIKE %s;", (pattern,))
+            await cursor.execute(
+                "DELETE FROM email_outbox WHERE recipient LIKE %s;", (pattern,)
+            )
+
+
+async def main(args) -> int:
+    run_id = str(int(time.time()))
+
+    async with AsyncExitStack() as stack:
+        smtp = await stack.enter_async_context(
+            SMTPStandIn(port=args.smtp_port)
+        )
+        smtp.delay = args.smtp_delay
+        mailbox = Mailbox(smtp)
+
+        if args.url:
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(args.concurrency))
+            report = await run(args, lambda: HTTPClient(args.url), mailbox, run_id)
+            admission = await HTTPClient(args.url).get("/health/admission")
+            report["adaptive"] = admission.json()
+        else:
+            settings.smtp_host = smtp.host
+            settings.smtp_port = smtp.port
+            settings.smtp_use_ssl = False
+            # Deliver as soon as a message is queued rather than on the poll
+            settings.email_outbox_poll_seconds = 0.05
+            # Every virtual user shares one address and would trip the
+            # per-IP limits
+            settings.rate_limit_enabled = args.rate_limits
+            if args.adaptive:
+                settings.adaptive_concurrency_enabled = True
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            try:
+                report = await run(args, lambda: ASGIClient(app), mailbox, run_id)
+                report["adaptive"] = adaptive_stats()
+            finally:
+                await cleanup(run_id)
+
+    result: dict = {"report": report}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+        exit_code = 1 if regressions else 0
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print_json(result)
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--smtp-port", type=int, default=0)
+    parser.add_argument("--smtp-delay", type=float, default=0)
+    parser.add_argument("--email-timeout", type=float, default=30)
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--save-baseline", help="write this run's report here")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="turn on the adaptive concurrency limit in-process",
+    )
+    parser.add_argument(
+        "--rate-limits",
+        action="store_true",
+        help="keep rate limiting on in-process",
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
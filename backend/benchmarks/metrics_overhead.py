@@ -0,0 +1,50 @@
+# benchmarks/metrics_overhead.py
+"""Per-request cost of MetricsMiddleware on a trivial route.
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+
+from fastapi import FastAPI
+
+from app.metrics import MetricsMiddleware
+from benchmarks.common import ASGIClient, Timer, print_json
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def run_case(instrumented: bool, requests: int):
+    client = ASGIClient(make_app(instrumented))
+    await client.get("/items/0")
+
+    with Timer() as timer:
+        for i in range(requests):
+            await client.get(f"/items/{i}")
+
+    return {
+        "instrumented": instrumented,
+        "us_per_request": round(timer.elapsed / requests * 1e6, 2),
+    }
+
+
+async def main(args):
+    results = [await run_case(flag, args.requests) for flag in (False, True)]
+    overhead = results[1]["us_per_request"] - results[0]["us_per_request"]
+    print_json({"results": results, "overhead_us": round(overhead, 2)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
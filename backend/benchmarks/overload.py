@@ -0,0 +1,145 @@
+# benchmarks/overload.py
+"""Login overload with and without admission control, no database needed.
+
+A stand-in app mirrors the shape of the real routes: ``/auth/login`` waits
+``--db-ms`` for its lookup and then hashes with Argon2 on the worker pool,
+``/auth/refresh`` only does the lookup. Logins arrive open-loop at
+``--rate`` per second, faster than the pool can hash, while refreshes
+arrive at ``--refresh-rate``. Clients give up after ``--client-timeout``.
+
+    python -m benchmarks.overload --rate 200 --seconds 10
+
+Without admission control login latency climbs for the whole run and most
+clients time out; with it, excess logins get 503 within the queue timeout
+and the admitted ones keep a bounded latency.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI
+
+from app.admission import AdmissionMiddleware, build_gates
+from app.auth.utils import SecurityService
+from app.workers import cpu_pool
+from benchmarks.common import ASGIClient, print_json, summarize
+
+PASSWORD = "Benchmark-passw0rd!"
+
+
+def build_app(args, admission: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/auth/login")
+    async def login():
+        await asyncio.sleep(args.db_ms / 1000)
+        await SecurityService.hash_password_async(PASSWORD)
+        return {"ok": True}
+
+    @app.post("/auth/refresh")
+    async def refresh():
+        await asyncio.sleep(args.db_ms / 1000)
+        return {"ok": True}
+
+    if admission:
+        app.add_middleware(
+            AdmissionMiddleware,
+            gates=build_gates(f"/auth/login={args.concurrency}/{args.queue}"),
+            queue_timeout=args.queue_timeout,
+        )
+    return app
+
+
+class Recorder:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = {"login": [], "refresh": []}
+        self.statuses: Dict[str, Counter] = {"login": Counter(), "refresh": Counter()}
+
+    async def call(self, name: str, client: ASGIClient, path: str, timeout: float):
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.post(path), timeout)
+            status: Optional[int] = response.status
+        except asyncio.TimeoutError:
+            status = None
+        elapsed = time.perf_counter() - start
+        self.statuses[name][status or "timeout"] += 1
+        if status == 200:
+            self.latency[name].append(elapsed)
+
+
+async def drive(args, admission: bool) -> dict:
+    client = ASGIClient(build_app(args, admission))
+    recorder = Recorder()
+    tasks = []
+
+    async def arrivals(name: str, path: str, rate: float):
+        interval = 1 / rate
+        deadline = time.perf_counter() + args.seconds
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            tasks.append(
+                asyncio.create_task(
+                    recorder.call(name, client, path, args.client_timeout)
+                )
+            )
+            next_at += interval
+            await asyncio.sleep(max(0, next_at - time.perf_counter()))
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        arrivals("login", "/auth/login", args.rate),
+        arrivals("refresh", "/auth/refresh", args.refresh_rate),
+    )
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "admission": admission,
+        "seconds": round(elapsed, 3),
+        "login_goodput_per_second": round(len(recorder.latency["login"]) / elapsed, 2),
+        "endpoints": {
+            name: {
+                **summarize(samples),
+                "statuses": {str(k): v for k, v in recorder.statuses[name].items()},
+            }
+            for name, samples in recorder.latency.items()
+        },
+    }
+
+
+async def main(args):
+    cpu_pool.start()
+    try:
+        results = []
+        for admission in (False, True):
+            results.append(await drive(args, admission))
+            await asyncio.sleep(1)  # let the pool drain between runs
+    finally:
+        cpu_pool.shutdown()
+
+    print_json(
+        {
+            "rate": args.rate,
+            "worker_pool_size": cpu_pool.max_workers,
+            "admission_limit": f"{args.concurrency}/{args.queue}",
+            "results": results,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rate", type=float, default=200, help="logins per second")
+    parser.add_argument("--refresh-rate", type=float, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--db-ms", type=float, default=2)
+    parser.add_argument("--concurrency", type=int, default=cpu_pool.max_workers)
+    parser.add_argument("--queue", type=int, default=4 * cpu_pool.max_workers)
+    parser.add_argument("--queue-timeout", type=float, default=2)
+    parser.add_argument("--client-timeout", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
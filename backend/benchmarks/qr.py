@@ -0,0 +1,55 @@
+# benchmarks/qr.py
+"""CPU time and response bytes per QR rendering option.
+
+``legacy`` is the previous inline PNG (box 10, border 5). ``inline_bytes``
+is the size of the base64 data URI embedded in the setup JSON; the GET
+endpoint serves ``image_bytes`` instead.
+
+    python -m benchmarks.qr --iterations 200
+"""
+import argparse
+import base64
+import time
+
+import pyotp
+
+from app.auth.utils import SecurityService
+from app.config import settings
+from benchmarks.common import print_json
+
+OPTIONS = {
+    "legacy_png": ("png", 10, 5),
+    "compact_png": ("png", settings.mfa_qr_box_size, settings.mfa_qr_border),
+    "svg": ("svg", settings.mfa_qr_box_size, settings.mfa_qr_border),
+}
+
+
+def main(args):
+    secret = pyotp.random_base32()
+    uri = pyotp.totp.TOTP(secret).provisioning_uri(
+        name="benchmark.user@example.com", issuer_name=settings.app_name
+    )
+
+    results = []
+    for name, (format, box_size, border) in OPTIONS.items():
+        start = time.process_time()
+        for _ in range(args.iterations):
+            image = SecurityService.render_qr_code(uri, format, box_size, border)
+        cpu = time.process_time() - start
+
+        results.append(
+            {
+                "option": name,
+                "cpu_ms_per_render": round(cpu / args.iterations * 1000, 3),
+                "image_bytes": len(image),
+                "inline_bytes": len(base64.b64encode(image)),
+            }
+        )
+
+    print_json({"iterations": args.iterations, "results": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
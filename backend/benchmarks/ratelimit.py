@@ -0,0 +1,60 @@
+# benchmarks/ratelimit.py
+"""Cost per rate-limit check and memory per key as key cardinality grows.
+
+Each level fills the limiter with ``keys`` distinct keys (max_keys is set
+to match) and then times checks spread uniformly over them, the shape of
+a credential-stuffing run across many accounts or addresses.
+
+    python -m benchmarks.ratelimit --levels 1000 100000 1000000
+"""
+import argparse
+import random
+import tracemalloc
+
+from app.ratelimit import RateLimit, RateLimiter
+from benchmarks.common import Timer, print_json
+
+RULE = RateLimit("login:account", 10, 300)
+
+
+def run_level(keys: int, checks: int):
+    names = [f"user{i}@example.com" for i in range(keys)]
+
+    tracemalloc.start()
+    limiter = RateLimiter(max_keys=keys)
+    for name in names:
+        limiter.hit(RULE, name)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sample = [random.choice(names) for _ in range(checks)]
+    with Timer() as timer:
+        for name in sample:
+            limiter.hit(RULE, name)
+
+    # New keys force an eviction per check once the limiter is full
+    fresh = [f"new{i}@example.com" for i in range(checks)]
+    with Timer() as evicting:
+        for name in fresh:
+            limiter.hit(RULE, name)
+
+    return {
+        "keys": keys,
+        "ns_per_check": round(timer.elapsed / checks * 1e9, 1),
+        "ns_per_check_evicting": round(evicting.elapsed / checks * 1e9, 1),
+        "bytes_per_key": round(memory / keys, 1),
+    }
+
+
+def main(args):
+    results = [run_level(keys, args.checks) for keys in args.levels]
+    print_json({"rule": RULE._asdict(), "results": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--levels", type=int, nargs="+", default=[1000, 100000, 1000000]
+    )
+    parser.add_argument("--checks", type=int, default=200000)
+    main(parser.parse_args())
@@ -0,0 +1,272 @@
+# benchmarks/security.py
+"""Per-call cost of the SecurityService primitives, without a database.
+
+Each case runs ``--repeat`` rounds of enough calls to fill about
+``--min-time`` seconds and reports the median and best time per call, so
+results are stable enough to diff. Argon2 runs across cost settings, JWT
+across HS algorithms and verifier backends, QR across formats and box
+sizes.
+
+    python -m benchmarks.security --output security.json
+    python -m benchmarks.security --only argon2 jwt --baseline security.json
+
+``--baseline`` exits non-zero if any case's median got slower by more than
+``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import timedelta
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from typing import Callable, Dict, List, Optional
+
+import pyotp
+from argon2 import PasswordHasher
+from cryptography.fernet import Fernet
+from jose import jwt
+
+from app.auth.keyring import MFAKeyRing
+from app.auth.utils import SecurityService
+from app.auth.verifier import JWTVerifier
+from app.config import settings
+from benchmarks.common import print_json
+
+PASSWORD = "benchmark-passw0rd!"
+SECRET = "benchmark-jwt-secret-" + "x" * 43
+PACKAGES = [
+    "argon2-cffi",
+    "argon2-cffi-bindings",
+    "python-jose",
+    "cryptography",
+    "pyotp",
+    "qrcode",
+    "pillow",
+]
+
+# (time_cost, memory_cost KiB, parallelism); the first is argon2-cffi's default
+ARGON2_PARAMS = [
+    (3, 65536, 4),
+    (2, 19456, 1),
+    (1, 47104, 1),
+    (4, 65536, 1),
+]
+JWT_ALGORITHMS = ["HS256", "HS384", "HS512"]
+QR_OPTIONS = [("png", 2), ("png", 4), ("png", 8), ("svg", 4)]
+
+
+def measure(
+    fn: Callable[[], object], repeat: int, min_time: float
+) -> Dict[str, float]:
+    # Calibrate the batch size so each round takes about min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        if elapsed == 0:
+            number *= 10
+        else:
+            number *= max(2, min(10, int(min_time / elapsed) + 1))
+
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+
+    return {
+        "calls_per_round": number,
+        "median_us": round(statistics.median(rounds) * 1e6, 3),
+        "best_us": round(min(rounds) * 1e6, 3),
+    }
+
+
+def argon2_cases():
+    for time_cost, memory_cost, parallelism in ARGON2_PARAMS:
+        hasher = PasswordHasher(
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+        )
+        password_hash = hasher.hash(PASSWORD)
+        params = {
+            "time_cost": time_cost,
+            "memory_cost": memory_cost,
+            "parallelism": parallelism,
+        }
+        yield "argon2.hash", params, partial(hasher.hash, PASSWORD)
+        yield "argon2.verify", params, partial(
+            hasher.verify, password_hash, PASSWORD
+        )
+
+    password_hash = SecurityService.hash_password(PASSWORD)
+    yield "argon2.verify", {"configured": True}, partial(
+        SecurityService.verify_password, PASSWORD, password_hash
+    )
+
+
+def jwt_cases():
+    payload = {"sub": "1", "auth": True, "tv": 0, "exp": int(time.time()) + 3600}
+    for algorithm in JWT_ALGORITHMS:
+        token = jwt.encode(payload, SECRET, algorithm=algorithm)
+        yield "jwt.encode", {"algorithm": algorithm}, partial(
+            jwt.encode, payload, SECRET, algorithm=algorithm
+        )
+        for backend in ("jose", "hmac"):
+            # No cache: every call pays for the signature check
+            verifier = JWTVerifier(
+                SECRET, algorithm, backend=backend, cache_size=0
+            )
+            params = {"algorithm": algorithm, "backend": backend}
+            yield "jwt.decode", params, partial(verifier.decode, token)
+
+    yield "jwt.generate", {"configured": True}, partial(
+        SecurityService.generate_jwt, 1, timedelta(minutes=30), True, {"tv": 0}
+    )
+
+
+def fernet_cases():
+    primary = Fernet.generate_key().decode()
+    retired = Fernet.generate_key().decode()
+    secret = pyotp.random_base32()
+    for retired_keys in (0, 1):
+        keyring = MFAKeyRing(primary, [retired] * retired_keys)
+        params = {"retired_keys": retired_keys}
+        yield "fernet.encrypt", params, partial(keyring.encrypt, secret)
+        yield "fernet.decrypt", params, partial(
+            keyring.decrypt, keyring.encrypt(secret)
+        )
+
+    # Worst case after a rotation: only the retired key can read the value
+    keyring = MFAKeyRing(primary, [retired])
+    old = MFAKeyRing(retired, []).encrypt(secret)
+    params = {"retired_keys": 1, "retired_value": True}
+    yield "fernet.decrypt", params, partial(keyring.decrypt, old)
+
+
+def totp_cases():
+    secret = pyotp.random_base32()
+    code = pyotp.TOTP(secret).now()
+    verify = SecurityService.verify_totp
+    yield "totp.verify", {"valid": True}, partial(verify, secret, code)
+    yield "totp.verify", {"valid": False}, partial(verify, secret, "000000")
+
+
+def qr_cases():
+    uri = pyotp.totp.TOTP(pyotp.random_base32()).provisioning_uri(
+        name="benchmark.user@example.com", issuer_name=settings.app_name
+    )
+    for format, box_size in QR_OPTIONS:
+        params = {"format": format, "box_size": box_size}
+        yield "qr.render", params, partial(
+            SecurityService.render_qr_code,
+            uri,
+            format,
+            box_size,
+            settings.mfa_qr_border,
+        )
+
+
+def token_cases():
+    token = SecurityService.generate_secure_token()
+    token_hash = SecurityService.hash_token(token)
+    yield "token.generate", {}, SecurityService.generate_secure_token
+    yield "token.hash", {}, partial(SecurityService.hash_token, token)
+    yield "token.verify", {}, partial(
+        SecurityService.verify_secure_token, token, token_hash
+    )
+    yield "email_code.generate", {}, SecurityService.generate_email_mfa_code
+    yield "recovery_codes.generate", {"count": 10}, partial(
+        SecurityService.generate_recovery_codes, 10
+    )
+
+
+GROUPS = {
+    "argon2": argon2_cases,
+    "jwt": jwt_cases,
+    "fernet": fernet_cases,
+    "totp": totp_cases,
+    "qr": qr_cases,
+    "token": token_cases,
+}
+
+
+def case_key(result: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def environment() -> Dict[str, object]:
+    packages: Dict[str, Optional[str]] = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = version(package)
+        except PackageNotFoundError:
+            packages[package] = None
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    previous = {case_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(case_key(result))
+        if not before:
+            continue
+        if result["median_us"] > before["median_us"] * (1 + tolerance):
+            regressions.append(
+                f"{case_key(result)} {before['median_us']}us"
+                f" -> {result['median_us']}us"
+            )
+    return regressions
+
+
+def main(args) -> int:
+    results = []
+    for group in args.only:
+        for name, params, fn in GROUPS[group]():
+            timing = measure(fn, args.repeat, args.min_time)
+            results.append({"name": name, "params": params, **timing})
+
+    report = {"environment": environment(), "results": results}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print_json(report)
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=list(GROUPS), default=list(GROUPS)
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+# benchmarks/smtp_pool.py
+"""Email throughput: a new SMTP connection per message versus the pool.
+
+Runs against the local SMTP stand-in; ``--connect-delay`` approximates the
+TLS handshake and login round trips a real provider adds per connection.
+
+    python -m benchmarks.smtp_pool --messages 200 --connect-delay 0.05
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email import policy
+from email.message import EmailMessage
+
+from app.config import settings
+from app.email.smtp import SMTPPool, send_message, smtp_connect
+from app.testing.smtp import SMTPStandIn
+from benchmarks.common import print_json
+
+
+def raw_message(i: int):
+    msg = EmailMessage()
+    msg["From"] = settings.email
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = "Benchmark"
+    msg.set_content("benchmark body " * 20)
+    return (msg["To"], msg.as_bytes(policy=policy.SMTP).decode())
+
+
+def send_unpooled(messages):
+    for recipient, raw in messages:
+        with smtp_connect() as smtp:
+            send_message(smtp, recipient, raw)
+
+
+def chunks(items, size):
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+async def run_case(name, fn, batches, threads):
+    loop = asyncio.get_running_loop()
+    messages = sum(len(batch) for batch in batches)
+    with ThreadPoolExecutor(threads) as executor:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(loop.run_in_executor(executor, fn, batch) for batch in batches)
+        )
+        elapsed = time.perf_counter() - start
+    return {
+        "mode": name,
+        "messages": messages,
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(messages / elapsed, 1),
+    }
+
+
+async def main(args):
+    server = SMTPStandIn()
+    server.connect_delay = args.connect_delay
+    await server.start()
+
+    settings.smtp_host = server.host
+    settings.smtp_port = server.port
+    settings.smtp_use_ssl = False
+
+    messages = [raw_message(i) for i in range(args.messages)]
+    batches = chunks(messages, args.batch_size)
+    pool = SMTPPool(args.pool_size, idle_timeout=60, noop_after=15)
+
+    try:
+        results = [
+            await run_case("per_message", send_unpooled, batches, args.pool_size),
+            await run_case("pooled", pool.send_batch, batches, args.pool_size),
+        ]
+        connections = server.connections
+    finally:
+        await asyncio.to_thread(pool.close)
+        await server.stop()
+
+    print_json(
+        {
+            "connect_delay_s": args.connect_delay,
+            "pool_size": args.pool_size,
+            "batch_size": args.batch_size,
+            "connections_opened": connections,
+            "results": results,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+# benchmarks/tracing_overhead.py
+"""Cost of tracing spans, per span and per request.
+
+``off`` is the production default (no header, no sampling), where ``span``
+only checks a context variable; ``header`` adds Server-Timing to every
+response and ``sampled`` also exports every request to a temporary file.
+
+    python -m benchmarks.tracing_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+from fastapi import FastAPI
+
+from app.tracing import Trace, TraceExporter, TracingMiddleware, _current, span
+from benchmarks.common import ASGIClient, Timer, print_json
+
+SPANS_PER_REQUEST = 6
+
+
+def span_cost(iterations: int, traced: bool) -> float:
+    token = _current.set(Trace(sampled=False) if traced else None)
+    try:
+        with Timer() as timer:
+            for _ in range(iterations):
+                with span("db"):
+                    pass
+    finally:
+        _current.reset(token)
+    return round(timer.elapsed / iterations * 1e9, 1)
+
+
+def make_app(**kwargs) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        for _ in range(SPANS_PER_REQUEST):
+            with span("db"):
+                pass
+        return {"id": item_id}
+
+    if kwargs:
+        app.add_middleware(TracingMiddleware, **kwargs)
+    return app
+
+
+async def request_cost(app: FastAPI, requests: int) -> float:
+    client = ASGIClient(app)
+    await client.get("/items/0")
+    with Timer() as timer:
+        for i in range(requests):
+            await client.get(f"/items/{i}")
+    return round(timer.elapsed / requests * 1e6, 2)
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        exporter = TraceExporter()
+        exporter.start(os.path.join(directory, "traces.jsonl"), 50 * 1024 * 1024, 1)
+        try:
+            cases = {
+                "no_middleware": make_app(),
+                "off": make_app(header=False, sample_rate=0),
+                "header": make_app(header=True, sample_rate=0),
+                "sampled": make_app(header=False, sample_rate=1, exporter=exporter),
+            }
+            requests = {
+                name: await request_cost(app, args.requests)
+                for name, app in cases.items()
+            }
+        finally:
+            exporter.stop()
+
+    print_json(
+        {
+            "ns_per_span": {
+                "untraced": span_cost(args.spans, False),
+                "traced": span_cost(args.spans, True),
+            },
+            "spans_per_request": SPANS_PER_REQUEST,
+            "us_per_request": requests,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--spans", type=int, default=1000000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,145 @@
+# benchmarks/unit_of_work.py
+"""Pool acquires and latency per auth endpoint, with and without the unit of work.
+
+Needs the MySQL configured in the environment. Each round walks one new user
+through register, verify-email, login, authenticator setup and verification
+and recovery-code regeneration; the outbox worker is not started, so queued
+emails stay in the table and are removed with the users at the end.
+
+    python -m benchmarks.unit_of_work --users 50
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import pyotp
+
+from app.auth.utils import SecurityService
+from app.config import settings
+from app.database import database
+from app.main import app
+from benchmarks.common import ASGIClient, print_json, summarize
+
+PASSWORD = "Benchmark-passw0rd!"
+
+
+class Recorder:
+    def __init__(self):
+        self.acquires: Dict[str, List[int]] = defaultdict(list)
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+
+    async def call(self, name: str, request):
+        acquired = database.acquired
+        start = time.perf_counter()
+        response = await request
+        self.latency[name].append(time.perf_counter() - start)
+        self.acquires[name].append(database.acquired - acquired)
+        assert response.status < 400, (name, response.status, response.body)
+        return response
+
+    def results(self):
+        return {
+            name: {
+                "acquires_per_request": sum(counts) / len(counts),
+                "latency": summarize(self.latency[name]),
+            }
+            for name, counts in self.acquires.items()
+        }
+
+
+async def run_user(recorder: Recorder, email: str, tokens: List[str]):
+    client = ASGIClient(app)
+
+    await recorder.call(
+        "register",
+        client.post(
+            "/auth/register", json_body={"email": email, "password": PASSWORD}
+        ),
+    )
+    await recorder.call(
+        "verify-email", client.post(f"/auth/verify-email?token={tokens[-1]}")
+    )
+
+    login = await recorder.call(
+        "login",
+        client.post(
+            "/auth/login", json_body={"email": email, "password": PASSWORD}
+        ),
+    )
+    auth = {"authorization": f"Bearer {login.json()['access_token']}"}
+
+    setup = await recorder.call(
+        "setup-authenticator-mfa",
+        client.post("/auth/setup-authenticator-mfa", headers=auth),
+    )
+    code = pyotp.TOTP(setup.json()["secret"]).now()
+    verified = await recorder.call(
+        "verify-authenticator-mfa",
+        client.post(
+            "/auth/verify-authenticator-mfa",
+            json_body={"code": code},
+            headers=auth,
+        ),
+    )
+
+    auth = {"authorization": f"Bearer {verified.json()['access_token']}"}
+    await recorder.call(
+        "regenerate-recovery-codes",
+        client.post("/auth/regenerate-recovery-codes", headers=auth),
+    )
+
+
+async def run_case(enabled: bool, users: int, tokens: List[str]):
+    settings.db_unit_of_work = enabled
+    recorder = Recorder()
+    emails = [f"uow-bench-{enabled:d}-{i}@example.com" for i in range(users)]
+
+    try:
+        for email in emails:
+            await run_user(recorder, email, tokens)
+    finally:
+        # Token and code rows cascade
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "DELETE FROM users WHERE email LIKE %s;", ("uow-bench-%",)
+                )
+
+    return {"unit_of_work": enabled, "endpoints": recorder.results()}
+
+
+async def main(args):
+    # The verification token only leaves the app inside the email body
+    tokens: List[str] = []
+    generate = SecurityService.generate_secure_token
+
+    def recording_token(*args, **kwargs):
+        tokens.append(generate(*args, **kwargs))
+        return tokens[-1]
+
+    SecurityService.generate_secure_token = recording_token  # type: ignore[method-assign]
+
+    await database.connect()
+    try:
+        results = [
+            await run_case(enabled, args.users, tokens) for enabled in (False, True)
+        ]
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "DELETE FROM email_outbox WHERE recipient LIKE %s;",
+                    ("uow-bench-%",),
+                )
+    finally:
+        await database.disconnect()
+        SecurityService.generate_secure_token = generate  # type: ignore[method-assign]
+
+    print_json({"users": args.users, "results": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
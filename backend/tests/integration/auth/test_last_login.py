@@ -0,0 +1,78 @@
+# pyright: reportOptionalMemberAccess=none, reportArgumentType=none
+import asyncio
+import unittest
+
+from app.auth.last_login import LastLoginBuffer, build_update
+from app.auth.services import UserService
+from app.database import database
+
+password = "test_password"
+emails = [f"last-login-{i}@gmail.com" for i in range(3)]
+
+
+class TestLastLoginBuffer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await database.connect()
+        asyncio.get_event_loop().set_debug(False)
+        self.users = [
+            await UserService.create_user(email, password) for email in emails
+        ]
+
+    async def asyncTearDown(self) -> None:
+        for email in emails:
+            await UserService.delete_user(email, password)
+        await database.disconnect()
+
+    async def last_logins(self):
+        return [
+            (await UserService.get_user_by_id(user.id)).last_login
+            for user in self.users
+        ]
+
+    def test_build_update(self):
+        query, args = build_update({1: "a", 2: "b"})
+
+        self.assertEqual(
+            query,
+            "UPDATE users SET last_login = CASE id WHEN %s THEN %s WHEN %s THEN %s END WHERE id IN (%s, %s);",
+        )
+        self.assertEqual(args, [1, "a", 2, "b", 1, 2])
+
+    async def test_write_through_when_stopped(self):
+        buffer = LastLoginBuffer()
+
+        await buffer.record(self.users[0].id)
+
+        self.assertIsNotNone((await self.last_logins())[0])
+        self.assertEqual(buffer.stats()["recorded"], 0)
+
+    async def test_coalesce_and_flush(self):
+        buffer = LastLoginBuffer()
+        buffer.start(interval=60)
+        try:
+            for user in self.users + self.users[:1]:
+                await buffer.record(user.id)
+
+            # Nothing written until the flush
+            self.assertEqual(await self.last_logins(), [None, None, None])
+
+            written = await buffer.flush(batch_size=2)
+        finally:
+            await buffer.stop()
+
+        self.assertEqual(written, 3)
+        self.assertTrue(all(await self.last_logins()))
+        stats = buffer.stats()
+        self.assertEqual(stats["recorded"], 4)
+        self.assertEqual(stats["coalesced"], 1)
+        self.assertEqual(stats["pending"], 0)
+
+    async def test_stop_flushes(self):
+        buffer = LastLoginBuffer()
+        buffer.start(interval=60)
+        await buffer.record(self.users[1].id)
+
+        await buffer.stop()
+
+        self.assertIsNotNone((await self.last_logins())[1])
+        self.assertFalse(buffer.running)
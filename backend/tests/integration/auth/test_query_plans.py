@@ -0,0 +1,149 @@
+# pyright: reportOptionalMemberAccess=none, reportArgumentType=none
+import ast
+import asyncio
+import inspect
+import os
+import unittest
+from datetime import datetime, timedelta
+
+import aiomysql
+
+import app.auth.services as services
+from app.auth.utils import SecurityService
+from app.database import database
+
+SEED_USERS = int(os.getenv("QUERY_PLAN_SEED_USERS", "5000"))
+SEED_EMAIL = "plan-seed-{}@example.com"
+
+# Every SELECT/UPDATE/DELETE in app/auth/services.py with sample arguments.
+# Keys must match the source text; test_all_queries_covered keeps them in
+# sync.
+SAMPLE_TOKEN = SecurityService.hash_token("plan-sample")
+QUERIES = {
+    "SELECT * FROM users WHERE id=%s LIMIT 1;": (1,),
+    "SELECT * FROM users WHERE email=%s LIMIT 1;": ("a@example.com",),
+    "SELECT token_version FROM users WHERE id=%s LIMIT 1;": (1,),
+    "UPDATE users SET token_version = token_version + 1 WHERE id=%s;": (1,),
+    "DELETE FROM users WHERE id=%s;": (1,),
+    "UPDATE users SET password_hash=%s WHERE id=%s AND password_hash=%s;": ("x", 1, "y"),
+    "SELECT id, email, authenticator_mfa_enabled, created_at, last_login FROM users WHERE id = %s;": (1,),
+    "SELECT COUNT(*) FROM users WHERE id=%s;": (1,),
+    "DELETE FROM email_mfa_codes WHERE user_id = %s AND code_hash = %s AND expires_at > UTC_TIMESTAMP();": (1, SAMPLE_TOKEN),
+    "DELETE FROM email_mfa_codes WHERE user_id=%s;": (1,),
+    "DELETE FROM recovery_codes WHERE user_id = %s AND code_hash = %s;": (1, SAMPLE_TOKEN),
+    "DELETE FROM recovery_codes WHERE user_id=%s;": (1,),
+    "SELECT * FROM refresh_tokens WHERE token_hash=%s;": (SAMPLE_TOKEN,),
+    "DELETE FROM refresh_tokens WHERE token_hash=%s AND user_id=%s;": (SAMPLE_TOKEN, 1),
+    "DELETE FROM refresh_tokens WHERE user_id=%s AND expires_at <= UTC_TIMESTAMP();": (1,),
+    "DELETE FROM verification_tokens WHERE user_id=%s;": (1,),
+    "DELETE FROM verification_tokens WHERE expires_at <= UTC_TIMESTAMP();": (),
+    "SELECT * FROM verification_tokens WHERE token_hash=%s AND token_type=%s;": (SAMPLE_TOKEN, "password_reset"),
+    # UserService.update_user builds its SET clause from the update
+    "UPDATE users SET email=%s WHERE id=%s": ("a@example.com", 1),
+}
+
+
+def service_queries():
+    """SQL string literals in app/auth/services.py, minus f-string parts."""
+    tree = ast.parse(inspect.getsource(services))
+    fragments = {
+        id(value)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.JoinedStr)
+        for value in node.values
+    }
+
+    queries = set()
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Constant)
+            and isinstance(node.value, str)
+            and id(node) not in fragments
+            and node.value.lstrip().split(" ")[0].upper()
+            in ("SELECT", "UPDATE", "DELETE")
+        ):
+            queries.add(node.value)
+    return queries
+
+
+async def seed(cursor, count: int):
+    # About a tenth of each token table is expired, as in steady state
+    now = datetime.utcnow()
+    await cursor.executemany(
+        "INSERT INTO users (email, password_hash, is_verified) VALUES (%s, %s, %s);",
+        [(SEED_EMAIL.format(i), "x", True) for i in range(count)],
+    )
+    await cursor.execute(
+        "SELECT id FROM users WHERE email LIKE %s;", ("plan-seed-%",)
+    )
+    ids = [row["id"] for row in await cursor.fetchall()]
+
+    def token(kind, user_id):
+        return SecurityService.hash_token(f"{kind}-{user_id}")
+
+    await cursor.executemany(
+        "INSERT INTO refresh_tokens (user_id, token_hash, expires_at) VALUES (%s, %s, %s);",
+        [(i, token("refresh", i), now + timedelta(days=i % 20 - 2)) for i in ids],
+    )
+    await cursor.executemany(
+        "INSERT INTO verification_tokens (user_id, token_hash, token_type, expires_at) VALUES (%s, %s, %s, %s);",
+        [
+            (i, token("verify", i), "email_verification", now + timedelta(hours=i % 40 - 4))
+            for i in ids
+        ],
+    )
+    await cursor.executemany(
+        "INSERT INTO email_mfa_codes (user_id, code_hash, expires_at) VALUES (%s, %s, %s);",
+        [(i, token("mfa", i), now + timedelta(minutes=i % 50 - 5)) for i in ids],
+    )
+    await cursor.executemany(
+        "INSERT INTO recovery_codes (user_id, code_hash) VALUES (%s, %s);",
+        [(i, token(f"recovery{n}", i)) for i in ids for n in range(2)],
+    )
+    for table in (
+        "users",
+        "refresh_tokens",
+        "verification_tokens",
+        "email_mfa_codes",
+        "recovery_codes",
+    ):
+        await cursor.execute(f"ANALYZE TABLE {table};")
+        await cursor.fetchall()
+
+
+class TestQueryPlans(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await database.connect()
+        asyncio.get_event_loop().set_debug(False)
+
+        async with database.get_connection() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await seed(cursor, SEED_USERS)
+
+    async def asyncTearDown(self) -> None:
+        # Token and code rows cascade
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "DELETE FROM users WHERE email LIKE %s;", ("plan-seed-%",)
+                )
+        await database.disconnect()
+
+    async def test_all_queries_covered(self):
+        missing = service_queries() - set(QUERIES)
+        self.assertEqual(missing, set(), "add new queries to QUERIES")
+
+    async def test_queries_use_index(self):
+        async with database.get_connection() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                for query, args in QUERIES.items():
+                    with self.subTest(query=query):
+                        await cursor.execute(f"EXPLAIN {query}", args)
+                        plan = await cursor.fetchall()
+
+                        for row in plan:
+                            if row.get("table") is None:
+                                # e.g. "no matching row in const table"
+                                continue
+                            self.assertNotEqual(row["type"], "ALL", plan)
+                            self.assertIsNotNone(row["key"], plan)
@@ -0,0 +1,62 @@
+# pyright: reportOptionalMemberAccess=none, reportArgumentType=none
+import asyncio
+import unittest
+
+from cryptography.fernet import Fernet
+
+from app.auth.keyring import MFAKeyRing
+from app.auth.rekey import rekey_mfa_secrets
+from app.auth.schemas import UserUpdate
+from app.auth.services import UserService
+from app.database import database
+
+password = "test_password"
+emails = [f"rekey{i}@gmail.com" for i in range(5)]
+
+OLD_KEY = Fernet.generate_key().decode()
+NEW_KEY = Fernet.generate_key().decode()
+
+
+class TestRekeyMfaSecrets(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await database.connect()
+        asyncio.get_event_loop().set_debug(False)
+
+    async def asyncTearDown(self) -> None:
+        for email in emails:
+            await UserService.delete_user(email, password)
+        await database.disconnect()
+
+    async def test_rekey(self):
+        old = MFAKeyRing(OLD_KEY, [])
+        ids = []
+        for i, email in enumerate(emails):
+            user = await UserService.create_user(email, password)
+            update = UserUpdate()
+            update.mfa_secret = old.encrypt(f"secret{i}")
+            await UserService.update_user(user.id, update)
+            ids.append(user.id)
+
+        batches = []
+        keyring = MFAKeyRing(NEW_KEY, [OLD_KEY])
+        progress = await rekey_mfa_secrets(
+            keyring,
+            batch_size=2,
+            pause=0,
+            start_after=min(ids) - 1,
+            on_progress=lambda p: batches.append(p.scanned),
+        )
+
+        self.assertGreaterEqual(progress.rekeyed, len(emails))
+        self.assertGreaterEqual(len(batches), 3)
+
+        new = MFAKeyRing(NEW_KEY, [])
+        for i, user_id in enumerate(ids):
+            user = await UserService.get_user_by_id(user_id)
+            self.assertEqual(new.decrypt(user.mfa_secret), f"secret{i}")
+
+        # A second pass finds nothing left to rotate
+        progress = await rekey_mfa_secrets(
+            keyring, batch_size=2, pause=0, start_after=min(ids) - 1
+        )
+        self.assertEqual(progress.rekeyed, 0)
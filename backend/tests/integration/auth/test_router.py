@@ -1,7 +1,7 @@
 # pyright: reportOptionalMemberAccess=none, reportArgumentType=none, reportOperatorIssue=none
 import asyncio
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import HTTPException, Request, Response
 from fastapi.security import HTTPAuthorizationCredentials
 from jose import jwt
@@ -18,8 +18,14 @@ from app.auth.schemas import (
     MFAVerifiactionCode,
 )
 from app.auth.utils import SecurityService
+from app.ratelimit import rate_limiter
 from app.database import database
-from app.auth.services import RecoveryCodeService, TokenService, UserService
+from app.auth.services import (
+    RecoveryCodeService,
+    TokenService,
+    UserService,
+    wait_for_rehashes,
+)
 from datetime import datetime
 from app.config import settings
 from app.dependencies import get_current_user, get_user_pending_mfa
@@ -33,6 +39,7 @@ from app.auth.router import (
     send_email_mfa_code,
     send_verification_email,
     setup_authenticator_mfa,
+    authenticator_mfa_qr_code,
     verify_authenticator_mfa,
     verify_email,
     forgot_password,
@@ -73,7 +80,7 @@ async def mock_send_verification_email(mock_email_service_class) -> str:
         return mock_email_service
 
     mock_email_service.body.side_effect = mock_body
-    mock_email_service.send.return_value = None
+    mock_email_service.enqueue = AsyncMock(return_value=None)
 
     # This makes EmailService() return our mock instance
     mock_email_service_class.return_value = mock_email_service
@@ -104,7 +111,7 @@ async def mock_forgot_password(mock_email_service_class) -> str:
         return mock_email_service
 
     mock_email_service.body.side_effect = mock_body
-    mock_email_service.send.return_value = None
+    mock_email_service.enqueue = AsyncMock(return_value=None)
 
     # This makes EmailService() return our mock instance
     mock_email_service_class.return_value = mock_email_service
@@ -137,7 +144,7 @@ async def mock_mfa_email(user, mock_email_service_class) -> str:
         return mock_email_service
 
     mock_email_service.body.side_effect = mock_body
-    mock_email_service.send.return_value = None
+    mock_email_service.enqueue = AsyncMock(return_value=None)
 
     # This makes EmailService() return our mock instance
     mock_email_service_class.return_value = mock_email_service
@@ -168,7 +175,7 @@ async def mock_register(mock_email_service_class) -> str:
         return mock_email_service
 
     mock_email_service.body.side_effect = mock_body
-    mock_email_service.send.return_value = None
+    mock_email_service.enqueue = AsyncMock(return_value=None)
 
     # This makes EmailService() return our mock instance
     mock_email_service_class.return_value = mock_email_service
@@ -181,12 +188,14 @@ class TestAuthRouter(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self) -> None:
         await database.connect()
         asyncio.get_event_loop().set_debug(False)
+        # The suite logs the same accounts in more often than the limits allow
+        rate_limiter.reset()
 
     async def asyncTearDown(self) -> None:
         await database.disconnect()
 
     # register
-    @patch("app.auth.services.EmailService.send", new_callable=MagicMock)
+    @patch("app.auth.services.EmailService.enqueue", new_callable=AsyncMock)
     async def test_register_success(self, _):
         await register(user_create)
         response = await UserService.get_user_by_email(email)
@@ -202,7 +211,7 @@ class TestAuthRouter(unittest.IsolatedAsyncioTestCase):
 
         await UserService.delete_user(email, password)
 
-    @patch("app.auth.services.EmailService.send", new_callable=MagicMock)
+    @patch("app.auth.services.EmailService.enqueue", new_callable=AsyncMock)
     async def test_register_duplicate(self, _):
         await register(user_create)
         response = await UserService.get_user_by_email(email)
@@ -286,6 +295,23 @@ class TestAuthRouter(unittest.IsolatedAsyncioTestCase):
         # Cleanup
         await UserService.delete_user(email, password)
 
+    async def test_login_rehashes_outdated_password(self):
+        token = await mock_register()
+        await verify_email(token)
+        old = (await UserService.get_user_by_email(email, readonly=False)).password_hash
+
+        # test
+        with patch.object(SecurityService, "needs_rehash", return_value=True):
+            await login(login_request)
+        await wait_for_rehashes()
+
+        user = await UserService.get_user_by_email(email, readonly=False)
+        self.assertNotEqual(user.password_hash, old)
+        self.assertTrue(SecurityService.verify_password(password, user.password_hash))
+
+        # Cleanup
+        await UserService.delete_user(email, password)
+
     async def test_login_no_user(self):
         with self.assertRaises(HTTPException) as cm:
             await login(login_request)
@@ -395,6 +421,43 @@ class TestAuthRouter(unittest.IsolatedAsyncioTestCase):
         # Cleanup
         await UserService.delete_user(email, password)
 
+    async def test_authenticator_mfa_qr_code_success(self):
+        token = await mock_register()
+        await verify_email(token)
+        response = await login(login_request)
+
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=response.access_token,
+        )
+
+        user = await get_user_pending_mfa(credentials=credentials)
+        await setup_authenticator_mfa(user)
+        user = await get_user_pending_mfa(credentials=credentials)
+
+        # Test
+        scope: Scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/auth/authenticator-mfa-qr-code",
+            "headers": [],
+            "query_string": b"",
+        }
+        response = await authenticator_mfa_qr_code(Request(scope), "svg", user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.media_type, "image/svg+xml")
+        self.assertIn("private", response.headers["cache-control"])
+        self.assertTrue(response.body.startswith(b"<svg "))
+
+        etag = response.headers["etag"]
+        scope["headers"] = [(b"if-none-match", etag.encode())]
+        response = await authenticator_mfa_qr_code(Request(scope), "svg", user)
+        self.assertEqual(response.status_code, 304)
+
+        # Cleanup
+        await UserService.delete_user(email, password)
+
     # verify authenticator  mfa
     async def test_verify_authenticator_mfa_success(self):
         token = await mock_register()
@@ -465,7 +528,7 @@ class TestAuthRouter(unittest.IsolatedAsyncioTestCase):
         await UserService.delete_user(email, password)
 
     # send mfa code email
-    @patch("app.auth.services.EmailService.send", new_callable=MagicMock)
+    @patch("app.auth.services.EmailService.enqueue", new_callable=AsyncMock)
     async def test_send_mfa_email(self, _):
         await mock_register()
         token = await mock_send_verification_email()
@@ -756,10 +819,15 @@ class TestAuthRouter(unittest.IsolatedAsyncioTestCase):
         response = await disable_authenticator_mfa(
             MFAVerifiactionCode(code=code), user
         )
-        user = await get_current_user(credentials=credentials)
+        user = await UserService.get_user_by_id(user.id)
         self.assertFalse(user.authenticator_mfa_enabled)
         self.assertIsNone(user.mfa_secret)
 
+        # Outstanding access tokens are revoked
+        with self.assertRaises(HTTPException) as cm:
+            await get_current_user(credentials=credentials)
+        self.assertEqual(cm.exception.status_code, 401)
+
         # Cleanup
         await UserService.delete_user(email, password)
 
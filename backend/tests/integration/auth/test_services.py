@@ -16,6 +16,7 @@ from app.auth.services import (
     RecoveryCodeService,
     UserService,
     TokenService,
+    user_cache,
 )
 import datetime as dt
 from datetime import datetime, timedelta
@@ -92,6 +93,27 @@ class TestUserService(unittest.IsolatedAsyncioTestCase):
         # Clean-up
         await UserService.delete_user(email, password)
 
+    async def test_get_user_by_id_cache(self):
+        user = await UserService.create_user(email, password)
+
+        await UserService.get_user_by_id(user.id)
+        hits = user_cache.hits
+        cached = await UserService.get_user_by_id(user.id)
+        self.assertEqual(user_cache.hits, hits + 1)
+        self.assertFalse(cached.is_verified)
+
+        # Writes invalidate the cached record
+        update_user = UserUpdate()
+        update_user.is_verified = True
+        await UserService.update_user(user.id, update_user)
+
+        updated = await UserService.get_user_by_id(user.id)
+        self.assertTrue(updated.is_verified)
+
+        # Clean-up
+        await UserService.delete_user(email, password)
+        self.assertIsNone(await UserService.get_user_by_id(user.id))
+
     async def test_check_user_exists(self):
         await UserService.create_user(email, password)
 
@@ -152,6 +174,24 @@ class TestEmailMfaCodes(unittest.IsolatedAsyncioTestCase):
         # Cleanup
         await UserService.delete_user(email, password)
 
+    async def test_concurrent_mfa_code_accepted_once(self):
+        user = await UserService.create_user(email, password)
+        code = await EmailMfaCodeService.create_email_mfa_code(
+            user.id, timedelta(minutes=5)
+        )
+
+        # Test
+        results = await asyncio.gather(
+            *(
+                EmailMfaCodeService.verify_email_mfa_code(user.id, code)
+                for _ in range(10)
+            )
+        )
+        self.assertEqual(results.count(True), 1)
+
+        # Cleanup
+        await UserService.delete_user(email, password)
+
     async def test_expired_mfa_codes(self):
         user = await UserService.create_user(email, password)
         code = await EmailMfaCodeService.create_email_mfa_code(
@@ -208,6 +248,26 @@ class TestRecoveryCodeService(unittest.IsolatedAsyncioTestCase):
         # Cleanup
         await UserService.delete_user(email, password)
 
+    async def test_concurrent_recovery_code_accepted_once(self):
+        user = await UserService.create_user(email, password)
+        codes = await RecoveryCodeService.create_recovery_codes(user.id)
+
+        results = await asyncio.gather(
+            *(
+                RecoveryCodeService.verify_recovery_code(user.id, codes[0])
+                for _ in range(10)
+            )
+        )
+        self.assertEqual(results.count(True), 1)
+
+        # The other codes are untouched
+        self.assertTrue(
+            await RecoveryCodeService.verify_recovery_code(user.id, codes[1])
+        )
+
+        # Cleanup
+        await UserService.delete_user(email, password)
+
     async def test_verify_recovery_false(self):
         user = await UserService.create_user(email, password)
 
@@ -0,0 +1,121 @@
+# pyright: reportOptionalMemberAccess=none, reportArgumentType=none
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from app.auth.services import UserService
+from app.auth.sweeper import LOCK_NAME, ExpirySweeper
+from app.auth.utils import SecurityService
+from app.database import database
+
+email = "sweeper@gmail.com"
+password = "test_password"
+
+
+async def count(table: str, user_id: int) -> int:
+    async with database.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE user_id=%s;", (user_id,)
+            )
+            (result,) = await cursor.fetchone()
+            return result
+
+
+class TestExpirySweeper(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await database.connect()
+        asyncio.get_event_loop().set_debug(False)
+        self.user = await UserService.create_user(email, password)
+
+    async def asyncTearDown(self) -> None:
+        await UserService.delete_user(email, password)
+        await database.disconnect()
+
+    async def seed(self):
+        now = datetime.utcnow()
+        user_id = self.user.id
+
+        def token(name):
+            return SecurityService.hash_token(f"sweeper-{user_id}-{name}")
+
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.executemany(
+                    "INSERT INTO refresh_tokens (user_id, token_hash, expires_at) VALUES (%s, %s, %s);",
+                    [(user_id, token(f"r{i}"), now - timedelta(days=1)) for i in range(5)]
+                    + [(user_id, token("r-live"), now + timedelta(days=1))],
+                )
+                await cursor.execute(
+                    "INSERT INTO verification_tokens (user_id, token_hash, token_type, expires_at) VALUES (%s, %s, %s, %s);",
+                    (user_id, token("v"), "password_reset", now - timedelta(hours=1)),
+                )
+                await cursor.executemany(
+                    "INSERT INTO email_mfa_codes (user_id, code_hash, expires_at) VALUES (%s, %s, %s);",
+                    [
+                        (user_id, token("m-old"), now - timedelta(minutes=1)),
+                        (user_id, token("m-live"), now + timedelta(minutes=5)),
+                    ],
+                )
+
+    async def test_run_once(self):
+        await self.seed()
+        sweeper = ExpirySweeper()
+
+        deleted = await sweeper.run_once(batch_size=2, pause=0)
+
+        self.assertGreaterEqual(deleted["refresh_tokens"], 5)
+        self.assertGreaterEqual(deleted["verification_tokens"], 1)
+        self.assertGreaterEqual(deleted["email_mfa_codes"], 1)
+        self.assertEqual(await count("refresh_tokens", self.user.id), 1)
+        self.assertEqual(await count("verification_tokens", self.user.id), 0)
+        self.assertEqual(await count("email_mfa_codes", self.user.id), 1)
+        self.assertEqual(sweeper.stats()["runs"], 1)
+        self.assertEqual(sweeper.run_seconds.count, 1)
+
+    async def test_skips_when_locked_elsewhere(self):
+        await self.seed()
+        sweeper = ExpirySweeper()
+
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT GET_LOCK(%s, 0);", (LOCK_NAME,))
+                try:
+                    self.assertIsNone(await sweeper.run_once())
+                finally:
+                    await cursor.execute("SELECT RELEASE_LOCK(%s);", (LOCK_NAME,))
+
+        self.assertEqual(sweeper.skipped, 1)
+        self.assertEqual(await count("refresh_tokens", self.user.id), 6)
+
+    async def test_removes_finished_outbox_emails(self):
+        recipient = "sweeper-outbox@example.com"
+        old = datetime.utcnow() - timedelta(days=30)
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.executemany(
+                    "INSERT INTO email_outbox (recipient, message, status, next_attempt_at) VALUES (%s, %s, %s, %s);",
+                    [
+                        (recipient, None, "sent", old),
+                        (recipient, None, "dead", old),
+                        (recipient, "body", "pending", old),
+                        (recipient, None, "sent", datetime.utcnow()),
+                    ],
+                )
+
+        sweeper = ExpirySweeper()
+        deleted = await sweeper.run_once(batch_size=1, pause=0)
+
+        async with database.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT status FROM email_outbox WHERE recipient=%s ORDER BY id;",
+                    (recipient,),
+                )
+                remaining = [status for (status,) in await cursor.fetchall()]
+                await cursor.execute(
+                    "DELETE FROM email_outbox WHERE recipient=%s;", (recipient,)
+                )
+
+        self.assertGreaterEqual(deleted["email_outbox"], 2)
+        self.assertEqual(remaining, ["pending", "sent"])
@@ -35,7 +35,17 @@ class TestSercurityService(unittest.TestCase):
         self.assertEqual(secret, decrypted)
 
     def test_generate_qr_code(self):
-        pass
+        secret = SecurityService.generate_mfa_secret()
+
+        png = SecurityService.generate_qr_code("a@b.com", secret, "png")
+        self.assertTrue(png.startswith("data:image/png;base64,"))
+
+        svg = SecurityService.generate_qr_code_image("a@b.com", secret, "svg")
+        self.assertTrue(svg.startswith(b"<svg "))
+        self.assertIn(b'shape-rendering="crispEdges"', svg)
+
+        with self.assertRaises(ValueError):
+            SecurityService.generate_qr_code_image("a@b.com", secret, "gif")
 
     def test_verify_totop(self):
         pass
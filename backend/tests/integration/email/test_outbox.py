@@ -0,0 +1,165 @@
+# pyright: reportOptionalMemberAccess=none, reportArgumentType=none
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import aiomysql
+
+from app.config import settings
+from app.database import database
+from app.email.messages import MfaEmailMessage
+from app.email.outbox import outbox
+from app.email.service import EmailService
+from app.testing.smtp import SMTPStandIn
+
+recipient = "outbox@example.com"
+
+
+async def get_outbox_row(email_id: int) -> dict:
+    async with database.get_connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(
+                "SELECT * FROM email_outbox WHERE id=%s;", (email_id,)
+            )
+            return await cursor.fetchone()
+
+
+async def expire_lease(email_id: int):
+    async with database.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "UPDATE email_outbox SET next_attempt_at=UTC_TIMESTAMP() - INTERVAL 1 SECOND WHERE id=%s;",
+                (email_id,),
+            )
+
+
+async def delete_outbox_rows():
+    async with database.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("DELETE FROM email_outbox;")
+            await conn.commit()
+
+
+class TestEmailOutbox(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await database.connect()
+        asyncio.get_event_loop().set_debug(False)
+        await delete_outbox_rows()
+
+        self.smtp = await SMTPStandIn().start()
+        self.patches = [
+            patch.object(settings, "smtp_host", self.smtp.host),
+            patch.object(settings, "smtp_port", self.smtp.port),
+            patch.object(settings, "smtp_use_ssl", False),
+            patch.object(settings, "email_retry_base_seconds", 0),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        await delete_outbox_rows()
+        await self.smtp.stop()
+        await database.disconnect()
+
+    async def enqueue(self) -> int:
+        return await (
+            EmailService()
+            .recipient(recipient)
+            .subject("Verification Code")
+            .body(MfaEmailMessage("123456"))
+            .enqueue()
+        )
+
+    async def test_enqueue_does_not_send(self):
+        email_id = await self.enqueue()
+
+        row = await get_outbox_row(email_id)
+        self.assertEqual(row["status"], "pending")
+        self.assertEqual(self.smtp.messages, [])
+
+    async def test_process_batch_sends(self):
+        email_id = await self.enqueue()
+
+        await outbox.process_batch()
+
+        row = await get_outbox_row(email_id)
+        self.assertEqual(row["status"], "sent")
+        self.assertIsNotNone(row["sent_at"])
+        self.assertEqual(len(self.smtp.messages), 1)
+        self.assertEqual(self.smtp.messages[0]["To"], recipient)
+        self.assertIn("123456", self.smtp.messages[0].get_body().get_content())
+
+    async def test_sent_row_drops_body(self):
+        email_id = await self.enqueue()
+        self.assertIn("123456", (await get_outbox_row(email_id))["message"])
+
+        await outbox.process_batch()
+
+        row = await get_outbox_row(email_id)
+        self.assertEqual(row["status"], "sent")
+        self.assertIsNone(row["message"])
+
+    async def test_failed_send_is_retried(self):
+        email_id = await self.enqueue()
+        self.smtp.reject_with = "451 Try again later"
+
+        await outbox.process_batch()
+
+        row = await get_outbox_row(email_id)
+        self.assertEqual(row["status"], "pending")
+        self.assertEqual(row["attempts"], 1)
+        self.assertIn("451", row["last_error"])
+
+        self.smtp.reject_with = None
+        await outbox.process_batch()
+
+        row = await get_outbox_row(email_id)
+        self.assertEqual(row["status"], "sent")
+        self.assertEqual(len(self.smtp.messages), 1)
+
+    async def test_dead_letter_after_max_attempts(self):
+        email_id = await self.enqueue()
+        self.smtp.reject_with = "554 Rejected"
+
+        for _ in range(settings.email_max_attempts):
+            await outbox.process_batch()
+
+        row = await get_outbox_row(email_id)
+        self.assertEqual(row["status"], "dead")
+        self.assertEqual(row["attempts"], settings.email_max_attempts)
+        self.assertIsNone(row["message"])
+
+        # Dead letters are never claimed again
+        self.assertEqual(await outbox.process_batch(), 0)
+
+    async def test_abandoned_lease_counts_as_attempt(self):
+        email_id = await self.enqueue()
+
+        for attempt in range(1, settings.email_max_attempts + 1):
+            # The worker holding the lease dies before reporting back
+            (claimed,) = await outbox.claim(1)
+            self.assertEqual(claimed.attempts, attempt)
+            await expire_lease(email_id)
+
+        self.assertEqual(await outbox.claim(1), [])
+        row = await get_outbox_row(email_id)
+        self.assertEqual(row["status"], "dead")
+        self.assertEqual(row["attempts"], settings.email_max_attempts)
+        self.assertIsNone(row["message"])
+
+    async def test_workers_drain_outbox(self):
+        outbox.start(workers=2)
+        try:
+            for _ in range(5):
+                await self.enqueue()
+
+            for _ in range(50):
+                if len(self.smtp.messages) == 5:
+                    break
+                await asyncio.sleep(0.1)
+        finally:
+            await outbox.stop()
+
+        self.assertEqual(len(self.smtp.messages), 5)
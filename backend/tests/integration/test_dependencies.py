@@ -2,11 +2,17 @@
 import asyncio
 from datetime import timedelta
 import unittest
+from unittest.mock import patch
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
-from app.auth.services import UserService
+from app.auth.services import UserService, generate_access_token
 from app.auth.utils import SecurityService
-from app.dependencies import get_current_user, get_user_pending_mfa
+from app.config import settings
+from app.dependencies import (
+    get_current_principal,
+    get_current_user,
+    get_user_pending_mfa,
+)
 from app.auth.schemas import RegisterRequest
 from app.database import database
 
@@ -25,10 +31,9 @@ class TestGetCurrentUser(unittest.IsolatedAsyncioTestCase):
 
     async def test_get_current_user_success(self):
         response = await UserService.create_user(email, password)
+        user = await UserService.get_user_by_id(response.id)
 
-        (token, _) = SecurityService.generate_jwt(
-            response.id, timedelta(30), True
-        )
+        (token, _) = generate_access_token(user)
 
         credentials = HTTPAuthorizationCredentials(
             scheme="Bearer", credentials=token
@@ -55,7 +60,9 @@ class TestGetCurrentUser(unittest.IsolatedAsyncioTestCase):
         )
 
     async def test_get_current_user_no_user(self):
-        (token, _) = SecurityService.generate_jwt(-1, timedelta(30), True)
+        (token, _) = SecurityService.generate_jwt(
+            -1, timedelta(30), True, {"tv": 0}
+        )
         credentials = HTTPAuthorizationCredentials(
             scheme="Bearer", credentials=token
         )
@@ -68,6 +75,29 @@ class TestGetCurrentUser(unittest.IsolatedAsyncioTestCase):
             str(cm.exception.detail).lower(),
         )
 
+    async def test_get_current_user_without_token_version(self):
+        response = await UserService.create_user(email, password)
+
+        # Issued before tokens carried a version
+        (token, _) = SecurityService.generate_jwt(
+            response.id, timedelta(30), True
+        )
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=token
+        )
+        user = await get_current_user(credentials=credentials)
+        self.assertEqual(user.id, response.id)
+
+        await UserService.revoke_access_tokens(response.id)
+        with self.assertRaises(HTTPException) as cm:
+            await get_current_user(credentials=credentials)
+
+        self.assertEqual(cm.exception.status_code, 401)
+        self.assertIn("revoked", str(cm.exception.detail).lower())
+
+        # cleanup
+        await UserService.delete_user(email, password)
+
     async def test_get_current_user_temp_token(self):
         response = await UserService.create_user(email, password)
 
@@ -206,3 +236,74 @@ class TestGetCurrentUserPendingMfA(unittest.IsolatedAsyncioTestCase):
 
         # cleanup
         await UserService.delete_user(email, password)
+
+
+class TestGetCurrentPrincipal(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        await database.connect()
+        asyncio.get_event_loop().set_debug(False)
+
+    async def asyncTearDown(self) -> None:
+        await database.disconnect()
+
+    async def test_get_current_principal_stateless(self):
+        response = await UserService.create_user(email, password)
+        user = await UserService.get_user_by_id(response.id)
+
+        with patch.object(settings, "stateless_access_tokens", True):
+            (token, _) = generate_access_token(user)
+            credentials = HTTPAuthorizationCredentials(
+                scheme="Bearer", credentials=token
+            )
+
+            with patch.object(UserService, "get_user_by_id") as get_user:
+                principal = await get_current_principal(credentials)
+                get_user.assert_not_called()
+
+        self.assertEqual(principal.id, response.id)
+        self.assertEqual(principal.email, email)
+        self.assertFalse(principal.authenticator_mfa_enabled)
+
+        # cleanup
+        await UserService.delete_user(email, password)
+
+    async def test_get_current_principal_revoked(self):
+        response = await UserService.create_user(email, password)
+        user = await UserService.get_user_by_id(response.id)
+
+        with patch.object(settings, "stateless_access_tokens", True):
+            (token, _) = generate_access_token(user)
+            credentials = HTTPAuthorizationCredentials(
+                scheme="Bearer", credentials=token
+            )
+            await get_current_principal(credentials)
+
+            await UserService.revoke_access_tokens(response.id)
+
+            with self.assertRaises(HTTPException) as cm:
+                await get_current_principal(credentials)
+
+        self.assertEqual(cm.exception.status_code, 401)
+        self.assertIn("revoked", str(cm.exception.detail).lower())
+
+        with self.assertRaises(HTTPException):
+            await get_current_user(credentials=credentials)
+
+        # cleanup
+        await UserService.delete_user(email, password)
+
+    async def test_get_current_principal_stateful(self):
+        response = await UserService.create_user(email, password)
+        user = await UserService.get_user_by_id(response.id)
+
+        (token, _) = generate_access_token(user)
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=token
+        )
+
+        principal = await get_current_principal(credentials)
+        self.assertEqual(principal.id, response.id)
+        self.assertEqual(principal.email, email)
+
+        # cleanup
+        await UserService.delete_user(email, password)
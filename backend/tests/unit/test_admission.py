@@ -0,0 +1,239 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from fastapi import APIRouter, FastAPI, HTTPException
+
+from app.admission import (
+    AdaptiveLimit,
+    AdaptiveRoute,
+    AdmissionLimit,
+    AdmissionMiddleware,
+    Gate,
+    RouteLimiter,
+    build_gates,
+    parse_admission_limits,
+    route_limiters,
+)
+from app.config import settings
+from benchmarks.common import ASGIClient
+
+
+class TestGate(unittest.IsolatedAsyncioTestCase):
+    def test_parse(self):
+        limits = parse_admission_limits("/auth/login=8/32, /auth/register=2,")
+
+        self.assertEqual(
+            limits["/auth/login"], AdmissionLimit("/auth/login", 8, 32)
+        )
+        self.assertEqual(limits["/auth/register"].queue, 0)
+        self.assertEqual(len(limits), 2)
+
+    async def test_queue_then_reject(self):
+        gate = Gate(1, 1)
+        self.assertTrue(await gate.acquire(1))
+
+        queued = asyncio.create_task(gate.acquire(1))
+        await asyncio.sleep(0)
+        self.assertEqual(gate.waiting, 1)
+        self.assertTrue(gate.full)
+        self.assertFalse(await gate.acquire(1))
+
+        gate.release()
+        self.assertTrue(await queued)
+        self.assertEqual(gate.active, 1)
+        self.assertEqual(gate.waiting, 0)
+
+    async def test_timeout_leaves_queue(self):
+        gate = Gate(1, 4)
+        await gate.acquire(1)
+
+        self.assertFalse(await gate.acquire(0.01))
+        self.assertEqual(gate.waiting, 0)
+
+        gate.release()
+        self.assertEqual(gate.active, 0)
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        gate = Gate(1, 4)
+        await gate.acquire(1)
+        waiter = asyncio.create_task(gate.acquire(5))
+        await asyncio.sleep(0)
+
+        # The slot is handed over in the same step the client goes away;
+        # either the waiter keeps it and releases it, or it passes it back
+        gate.release()
+        waiter.cancel()
+        try:
+            if await waiter:
+                gate.release()
+        except asyncio.CancelledError:
+            pass
+
+        self.assertEqual(gate.active, 0)
+        self.assertEqual(gate.waiting, 0)
+
+    async def test_wake_after_growing(self):
+        gate = Gate(1, 4)
+        await gate.acquire(1)
+        waiter = asyncio.create_task(gate.acquire(1))
+        await asyncio.sleep(0)
+
+        gate.concurrency = 2
+        gate.wake()
+
+        self.assertTrue(await waiter)
+        self.assertEqual(gate.active, 2)
+
+
+class TestAdmissionMiddleware(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.release = asyncio.Event()
+        app = FastAPI()
+
+        @app.post("/auth/login")
+        async def login():
+            await self.release.wait()
+            return {"ok": True}
+
+        @app.post("/auth/refresh")
+        async def refresh():
+            return {"ok": True}
+
+        self.gates = build_gates("/auth/login=1/1")
+        app.add_middleware(
+            AdmissionMiddleware, gates=self.gates, queue_timeout=5, retry_after=2
+        )
+        self.client = ASGIClient(app)
+
+    async def test_sheds_excess_and_spares_other_routes(self):
+        admitted = asyncio.create_task(self.client.post("/auth/login"))
+        queued = asyncio.create_task(self.client.post("/auth/login"))
+        await asyncio.sleep(0.01)
+
+        rejected = await self.client.post("/auth/login")
+        self.assertEqual(rejected.status, 503)
+        self.assertEqual(rejected.headers["retry-after"], "2")
+
+        refresh = await self.client.post("/auth/refresh")
+        self.assertEqual(refresh.status, 200)
+
+        self.release.set()
+        self.assertEqual((await admitted).status, 200)
+        self.assertEqual((await queued).status, 200)
+        self.assertEqual(self.gates["/auth/login"].active, 0)
+
+    async def test_adaptive_route_is_not_gated_twice(self):
+        with patch.object(settings, "adaptive_concurrency_enabled", True), patch.dict(
+            route_limiters, {"/auth/login": RouteLimiter()}
+        ):
+            requests = [
+                asyncio.create_task(self.client.post("/auth/login"))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.01)
+            self.assertEqual(self.gates["/auth/login"].active, 0)
+
+            self.release.set()
+            statuses = [(await request).status for request in requests]
+
+        self.assertEqual(statuses, [200] * 3)
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    def limit(self, **kwargs) -> AdaptiveLimit:
+        options = dict(
+            initial=10,
+            min_limit=2,
+            max_limit=20,
+            tolerance=2.0,
+            backoff=0.5,
+            max_pool_wait=0.05,
+        )
+        options.update(kwargs)
+        return AdaptiveLimit(**options)
+
+    def test_grows_only_while_busy(self):
+        limit = self.limit()
+        for _ in range(10):
+            limit.on_sample(0.1, in_flight=2)
+        self.assertEqual(limit.limit, 10)
+
+        for _ in range(30):
+            limit.on_sample(0.1, in_flight=limit.limit)
+        self.assertGreater(limit.limit, 10)
+        self.assertLessEqual(limit.limit, 20)
+
+    def test_backs_off_on_latency_once_per_baseline(self):
+        limit = self.limit()
+        limit.on_sample(0.1, in_flight=5, now=0)
+
+        limit.on_sample(0.5, in_flight=5, now=1)
+        limit.on_sample(0.5, in_flight=5, now=1.01)
+        self.assertEqual(limit.limit, 5)
+
+        limit.on_sample(0.5, in_flight=5, now=2)
+        self.assertEqual(limit.limit, 2)
+
+        limit.on_sample(0.5, in_flight=5, now=3)
+        self.assertEqual(limit.limit, 2)
+
+    def test_backs_off_on_pool_wait_and_drops(self):
+        limit = self.limit()
+        limit.on_sample(0.1, in_flight=5, pool_wait=0.2, now=0)
+        self.assertEqual(limit.limit, 5)
+
+        limit.on_sample(5.0, in_flight=5, dropped=True, now=1)
+        self.assertEqual(limit.limit, 2)
+        # A timed-out request says nothing about normal latency
+        self.assertEqual(limit.baseline, 0.1)
+
+
+class TestAdaptiveRoute(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.release = asyncio.Event()
+        router = APIRouter(prefix="/adaptive", route_class=AdaptiveRoute)
+
+        @router.post("/slow")
+        async def slow():
+            await self.release.wait()
+            return {"ok": True}
+
+        @router.post("/fail")
+        async def fail():
+            raise HTTPException(status_code=401)
+
+        app = FastAPI()
+        app.include_router(router)
+        self.client = ASGIClient(app)
+        self.limiter = route_limiters["/adaptive/slow"]
+        self.limiter.limit.value = 1
+        self.limiter.gate = Gate(1, 0)
+
+        patcher = patch.object(settings, "adaptive_concurrency_enabled", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        route_limiters.pop("/adaptive/slow", None)
+        route_limiters.pop("/adaptive/fail", None)
+
+    async def test_sheds_over_limit_and_samples_success(self):
+        admitted = asyncio.create_task(self.client.post("/adaptive/slow"))
+        await asyncio.sleep(0.01)
+
+        rejected = await self.client.post("/adaptive/slow")
+        self.assertEqual(rejected.status, 503)
+        self.assertIn("retry-after", rejected.headers)
+        self.assertEqual(self.limiter.rejected, 1)
+
+        self.release.set()
+        self.assertEqual((await admitted).status, 200)
+        self.assertIsNotNone(self.limiter.limit.baseline)
+        self.assertEqual(self.limiter.gate.active, 0)
+
+    async def test_errors_are_not_samples(self):
+        response = await self.client.post("/adaptive/fail")
+
+        self.assertEqual(response.status, 401)
+        self.assertIsNone(route_limiters["/adaptive/fail"].limit.baseline)
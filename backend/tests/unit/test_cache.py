@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+
+from app.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_get_set(self):
+        cache = TTLCache(10, 60)
+        cache.set("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(2, 60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_expiry(self):
+        cache = TTLCache(10, 5)
+        with patch("app.cache.time.monotonic", return_value=100):
+            cache.set("a", 1)
+        with patch("app.cache.time.monotonic", return_value=104):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("app.cache.time.monotonic", return_value=105):
+            self.assertIsNone(cache.get("a"))
+
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        cache = TTLCache(10, 60)
+        cache.set("a", 1)
+        cache.invalidate("a")
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_stale_fill_discarded(self):
+        cache = TTLCache(10, 60)
+
+        # A read started, then a write invalidated the key before it finished
+        before = cache.invalidations
+        cache.invalidate("a")
+        cache.set("a", "stale", if_unchanged_since=before)
+        self.assertIsNone(cache.get("a"))
+
+        cache.set("a", "fresh", if_unchanged_since=cache.invalidations)
+        self.assertEqual(cache.get("a"), "fresh")
+
+    def test_update_keeps_fills_in_flight(self):
+        cache = TTLCache(10, 60)
+        cache.set("a", 1)
+
+        before = cache.invalidations
+        cache.update("a", lambda value: value + 1)
+        cache.update("missing", lambda value: value + 1)
+        cache.set("b", 2, if_unchanged_since=before)
+
+        self.assertEqual(cache.get("a"), 2)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertIsNone(cache.get("missing"))
+
+    def test_disabled(self):
+        cache = TTLCache(10, 60, enabled=False)
+        cache.set("a", 1)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
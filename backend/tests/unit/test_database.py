@@ -0,0 +1,268 @@
+import asyncio
+import unittest
+from collections import deque
+from unittest.mock import patch
+
+from app.config import settings
+from app.database import Database, PoolTimeoutError, Replica
+
+
+class FakeConnection:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.last_usage = self.loop.time()
+        self.closed = False
+        self.pings = 0
+        self.ping_error = None
+
+    async def ping(self, reconnect=True):
+        self.pings += 1
+        if self.ping_error:
+            raise self.ping_error
+
+    async def begin(self):
+        self.transaction = "open"
+
+    async def commit(self):
+        self.transaction = "committed"
+
+    async def rollback(self):
+        self.transaction = "rolled back"
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, maxsize: int):
+        self.minsize = 0
+        self.maxsize = maxsize
+        self.free = deque()
+        self.used = set()
+        self.cond = asyncio.Condition()
+
+    @property
+    def size(self):
+        return len(self.free) + len(self.used)
+
+    @property
+    def freesize(self):
+        return len(self.free)
+
+    async def acquire(self):
+        async with self.cond:
+            while not self.free and self.size >= self.maxsize:
+                await self.cond.wait()
+            conn = self.free.popleft() if self.free else FakeConnection()
+            self.used.add(conn)
+            return conn
+
+    async def release(self, conn):
+        self.used.discard(conn)
+        if not conn.closed:
+            self.free.append(conn)
+        async with self.cond:
+            self.cond.notify()
+
+
+class TestDatabase(unittest.IsolatedAsyncioTestCase):
+    def make_database(self, maxsize: int = 2) -> Database:
+        database = Database()
+        database.pool = FakePool(maxsize)  # type: ignore[assignment]
+        return database
+
+    async def test_stats(self):
+        database = self.make_database()
+
+        async with database.get_connection():
+            stats = database.stats()
+            self.assertEqual(stats["in_use"], 1)
+            self.assertEqual(stats["idle"], 0)
+
+        stats = database.stats()
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["acquired"], 1)
+        self.assertEqual(stats["acquire_wait_seconds"]["count"], 1)
+
+    async def test_waiters_and_timeout(self):
+        database = self.make_database(maxsize=1)
+
+        with patch.object(settings, "db_pool_acquire_timeout_seconds", 0.05):
+            async with database.get_connection():
+                waiter = asyncio.create_task(
+                    database.get_connection().__aenter__()
+                )
+                await asyncio.sleep(0.01)
+                self.assertEqual(database.stats()["waiters"], 1)
+
+                with self.assertRaises(PoolTimeoutError):
+                    await waiter
+
+        self.assertEqual(database.timeouts, 1)
+        self.assertEqual(database.waiters, 0)
+
+    async def test_recycles_old_connections(self):
+        database = self.make_database()
+
+        async with database.get_connection() as conn:
+            first = conn
+
+        database._opened[first] -= 61
+
+        with patch.object(settings, "db_pool_recycle_seconds", 60):
+            async with database.get_connection() as conn:
+                self.assertIsNot(conn, first)
+
+        self.assertTrue(first.closed)
+        self.assertEqual(database.recycled, 1)
+
+    async def test_pre_ping_drops_dead_idle_connection(self):
+        database = self.make_database()
+
+        async with database.get_connection() as conn:
+            first = conn
+        first.last_usage -= settings.db_pool_pre_ping_idle_seconds + 1
+        first.ping_error = ConnectionError()
+
+        with self.assertLogs("app.database", "WARNING"):
+            async with database.get_connection() as conn:
+                self.assertIsNot(conn, first)
+                self.assertEqual(conn.pings, 0)
+
+        self.assertTrue(first.closed)
+        self.assertEqual(database.ping_failures, 1)
+
+
+class FailingPool(FakePool):
+    async def acquire(self):
+        raise ConnectionRefusedError()
+
+
+class TestReplicaRouting(unittest.IsolatedAsyncioTestCase):
+    def make_database(self, replicas: int = 2) -> Database:
+        database = Database()
+        database.pool = FakePool(2)  # type: ignore[assignment]
+        database.replicas = [
+            Replica(f"replica{i}", 3306, FakePool(2))  # type: ignore[arg-type]
+            for i in range(replicas)
+        ]
+        return database
+
+    async def read_pool(self, database: Database, key=None):
+        async with database.get_connection(readonly=True, key=key) as conn:
+            for pool in [database.pool] + [r.pool for r in database.replicas]:
+                if conn in pool.used:
+                    return pool
+
+    async def test_round_robin(self):
+        database = self.make_database()
+        replicas = [replica.pool for replica in database.replicas]
+
+        pools = [await self.read_pool(database) for _ in range(4)]
+        self.assertEqual(pools, replicas * 2)
+
+        async with database.get_connection() as conn:
+            self.assertIn(conn, database.pool.used)
+
+    async def test_read_your_writes(self):
+        database = self.make_database()
+
+        async def writer():
+            database.mark_write("user:1")
+            return await self.read_pool(database)
+
+        # The writing request reads its own writes from the primary
+        self.assertIs(await asyncio.create_task(writer()), database.pool)
+
+        # Other requests do too, for that key within the window
+        self.assertIs(await self.read_pool(database, "user:1"), database.pool)
+        self.assertIsNot(await self.read_pool(database, "user:2"), database.pool)
+
+    async def test_unhealthy_replica_skipped(self):
+        database = self.make_database()
+        database.replicas[0].healthy = False
+
+        for _ in range(3):
+            pool = await self.read_pool(database)
+            self.assertIs(pool, database.replicas[1].pool)
+
+        database.replicas[1].healthy = False
+        self.assertIs(await self.read_pool(database), database.pool)
+
+    async def test_failing_replica_falls_back_to_primary(self):
+        database = self.make_database(replicas=1)
+        database.replicas[0].pool = FailingPool(2)  # type: ignore[assignment]
+
+        with self.assertLogs("app.database", "WARNING"):
+            self.assertIs(await self.read_pool(database), database.pool)
+
+        self.assertFalse(database.replicas[0].healthy)
+        self.assertEqual(database.replica_fallbacks, 1)
+
+
+class TestUnitOfWork(unittest.IsolatedAsyncioTestCase):
+    def make_database(self) -> Database:
+        database = Database()
+        database.pool = FakePool(2)  # type: ignore[assignment]
+        return database
+
+    async def test_one_connection_and_transaction(self):
+        database = self.make_database()
+        committed = []
+
+        async with database.unit_of_work():
+            async with database.get_connection() as first:
+                pass
+            async with database.get_connection(readonly=True) as second:
+                pass
+            database.after_commit(lambda: committed.append(True))
+            self.assertEqual(first.transaction, "open")
+            self.assertEqual(committed, [])
+
+        self.assertIs(first, second)
+        self.assertEqual(first.transaction, "committed")
+        self.assertEqual(committed, [True])
+        self.assertEqual(database.acquired, 1)
+        self.assertEqual(database.pool.freesize, 1)
+
+    async def test_rollback_on_error(self):
+        database = self.make_database()
+        committed = []
+
+        with self.assertRaises(ValueError):
+            async with database.unit_of_work():
+                async with database.get_connection() as conn:
+                    database.after_commit(lambda: committed.append(True))
+                raise ValueError()
+
+        self.assertEqual(conn.transaction, "rolled back")
+        self.assertEqual(committed, [])
+        self.assertEqual(database.pool.freesize, 1)
+
+    async def test_nested_and_lazy(self):
+        database = self.make_database()
+
+        async with database.unit_of_work():
+            async with database.unit_of_work():
+                pass
+            self.assertEqual(database.acquired, 0)
+
+            async with database.unit_of_work():
+                async with database.get_connection():
+                    pass
+            async with database.get_connection():
+                pass
+
+        self.assertEqual(database.acquired, 1)
+
+    async def test_disabled(self):
+        database = self.make_database()
+
+        with patch.object(settings, "db_unit_of_work", False):
+            async with database.unit_of_work():
+                for _ in range(2):
+                    async with database.get_connection():
+                        pass
+
+        self.assertEqual(database.acquired, 2)
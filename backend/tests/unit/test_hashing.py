@@ -0,0 +1,164 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from argon2 import PasswordHasher
+
+import app.auth.utils as utils
+from app.auth.hashing import (
+    FLOOR,
+    Argon2Params,
+    build_hasher,
+    calibrate,
+    load_or_calibrate,
+    load_params,
+    save_params,
+)
+from app.auth.utils import SecurityService
+
+SMALL = Argon2Params(time_cost=1, memory_cost=1024, parallelism=1)
+STRONG = Argon2Params(time_cost=4, memory_cost=FLOOR.memory_cost, parallelism=4)
+
+
+class TestArgon2Params(unittest.TestCase):
+    def test_defaults_without_params(self):
+        default = PasswordHasher()
+        hasher = build_hasher(None)
+
+        self.assertEqual(hasher.time_cost, default.time_cost)
+        self.assertEqual(hasher.memory_cost, default.memory_cost)
+        self.assertEqual(hasher.parallelism, default.parallelism)
+
+    def test_params_below_floor_are_raised(self):
+        hasher = build_hasher(SMALL)
+
+        self.assertEqual(hasher.time_cost, FLOOR.time_cost)
+        self.assertEqual(hasher.memory_cost, FLOOR.memory_cost)
+        self.assertEqual(hasher.parallelism, FLOOR.parallelism)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data", "params.json")
+            self.assertIsNone(load_params(path))
+
+            save_params(SMALL, path)
+
+            self.assertEqual(load_params(path), SMALL)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["params.json"])
+
+    def test_unreadable_file_recalibrates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "params.json")
+            for content in ("{not json", '{"time_cost": 1}'):
+                with open(path, "w") as f:
+                    f.write(content)
+
+                with self.assertLogs("app.auth.hashing", "WARNING"):
+                    self.assertIsNone(load_params(path))
+
+    def test_concurrent_startup_calibrates_once(self):
+        calls = []
+
+        def slow_calibrate():
+            calls.append(1)
+            time.sleep(0.05)
+            return SMALL
+
+        with tempfile.TemporaryDirectory() as tmp, patch(
+            "app.auth.hashing.calibrate", slow_calibrate
+        ):
+            path = os.path.join(tmp, "params.json")
+            with ThreadPoolExecutor(3) as executor:
+                results = list(executor.map(load_or_calibrate, [path] * 3))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [SMALL] * 3)
+
+    def test_calibrate_stays_within_bounds(self):
+        params = calibrate(
+            target_ms=1000,
+            max_memory_kib=2048,
+            parallelism=1,
+            floor=SMALL,
+            max_time_cost=3,
+            samples=1,
+        )
+
+        self.assertLessEqual(params.memory_cost, 2048)
+        self.assertGreaterEqual(params.memory_cost, 1024)
+        self.assertTrue(1 <= params.time_cost <= 3)
+        self.assertEqual(params.target_ms, 1000)
+
+    def test_calibrate_lowers_memory_before_time(self):
+        # Anything over 2 MiB is "too slow"
+        def measure(hasher, samples):
+            return 10.0 if hasher.memory_cost <= 2048 else 100.0
+
+        with patch("app.auth.hashing.measure_ms", measure):
+            params = calibrate(
+                target_ms=50,
+                max_memory_kib=8192,
+                parallelism=1,
+                floor=SMALL,
+                max_time_cost=4,
+            )
+
+        self.assertEqual(params.memory_cost, 2048)
+        self.assertEqual(params.time_cost, 4)
+
+    def test_calibrate_rejects_budget_below_floor(self):
+        with self.assertRaises(ValueError):
+            calibrate(max_memory_kib=FLOOR.memory_cost // 2)
+        with self.assertRaises(ValueError):
+            calibrate(parallelism=FLOOR.parallelism - 1)
+
+    def test_calibrate_never_goes_below_floor(self):
+        with patch("app.auth.hashing.measure_ms", return_value=1000.0):
+            with self.assertLogs("app.auth.hashing", "WARNING"):
+                params = calibrate(
+                    target_ms=50,
+                    max_memory_kib=FLOOR.memory_cost * 4,
+                    parallelism=FLOOR.parallelism,
+                )
+
+        self.assertEqual(params.time_cost, FLOOR.time_cost)
+        self.assertEqual(params.memory_cost, FLOOR.memory_cost)
+        self.assertEqual(params.parallelism, FLOOR.parallelism)
+
+
+class TestNeedsRehash(unittest.TestCase):
+    def setUp(self):
+        self.ph = utils.ph
+
+    def tearDown(self):
+        utils.ph = self.ph
+
+    def test_weaker_hash_needs_rehash(self):
+        old = PasswordHasher(time_cost=1, memory_cost=1024, parallelism=1).hash(
+            "passw0rd!"
+        )
+
+        self.assertTrue(SecurityService.needs_rehash(old))
+        self.assertTrue(SecurityService.verify_password("passw0rd!", old))
+
+        new = SecurityService.hash_password("passw0rd!")
+        self.assertFalse(SecurityService.needs_rehash(new))
+
+    def test_stronger_hash_is_kept(self):
+        SecurityService.use_hasher_params(STRONG)
+        strong = SecurityService.hash_password("passw0rd!")
+        SecurityService.use_hasher_params(None)
+
+        self.assertFalse(SecurityService.needs_rehash(strong))
+
+    def test_stronger_params_rehash_defaults(self):
+        old = SecurityService.hash_password("passw0rd!")
+        SecurityService.use_hasher_params(STRONG)
+
+        self.assertTrue(SecurityService.needs_rehash(old))
+
+    def test_unparseable_hash_is_left_alone(self):
+        self.assertFalse(SecurityService.needs_rehash("not-a-hash"))
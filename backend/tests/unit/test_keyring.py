@@ -0,0 +1,47 @@
+import unittest
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from app.auth.keyring import MFAKeyRing
+from app.auth.rekey import rotate_batch
+
+OLD_KEY = Fernet.generate_key().decode()
+NEW_KEY = Fernet.generate_key().decode()
+
+
+class TestMFAKeyRing(unittest.TestCase):
+    def test_decrypts_with_retired_key(self):
+        encrypted = MFAKeyRing(OLD_KEY, []).encrypt("secret")
+        keyring = MFAKeyRing(NEW_KEY, [OLD_KEY])
+
+        self.assertEqual(keyring.decrypt(encrypted), "secret")
+        self.assertTrue(keyring.needs_rotation(encrypted))
+
+    def test_encrypts_with_primary_key(self):
+        keyring = MFAKeyRing(NEW_KEY, [OLD_KEY])
+        encrypted = keyring.encrypt("secret")
+
+        self.assertFalse(keyring.needs_rotation(encrypted))
+        self.assertEqual(MFAKeyRing(NEW_KEY, []).decrypt(encrypted), "secret")
+
+    def test_rotate(self):
+        encrypted = MFAKeyRing(OLD_KEY, []).encrypt("secret")
+        rotated = MFAKeyRing(NEW_KEY, [OLD_KEY]).rotate(encrypted)
+
+        self.assertEqual(MFAKeyRing(NEW_KEY, []).decrypt(rotated), "secret")
+        with self.assertRaises(InvalidToken):
+            MFAKeyRing(OLD_KEY, []).decrypt(rotated)
+
+    def test_rotate_batch(self):
+        keyring = MFAKeyRing(NEW_KEY, [OLD_KEY])
+        old = MFAKeyRing(OLD_KEY, []).encrypt("a")
+        current = keyring.encrypt("b")
+        unknown = MFAKeyRing(Fernet.generate_key().decode(), []).encrypt("c")
+
+        updates, failed = rotate_batch(
+            keyring, [(1, old), (2, current), (3, unknown)]
+        )
+
+        self.assertEqual([(user_id, prev) for _, user_id, prev in updates], [(1, old)])
+        self.assertEqual(keyring.decrypt(updates[0][0]), "a")
+        self.assertEqual(failed, [3])
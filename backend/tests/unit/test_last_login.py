@@ -0,0 +1,34 @@
+import unittest
+from unittest.mock import patch
+
+from app.auth.last_login import LastLoginBuffer
+
+
+class FailingConnection:
+    async def __aenter__(self):
+        raise ConnectionError("database down")
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class TestLastLoginCap(unittest.IsolatedAsyncioTestCase):
+    async def test_outage_drops_oldest_beyond_cap(self):
+        buffer = LastLoginBuffer(max_pending=3)
+        buffer.start(interval=60)
+        with patch(
+            "app.auth.last_login.database.get_connection",
+            lambda: FailingConnection(),
+        ), self.assertLogs("app.auth.last_login", "ERROR"):
+            for user_id in (1, 2, 3, 1, 4, 5):
+                await buffer.record(user_id)
+
+            self.assertEqual(await buffer.flush(), 0)
+            await buffer.record(6)
+            await buffer.stop()
+
+        self.assertEqual(list(buffer._pending), [4, 5, 6])
+        stats = buffer.stats()
+        self.assertEqual(stats["dropped"], 3)
+        self.assertEqual(stats["coalesced"], 1)
+        self.assertGreaterEqual(stats["failures"], 1)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import unittest
+
+from fastapi import FastAPI
+
+from app.loopmonitor import LoopMonitor, LoopMonitorMiddleware
+from app.testing.loop import LoopBlockedError, no_blocking
+from benchmarks.common import ASGIClient
+
+
+def block_the_loop(seconds: float):
+    time.sleep(seconds)
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    async def test_captures_blocking_stack(self):
+        monitor = LoopMonitor(interval=0.005, threshold=0.05, history=10)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.02)
+            block_the_loop(0.2)
+            await asyncio.sleep(0.02)
+        finally:
+            await monitor.stop()
+
+        self.assertEqual(monitor.stall_count, 1)
+        stall = monitor.stalls[0]
+        self.assertGreaterEqual(stall["lag_ms"], 100)
+        self.assertIn("block_the_loop", "".join(stall["stack"]))
+        self.assertGreater(monitor.lag.count, 0)
+        self.assertGreaterEqual(monitor.stats()["max_lag_ms"], 100)
+
+    async def test_no_stall_when_awaiting(self):
+        monitor = LoopMonitor(interval=0.005, threshold=0.05, history=10)
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+        self.assertEqual(monitor.stall_count, 0)
+        self.assertFalse(monitor.running)
+
+
+class TestNoBlocking(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        async def blocking(item_id: int):
+            block_the_loop(0.15)
+            return {}
+
+        @app.get("/fine")
+        async def fine():
+            await asyncio.sleep(0.05)
+            return {}
+
+        app.add_middleware(LoopMonitorMiddleware)
+        self.client = ASGIClient(app)
+
+    async def test_names_the_blocking_route(self):
+        with self.assertRaises(LoopBlockedError) as cm:
+            async with no_blocking(50):
+                await self.client.get("/items/1")
+
+        message = str(cm.exception)
+        self.assertIn("GET /items/{item_id}", message)
+        self.assertIn("block_the_loop", message)
+
+    async def test_passes_when_handlers_await(self):
+        async with no_blocking(50):
+            response = await self.client.get("/fine")
+
+        self.assertEqual(response.status, 200)
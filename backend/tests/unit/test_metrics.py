@@ -0,0 +1,96 @@
+import unittest
+
+from fastapi import FastAPI
+
+from app.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    http_request_seconds,
+    http_requests,
+)
+from benchmarks.common import ASGIClient
+
+
+class TestHistogram(unittest.TestCase):
+    def test_snapshot_is_cumulative(self):
+        histogram = Histogram(buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["buckets"], {"0.1": 2, "1": 3, "+Inf": 4})
+        self.assertEqual(snapshot["count"], 4)
+        self.assertAlmostEqual(snapshot["sum"], 5.65)
+
+
+class TestRegistry(unittest.TestCase):
+    def test_render(self):
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests.", ("route",))
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1,))
+        registry.collector(
+            lambda: [("pool_size", "gauge", "Pool size.", [({"pool": 'a"b'}, 3)])]
+        )
+
+        requests.labels("/a").inc()
+        requests.labels("/a").inc(2)
+        latency.labels().observe(0.05)
+        latency.labels().observe(0.5)
+
+        self.assertEqual(
+            registry.render().splitlines(),
+            [
+                "# HELP requests_total Requests.",
+                "# TYPE requests_total counter",
+                'requests_total{route="/a"} 3',
+                "# HELP latency_seconds Latency.",
+                "# TYPE latency_seconds histogram",
+                'latency_seconds_bucket{le="0.1"} 1',
+                'latency_seconds_bucket{le="+Inf"} 2',
+                "latency_seconds_sum 0.55",
+                "latency_seconds_count 2",
+                "# HELP pool_size Pool size.",
+                "# TYPE pool_size gauge",
+                'pool_size{pool="a\\"b"} 3',
+            ],
+        )
+
+    def test_labels_checked(self):
+        registry = Registry()
+        family = registry.counter("requests_total", "Requests.", ("route",))
+
+        self.assertIs(family.labels("/a"), family.labels("/a"))
+        with self.assertRaises(ValueError):
+            family.labels()
+        with self.assertRaises(ValueError):
+            registry.counter("requests_total", "Again.")
+
+
+class TestMetricsMiddleware(unittest.IsolatedAsyncioTestCase):
+    async def test_route_template_and_status(self):
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        def item(item_id: int):
+            return {"id": item_id}
+
+        app.add_middleware(MetricsMiddleware)
+        client = ASGIClient(app)
+        before = http_requests.labels("GET", "/items/{item_id}", "200").value
+        unmatched = http_requests.labels("GET", "unmatched", "404").value
+
+        for i in range(3):
+            await client.get(f"/items/{i}")
+        await client.get("/missing")
+
+        self.assertEqual(
+            http_requests.labels("GET", "/items/{item_id}", "200").value,
+            before + 3,
+        )
+        self.assertEqual(
+            http_requests.labels("GET", "unmatched", "404").value, unmatched + 1
+        )
+        self.assertGreaterEqual(
+            http_request_seconds.labels("GET", "/items/{item_id}").count, 3
+        )
@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+
+from app.config import settings
+from app.dependencies import client_ip, limit_by_ip
+from app.ratelimit import (
+    RateLimit,
+    RateLimiter,
+    check_rate_limit,
+    parse_rate_limits,
+    rate_limiter,
+)
+from benchmarks.common import ASGIClient
+
+RULE = RateLimit("login:ip", 3, 60)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_parse(self):
+        rules = parse_rate_limits("login:ip=20/60, login:account=5/300,")
+
+        self.assertEqual(rules["login:ip"], RateLimit("login:ip", 20, 60.0))
+        self.assertEqual(rules["login:account"].window, 300)
+        self.assertEqual(len(rules), 2)
+
+    def test_limit_and_retry_after(self):
+        limiter = RateLimiter(100)
+
+        for _ in range(3):
+            self.assertEqual(limiter.hit(RULE, "a", now=0), 0)
+        retry_after = limiter.hit(RULE, "a", now=10)
+
+        # The three hits only stop counting once the next window has
+        # slid far enough past them
+        self.assertAlmostEqual(retry_after, 50 + 20)
+        self.assertEqual(limiter.hit(RULE, "b", now=10), 0)
+
+    def test_sliding_window(self):
+        limiter = RateLimiter(100)
+        for _ in range(3):
+            limiter.hit(RULE, "a", now=0)
+
+        # Halfway through the next window 1.5 of the old hits still count
+        self.assertEqual(limiter.hit(RULE, "a", now=90), 0)
+        self.assertGreater(limiter.hit(RULE, "a", now=90), 0)
+        # Two windows later nothing is left
+        self.assertEqual(limiter.hit(RULE, "a", now=181), 0)
+
+    def test_denied_attempts_not_counted(self):
+        limiter = RateLimiter(100)
+        for second in range(30):
+            limiter.hit(RULE, "a", now=second)
+
+        retry_after = limiter.hit(RULE, "a", now=30)
+        self.assertEqual(limiter.hit(RULE, "a", now=30 + retry_after), 0)
+
+    def test_eviction(self):
+        limiter = RateLimiter(max_keys=2)
+
+        for key in "abc":
+            limiter.hit(RULE, key, now=0)
+        self.assertEqual(len(limiter), 2)
+
+        # Expired keys go on the next check
+        limiter.hit(RULE, "d", now=500)
+        self.assertEqual(len(limiter), 1)
+        self.assertEqual(limiter.evictions, 3)
+
+
+class TestRateLimitCheck(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        rate_limiter.reset()
+
+    def tearDown(self):
+        rate_limiter.reset()
+
+    def test_check_raises_429(self):
+        with patch.dict(
+            "app.ratelimit.rules", {"login:account": RateLimit("login:account", 1, 60)}
+        ):
+            check_rate_limit("login:account", "a@example.com")
+            with self.assertRaises(HTTPException) as cm:
+                check_rate_limit("login:account", "a@example.com")
+
+        self.assertEqual(cm.exception.status_code, 429)
+        self.assertIn("Retry-After", cm.exception.headers)
+
+    def test_disabled(self):
+        with patch.object(settings, "rate_limit_enabled", False), patch.dict(
+            "app.ratelimit.rules", {"login:account": RateLimit("login:account", 0, 60)}
+        ):
+            check_rate_limit("login:account", "a@example.com")
+
+    async def test_ip_dependency(self):
+        app = FastAPI()
+
+        @app.post("/login", dependencies=[Depends(limit_by_ip("login"))])
+        async def login():
+            return {}
+
+        with patch.dict("app.ratelimit.rules", {"login:ip": RULE}), patch.object(
+            settings, "trusted_proxies", ["127.0.0.1"]
+        ):
+            client = ASGIClient(app)
+            statuses = [
+                (await client.post("/login")).status for _ in range(RULE.limit)
+            ]
+            forwarded = await client.post(
+                "/login", headers={"x-forwarded-for": "203.0.113.9"}
+            )
+            blocked = await client.post("/login")
+
+        self.assertEqual(statuses, [200] * RULE.limit)
+        self.assertEqual(forwarded.status, 200)
+        self.assertEqual(blocked.status, 429)
+        self.assertGreater(int(blocked.headers["retry-after"]), 0)
+
+    def test_client_ip_from_trusted_network(self):
+        def request(peer: str, forwarded: str) -> Request:
+            return Request(
+                {
+                    "type": "http",
+                    "client": (peer, 1234),
+                    "headers": [(b"x-forwarded-for", forwarded.encode())],
+                }
+            )
+
+        with patch.object(settings, "trusted_proxies", ["172.28.0.0/16"]):
+            self.assertEqual(
+                client_ip(request("172.28.0.5", "203.0.113.9, 172.28.0.7")),
+                "203.0.113.9",
+            )
+            self.assertEqual(
+                client_ip(request("198.51.100.1", "203.0.113.9")), "198.51.100.1"
+            )
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+import unittest
+from email import message_from_bytes, policy
+from pathlib import Path
+
+from app.email.messages import MfaEmailMessage, VerifyEmailMessage
+from app.email.renderer import SplitTemplate, TemplateRegistry, html_to_text
+from app.email.service import EmailService
+
+
+class TestSplitTemplate(unittest.TestCase):
+    def test_render(self):
+        template = SplitTemplate("a {{X}} b {{Y}} c {{X}}")
+
+        self.assertEqual(template.fields, {"X", "Y"})
+        self.assertEqual(template.render({"X": "1", "Y": "2"}), "a 1 b 2 c 1")
+
+    def test_missing_value(self):
+        with self.assertRaises(KeyError):
+            SplitTemplate("{{X}}").render({})
+
+    def test_html_to_text(self):
+        text = html_to_text(
+            "<html><head><style>p {}</style></head><body>"
+            '<p>Hello &amp; welcome</p><a href="{{URL}}">Verify</a>'
+            "</body></html>"
+        )
+
+        self.assertEqual(text, "Hello & welcome\nVerify: {{URL}}\n")
+
+
+class TestTemplateRegistry(unittest.TestCase):
+    def test_reload_on_mtime_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "greeting.html"
+            path.write_text("<p>Hi {{NAME}}</p>")
+
+            registry = TemplateRegistry(Path(directory), reload=True)
+            registry.load_all()
+            self.assertIn("Hi x", registry.get("greeting").render_html({"NAME": "x"}))
+
+            path.write_text("<p>Bye {{NAME}}</p>")
+            later = time.time() + 10
+            os.utime(path, (later, later))
+            self.assertIn("Bye x", registry.get("greeting").render_html({"NAME": "x"}))
+
+    def test_no_reload_by_default(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "greeting.html"
+            path.write_text("<p>Hi {{NAME}}</p>")
+
+            registry = TemplateRegistry(Path(directory))
+            template = registry.get("greeting")
+
+            path.write_text("<p>Bye {{NAME}}</p>")
+            later = time.time() + 10
+            os.utime(path, (later, later))
+            self.assertIs(registry.get("greeting"), template)
+
+
+class TestTemplateMessages(unittest.TestCase):
+    def test_mime_message(self):
+        url = "https://example.com/verify-email?token=abc&x=<1>"
+        raw = (
+            EmailService()
+            .recipient("user@example.com")
+            .subject("Verify Email")
+            .body(VerifyEmailMessage(url))
+            .as_raw()
+        )
+        msg = message_from_bytes(raw.encode(), policy=policy.default)
+
+        self.assertNotIn("\n", raw.replace("\r\n", ""))
+        self.assertEqual(msg["To"], "user@example.com")
+        self.assertEqual(msg["Subject"], "Verify Email")
+        self.assertEqual(msg.get_content_type(), "multipart/alternative")
+
+        text = msg.get_body(("plain",)).get_content()  # type: ignore[union-attr]
+        html = msg.get_body(("html",)).get_content()  # type: ignore[union-attr]
+        self.assertIn(url, text)
+        self.assertIn("token=abc&amp;x=&lt;1&gt;", html)
+        self.assertNotIn("{{", text + html)
+
+    def test_html_body_available(self):
+        message = MfaEmailMessage("123456")
+
+        self.assertIn(
+            '<div class="verification-code">123456</div>', message.msg
+        )
+        self.assertIn("123456", message.text)
+
+    def test_header_injection_rejected(self):
+        with self.assertRaises(ValueError):
+            (
+                EmailService()
+                .recipient("user@example.com")
+                .subject("Hi\r\nBcc: other@example.com")
+                .body(MfaEmailMessage("123456"))
+                .as_raw()
+            )
@@ -0,0 +1,93 @@
+import asyncio
+import smtplib
+import unittest
+from email import policy
+from email.message import EmailMessage
+from unittest.mock import patch
+
+from app.config import settings
+from app.email.smtp import SMTPPool
+from app.testing.smtp import SMTPStandIn
+
+
+def raw_message(recipient: str):
+    msg = EmailMessage()
+    msg["From"] = "sender@example.com"
+    msg["To"] = recipient
+    msg["Subject"] = "Test"
+    msg.set_content("hello")
+    return (recipient, msg.as_bytes(policy=policy.SMTP).decode())
+
+
+class TestSMTPPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.smtp = await SMTPStandIn().start()
+        self.patches = [
+            patch.object(settings, "smtp_host", self.smtp.host),
+            patch.object(settings, "smtp_port", self.smtp.port),
+            patch.object(settings, "smtp_use_ssl", False),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        await self.smtp.stop()
+
+    async def test_batch_reuses_session(self):
+        pool = SMTPPool(size=2, idle_timeout=60, noop_after=60)
+        messages = [raw_message(f"user{i}@example.com") for i in range(5)]
+
+        errors = await asyncio.to_thread(pool.send_batch, messages)
+        errors += await asyncio.to_thread(pool.send_batch, messages)
+        await asyncio.to_thread(pool.close)
+
+        self.assertEqual(errors, [None] * 10)
+        self.assertEqual(len(self.smtp.messages), 10)
+        self.assertEqual(self.smtp.connections, 1)
+
+    async def test_rejected_message_does_not_fail_batch(self):
+        pool = SMTPPool(size=1, idle_timeout=60, noop_after=60)
+        self.smtp.reject_with = "550 No such user"
+
+        errors = await asyncio.to_thread(
+            pool.send_batch, [raw_message("a@example.com")]
+        )
+        self.smtp.reject_with = None
+        errors += await asyncio.to_thread(
+            pool.send_batch, [raw_message("b@example.com")]
+        )
+        await asyncio.to_thread(pool.close)
+
+        self.assertIsInstance(errors[0], smtplib.SMTPSenderRefused)
+        self.assertIsNone(errors[1])
+        self.assertEqual(self.smtp.connections, 1)
+
+    async def test_reconnects_after_server_drop(self):
+        pool = SMTPPool(size=1, idle_timeout=60, noop_after=60)
+
+        await asyncio.to_thread(pool.send_batch, [raw_message("a@example.com")])
+
+        # Restart the server on the same port, dropping the pooled session
+        port = self.smtp.port
+        await self.smtp.stop()
+        self.smtp = await SMTPStandIn(port=port).start()
+
+        errors = await asyncio.to_thread(
+            pool.send_batch, [raw_message("b@example.com")]
+        )
+        await asyncio.to_thread(pool.close)
+
+        self.assertEqual(errors, [None])
+        self.assertEqual(len(self.smtp.messages), 1)
+
+    async def test_idle_sessions_expire(self):
+        pool = SMTPPool(size=1, idle_timeout=0, noop_after=0)
+
+        await asyncio.to_thread(pool.send_batch, [raw_message("a@example.com")])
+        await asyncio.to_thread(pool.prune)
+        await asyncio.to_thread(pool.send_batch, [raw_message("b@example.com")])
+        await asyncio.to_thread(pool.close)
+
+        self.assertEqual(self.smtp.connections, 2)
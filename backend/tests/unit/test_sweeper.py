@@ -0,0 +1,60 @@
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+from app.auth.sweeper import ExpirySweeper
+
+
+class FakeCursor:
+    def __init__(self, fail_release: bool):
+        self.fail_release = fail_release
+        self.rowcount = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, args=None):
+        if "RELEASE_LOCK" in query and self.fail_release:
+            raise ConnectionError("lost connection")
+
+    async def fetchone(self):
+        return (1,)
+
+
+class FakeConnection:
+    def __init__(self, fail_release: bool):
+        self.fail_release = fail_release
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self.fail_release)
+
+    def close(self):
+        self.closed = True
+
+
+class TestSweeperLock(unittest.IsolatedAsyncioTestCase):
+    async def run_sweep(self, fail_release: bool) -> FakeConnection:
+        conn = FakeConnection(fail_release)
+
+        @asynccontextmanager
+        async def get_connection():
+            yield conn
+
+        with patch("app.auth.sweeper.database.get_connection", get_connection):
+            try:
+                await ExpirySweeper().run_once(pause=0)
+            except ConnectionError:
+                pass
+        return conn
+
+    async def test_connection_kept_after_release(self):
+        conn = await self.run_sweep(fail_release=False)
+        self.assertFalse(conn.closed)
+
+    async def test_connection_closed_when_release_fails(self):
+        conn = await self.run_sweep(fail_release=True)
+        self.assertTrue(conn.closed)
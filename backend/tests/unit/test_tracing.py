@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from fastapi import FastAPI
+
+from app.tracing import (
+    Trace,
+    TraceExporter,
+    TracingMiddleware,
+    _NOOP,
+    server_timing,
+    span,
+)
+from benchmarks.common import ASGIClient
+
+
+def make_app(**kwargs) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        with span("db"):
+            pass
+        with span("db"):
+            pass
+        with span("argon2.verify"):
+            time.sleep(0.002)
+        return {"id": item_id}
+
+    app.add_middleware(TracingMiddleware, **kwargs)
+    return app
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    def test_span_outside_request_is_noop(self):
+        self.assertIs(span("db"), _NOOP)
+
+    def test_server_timing(self):
+        trace = Trace(sampled=False)
+        trace.spans = [("db", 0, 0.001), ("jwt.sign", 0.001, 0.0005), ("db", 0.002, 0.002)]
+
+        self.assertEqual(
+            server_timing(trace, 0.01),
+            'db;dur=3.00;desc="x2", jwt.sign;dur=0.50, total;dur=10.00',
+        )
+
+    async def test_header(self):
+        client = ASGIClient(make_app(header=True, sample_rate=0))
+
+        response = await client.get("/items/1")
+
+        timing = response.headers["server-timing"]
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="x2"', timing)
+        self.assertIn("argon2.verify;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    async def test_off(self):
+        client = ASGIClient(make_app(header=False, sample_rate=0))
+
+        response = await client.get("/items/1")
+
+        self.assertNotIn("server-timing", response.headers)
+
+    async def test_sampled_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            exporter = TraceExporter()
+            exporter.start(path, max_bytes=1024 * 1024, backups=1)
+            client = ASGIClient(
+                make_app(header=False, sample_rate=1, exporter=exporter)
+            )
+            try:
+                response = await client.get("/items/7")
+            finally:
+                exporter.stop()
+
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertNotIn("server-timing", response.headers)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["route"], "/items/{item_id}")
+        self.assertEqual(lines[0]["status"], 200)
+        self.assertEqual(
+            [s["name"] for s in lines[0]["spans"]], ["db", "db", "argon2.verify"]
+        )
@@ -0,0 +1,78 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from jose import jwt
+
+from app.auth.verifier import HMACBackend, JWTVerifier
+
+SECRET = "verifier-test-secret"
+
+
+def make_token(exp_in: int = 60, secret: str = SECRET, **claims) -> str:
+    payload = {"sub": "1", "auth": True, "exp": int(time.time()) + exp_in}
+    payload.update(claims)
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+class TestJWTVerifier(unittest.TestCase):
+    def test_backends_agree(self):
+        valid = make_token()
+        cases = [
+            valid,
+            make_token(exp_in=-10),
+            make_token(secret="other-secret"),
+            valid[:-2] + ("AA" if not valid.endswith("AA") else "BB"),
+            jwt.encode({"sub": "1"}, SECRET, algorithm="HS512"),
+            "",
+            "not.a.token",
+        ]
+
+        for backend in ("jose", "hmac"):
+            verifier = JWTVerifier(SECRET, "HS256", backend=backend, cache_size=0)
+            results = [verifier.decode(token) for token in cases]
+            self.assertEqual(results[0]["sub"], "1", backend)
+            self.assertEqual(results[1:], [None] * 6, backend)
+
+    def test_leeway(self):
+        token = make_token(exp_in=-5)
+        for backend in ("jose", "hmac"):
+            verifier = JWTVerifier(
+                SECRET, "HS256", leeway=30, backend=backend, cache_size=0
+            )
+            self.assertIsNotNone(verifier.decode(token), backend)
+
+    def test_cache_hit_skips_backend(self):
+        verifier = JWTVerifier(SECRET, "HS256")
+        token = make_token()
+
+        first = verifier.decode(token)
+        with patch.object(verifier.backend, "decode") as decode:
+            second = verifier.decode(token)
+            decode.assert_not_called()
+
+        self.assertEqual(first, second)
+
+        # Callers get their own copy of the cached payload
+        second["sub"] = "2"
+        self.assertEqual(verifier.decode(token)["sub"], "1")
+
+    def test_cache_entry_ends_at_expiry(self):
+        verifier = JWTVerifier(SECRET, "HS256")
+        token = make_token(exp_in=60)
+        verifier.decode(token)
+
+        later = time.monotonic() + 61
+        with patch("app.cache.time.monotonic", return_value=later):
+            with patch.object(verifier.backend, "decode", return_value=None):
+                self.assertIsNone(verifier.decode(token))
+
+    def test_invalid_tokens_not_cached(self):
+        verifier = JWTVerifier(SECRET, "HS256")
+        verifier.decode(make_token(secret="other-secret"))
+
+        self.assertEqual(len(verifier.cache), 0)
+
+    def test_hmac_backend_rejects_asymmetric_algorithms(self):
+        with self.assertRaises(ValueError):
+            HMACBackend(SECRET, ["RS256"], 0)
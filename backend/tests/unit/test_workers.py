@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from app.workers import WorkerPool, WorkerPoolFullError
+
+
+def blocking_sleep(seconds: float) -> int:
+    time.sleep(seconds)
+    return threading.get_ident()
+
+
+class TestWorkerPool(unittest.IsolatedAsyncioTestCase):
+    async def test_run_off_loop(self):
+        pool = WorkerPool("thread", 2, 0)
+        try:
+            ident = await pool.run(blocking_sleep, 0)
+            self.assertNotEqual(ident, threading.get_ident())
+        finally:
+            pool.shutdown()
+
+    async def test_loop_stays_responsive(self):
+        pool = WorkerPool("thread", 2, 4)
+        try:
+            task = asyncio.gather(*(pool.run(blocking_sleep, 0.2) for _ in range(2)))
+
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            self.assertLess(time.perf_counter() - start, 0.1)
+
+            await task
+        finally:
+            pool.shutdown()
+
+    async def test_bounded_admission(self):
+        pool = WorkerPool("thread", 1, 1)
+        try:
+            tasks = [
+                asyncio.create_task(pool.run(blocking_sleep, 0.1))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.01)
+
+            # one running, one queued, the third is turned away
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            self.assertIsInstance(results[2], WorkerPoolFullError)
+            self.assertEqual(pool.rejected, 1)
+            self.assertEqual(pool.in_flight, 0)
+
+            await pool.run(blocking_sleep, 0)
+        finally:
+            pool.shutdown()
+
+    def test_invalid_kind(self):
+        with self.assertRaises(ValueError):
+            WorkerPool("fiber", 1, 1)
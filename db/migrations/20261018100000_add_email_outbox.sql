@@ -0,0 +1,17 @@
+-- migrate:up
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  recipient VARCHAR(255) NOT NULL,
+  message MEDIUMTEXT NOT NULL,
+  status ENUM('pending', 'sending', 'sent', 'dead') NOT NULL DEFAULT 'pending',
+  attempts INT NOT NULL DEFAULT 0,
+  last_error TEXT NULL,
+  next_attempt_at DATETIME NOT NULL,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  sent_at DATETIME NULL,
+  INDEX idx_status_next_attempt (status, next_attempt_at)
+);
+
+
+-- migrate:down
+DROP TABLE email_outbox;
@@ -0,0 +1,6 @@
+-- migrate:up
+ALTER TABLE users ADD COLUMN token_version INT NOT NULL DEFAULT 0;
+
+
+-- migrate:down
+ALTER TABLE users DROP COLUMN token_version;
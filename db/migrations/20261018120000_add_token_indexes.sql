@@ -0,0 +1,40 @@
+-- migrate:up
+-- Token hashes are SHA-256 of 256-bit random tokens, so unique in practice
+ALTER TABLE refresh_tokens
+    ADD UNIQUE INDEX idx_token_hash (token_hash),
+    ADD INDEX idx_user_id_expires_at (user_id, expires_at),
+    ADD INDEX idx_expires_at (expires_at);
+
+ALTER TABLE verification_tokens
+    ADD UNIQUE INDEX idx_token_hash (token_hash),
+    ADD INDEX idx_expires_at (expires_at);
+
+ALTER TABLE email_mfa_codes
+    ADD INDEX idx_user_id_code_hash (user_id, code_hash),
+    ADD INDEX idx_expires_at (expires_at);
+
+-- The composite index also serves the user_id foreign key
+ALTER TABLE recovery_codes
+    ADD INDEX idx_user_id_code_hash (user_id, code_hash),
+    DROP INDEX idx_user_id,
+    DROP INDEX idx_code_hash;
+
+
+-- migrate:down
+ALTER TABLE recovery_codes
+    ADD INDEX idx_user_id (user_id),
+    ADD INDEX idx_code_hash (code_hash),
+    DROP INDEX idx_user_id_code_hash;
+
+ALTER TABLE email_mfa_codes
+    DROP INDEX idx_expires_at,
+    DROP INDEX idx_user_id_code_hash;
+
+ALTER TABLE verification_tokens
+    DROP INDEX idx_expires_at,
+    DROP INDEX idx_token_hash;
+
+ALTER TABLE refresh_tokens
+    DROP INDEX idx_expires_at,
+    DROP INDEX idx_user_id_expires_at,
+    DROP INDEX idx_token_hash;
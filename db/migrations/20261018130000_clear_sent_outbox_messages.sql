@@ -0,0 +1,12 @@
+-- migrate:up
+-- Sent and dead-lettered emails no longer keep their body, which holds
+-- reset links and MFA codes
+ALTER TABLE email_outbox MODIFY message MEDIUMTEXT NULL;
+
+UPDATE email_outbox SET message = NULL WHERE status IN ('sent', 'dead');
+
+
+-- migrate:down
+UPDATE email_outbox SET message = '' WHERE message IS NULL;
+
+ALTER TABLE email_outbox MODIFY message MEDIUMTEXT NOT NULL;